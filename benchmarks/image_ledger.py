@@ -0,0 +1,75 @@
+"""
+Per-step cost of pruning screenshots from an agent's message history.
+
+Compares the `_ImageLedger` used by `act_stream` against a full backwards scan of every
+message (the previous `_filter_images` behaviour) as the history grows.
+
+    python benchmarks/image_ledger.py --steps 2000
+"""
+
+import argparse
+import time
+from typing import Callable, List
+
+from scrapybara.client import _ImageLedger
+from scrapybara.types.act import Message, ToolMessage, ToolResultPart
+
+
+def _step(i: int) -> ToolMessage:
+    return ToolMessage(
+        content=[ToolResultPart(tool_call_id=str(i), tool_name="computer", result={"base_64_image": "x" * 64})]
+    )
+
+
+def _scan(messages: List[Message], images_to_keep: int) -> None:
+    images_kept = 0
+    for message in reversed(messages):
+        if isinstance(message, ToolMessage):
+            for tool_result in reversed(message.content):
+                if isinstance(tool_result.result, dict) and "base_64_image" in tool_result.result:
+                    if images_kept < images_to_keep:
+                        images_kept += 1
+                    else:
+                        del tool_result.result["base_64_image"]
+
+
+def _run(steps: int, checkpoints: List[int], prune: Callable[[List[Message], ToolMessage], None]) -> List[float]:
+    messages: List[Message] = []
+    timings: List[float] = []
+    window: List[float] = []
+    for i in range(1, steps + 1):
+        message = _step(i)
+        messages.append(message)
+        start = time.perf_counter()
+        prune(messages, message)
+        window.append(time.perf_counter() - start)
+        if i in checkpoints:
+            # Average over the last 50 steps to smooth out timer noise
+            timings.append(sum(window[-50:]) / len(window[-50:]))
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--images-to-keep", type=int, default=4)
+    args = parser.parse_args()
+
+    checkpoints = sorted({max(50, args.steps * k // 8) for k in range(1, 9)})
+
+    ledger = _ImageLedger()
+
+    def prune_ledger(messages: List[Message], message: ToolMessage) -> None:
+        ledger.track(message)
+        ledger.prune(args.images_to_keep)
+
+    scan_timings = _run(args.steps, checkpoints, lambda messages, _: _scan(messages, args.images_to_keep))
+    ledger_timings = _run(args.steps, checkpoints, prune_ledger)
+
+    print(f"{'step':>8} {'full scan (us)':>16} {'ledger (us)':>12}")
+    for step, scan, ledger_time in zip(checkpoints, scan_timings, ledger_timings):
+        print(f"{step:>8} {scan * 1e6:>16.1f} {ledger_time * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
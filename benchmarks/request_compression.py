@@ -0,0 +1,92 @@
+"""
+Compress-time vs. upload-time trade-off for `act` request bodies.
+
+Builds a `v1/act` body with a history of base64 screenshots, compresses it with each
+codec, and estimates the end-to-end send time (compression plus transfer) over a range
+of uplink bandwidths.
+
+    python benchmarks/request_compression.py --screenshots 4 --mbps 10 50 100 1000
+"""
+
+import argparse
+import base64
+import gzip
+import json
+import os
+import time
+from typing import Callable, Dict, List, Tuple
+
+from scrapybara.core.http_client import GZIP_COMPRESSION_LEVEL, ZSTD_COMPRESSION_LEVEL
+
+
+def _screenshot(size: int) -> str:
+    # PNG data is already deflated, so random bytes are a fair stand-in for its entropy
+    return base64.b64encode(os.urandom(size)).decode()
+
+
+def _body(screenshots: int, screenshot_bytes: int, steps: int) -> bytes:
+    messages: List[Dict] = [{"role": "user", "content": [{"type": "text", "text": "Open the docs and find pricing"}]}]
+    for i in range(steps):
+        result: Dict = {"output": "clicked", "system": None}
+        if i >= steps - screenshots:
+            result["base_64_image"] = _screenshot(screenshot_bytes)
+        messages.append(
+            {
+                "role": "assistant",
+                "content": [
+                    {"type": "tool-call", "tool_call_id": str(i), "tool_name": "computer", "args": {"action": "click"}}
+                ],
+            }
+        )
+        tool_result = {"type": "tool-result", "tool_call_id": str(i), "tool_name": "computer", "result": result}
+        messages.append({"role": "tool", "content": [tool_result]})
+    return json.dumps({"model": {"provider": "anthropic", "name": "claude"}, "messages": messages}).encode()
+
+
+def _codecs() -> List[Tuple[str, Callable[[bytes], bytes]]]:
+    codecs: List[Tuple[str, Callable[[bytes], bytes]]] = [
+        ("none", lambda body: body),
+        ("gzip-1", lambda body: gzip.compress(body, compresslevel=1, mtime=0)),
+        (
+            f"gzip-{GZIP_COMPRESSION_LEVEL}",
+            lambda body: gzip.compress(body, compresslevel=GZIP_COMPRESSION_LEVEL, mtime=0),
+        ),
+        ("gzip-9", lambda body: gzip.compress(body, compresslevel=9, mtime=0)),
+    ]
+    try:
+        import zstandard  # type: ignore
+    except ImportError:
+        pass
+    else:
+        compressor = zstandard.ZstdCompressor(level=ZSTD_COMPRESSION_LEVEL)
+        codecs.append((f"zstd-{ZSTD_COMPRESSION_LEVEL}", compressor.compress))
+    return codecs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--screenshots", type=int, default=4)
+    parser.add_argument("--screenshot-kb", type=int, default=600)
+    parser.add_argument("--steps", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--mbps", type=float, nargs="+", default=[10, 50, 100, 1000])
+    args = parser.parse_args()
+
+    body = _body(args.screenshots, args.screenshot_kb * 1024, args.steps)
+    print(f"body: {len(body) / 1e6:.2f} MB")
+    header = f"{'codec':>8} {'size MB':>8} {'ratio':>6} {'compress ms':>12}"
+    print(header + "".join(f" {f'{mbps:g} Mbps ms':>13}" for mbps in args.mbps))
+    for name, compress in _codecs():
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            compressed = compress(body)
+        compress_s = (time.perf_counter() - start) / args.repeat
+        totals = [compress_s + len(compressed) * 8 / (mbps * 1e6) for mbps in args.mbps]
+        print(
+            f"{name:>8} {len(compressed) / 1e6:>8.2f} {len(compressed) / len(body):>6.2f} {compress_s * 1e3:>12.1f}"
+            + "".join(f" {total * 1e3:>13.1f}" for total in totals)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Per-step cost of converting an agent's tools for the act request.
+
+Compares regenerating every parameters schema and serializing every tool on each step (the previous
+behaviour of `act_stream`) against the cached schemas and tool JSON now shared by all agent loops.
+
+    python benchmarks/tool_schemas.py --steps 500
+"""
+
+import argparse
+import time
+from typing import Callable, List
+
+from scrapybara.client import _api_tools
+from scrapybara.tools import BashTool, ComputerTool, EditTool
+from scrapybara.types.act import ApiTool, Tool
+
+
+def _uncached(tools: List[Tool]) -> bytes:
+    api_tools = [
+        ApiTool(
+            name=tool.name,
+            description=tool.description,
+            parameters=tool.parameters.model_json_schema() if tool.parameters else None,
+        )
+        for tool in tools
+    ]
+    return b"[" + b",".join(tool.model_dump_json(exclude_none=True).encode() for tool in api_tools) + b"]"
+
+
+def _cached(tools: List[Tool]) -> bytes:
+    return b"[" + b",".join(tool.json_bytes() for tool in _api_tools(tools)) + b"]"
+
+
+def _run(steps: int, tools: List[Tool], encode: Callable[[List[Tool]], bytes]) -> float:
+    start = time.perf_counter()
+    for _ in range(steps):
+        encode(tools)
+    return (time.perf_counter() - start) / steps
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--steps", type=int, default=500)
+    args = parser.parse_args()
+
+    # The tools only need an instance to run, not to be converted
+    tools: List[Tool] = [ComputerTool(None), BashTool(None), EditTool(None)]  # type: ignore[arg-type]
+    assert _uncached(tools) == _cached(tools)
+
+    uncached = _run(args.steps, tools, _uncached)
+    cached = _run(args.steps, tools, _cached)
+
+    print(f"{'uncached (us/step)':>20} {'cached (us/step)':>18} {'speedup':>9}")
+    print(f"{uncached * 1e6:>20.1f} {cached * 1e6:>18.1f} {uncached / cached:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
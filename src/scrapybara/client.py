@@ -1,10 +1,29 @@
+import asyncio
+import base64
+import binascii
+import codecs
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime
+import hashlib
+import importlib.util
 import inspect
+import io
+import itertools
+import json
+import mmap
 from typing import (
     Optional,
     Any,
+    Deque,
     Dict,
+    IO,
     List,
+    Iterable,
+    Iterator,
+    Set,
+    Tuple,
     Sequence,
     Type,
     TypeVar,
@@ -12,21 +31,57 @@ from typing import (
     Generator,
     Callable,
     AsyncGenerator,
+    AsyncIterator,
     Literal,
+    NamedTuple,
     overload,
 )
 import typing
+import uuid
+from pathlib import Path
 import os
+import posixpath
+import random
+import shlex
+import tarfile
+import tempfile
+import threading
+import time
 import warnings
+import weakref
 
 import httpx
-from pydantic import BaseModel, ConfigDict
-
-from scrapybara.core.http_client import AsyncHttpClient, HttpClient
+from pydantic import BaseModel, ConfigDict, TypeAdapter
+from pydantic_core import PydanticSerializationError
+
+from scrapybara.core.http_client import (
+    DEFAULT_COMPRESSION_THRESHOLD_BYTES,
+    AsyncHttpClient,
+    HttpClient,
+    RequestCompression,
+)
 from scrapybara.environment import ScrapybaraEnvironment
 from .core.request_options import RequestOptions
 from .core.api_error import ApiError
+from .core.pydantic_utilities import parse_obj_as
+from .errors.unprocessable_entity_error import UnprocessableEntityError
+from .types.http_validation_error import HttpValidationError
 from .core import File
+from .core.json_stream import async_parse_json_response, parse_json_response
+from .core.jsonable_encoder import jsonable_encoder
+from .core.rate_limiter import RateLimiter
+
+DEFAULT_MAX_CONNECTIONS = 256
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 64
+DEFAULT_KEEPALIVE_EXPIRY = 30.0
+DEFAULT_BATCH_CONCURRENCY = 16
+DEFAULT_BATCH_RETRIES = 2
+DEFAULT_ACT_CONCURRENCY = 8
+DEFAULT_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+DEFAULT_UPLOAD_CONCURRENCY = 4
+DEFAULT_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DEFAULT_FILE_BATCH_CONCURRENCY = 8
+DEFAULT_BASH_STREAM_CHUNK_SIZE = 256 * 1024
 from .types import (
     Action,
     AuthStateResponse,
@@ -50,10 +105,19 @@ from .types import (
     StopBrowserResponse,
     StopInstanceResponse,
     ModifyBrowserAuthResponse,
+    ConnectionPoolStats,
     UploadResponse,
     FileResponse,
 )
 
+from .types.batch import BatchFailure, BatchResult
+from .types.chunked_upload import ChunkedUploadResponse
+from .types.directory_sync import DirectorySyncResponse
+from .types.computer_batch import ComputerActionResult, ComputerBatchResponse
+from .types.download import DownloadResponse
+from .types.file_operation import FileOperation
+from .types.screenshot_payload import ScreenshotPayload
+from .types.tool import _shared_api_tool
 from .types.act import (
     SingleActRequest,
     SingleActResponse,
@@ -66,15 +130,20 @@ from .types.act import (
     ToolMessage,
     ToolResultPart,
     ReasoningPart,
+    ScreenshotOptions,
     UserMessage,
     AssistantMessage,
     Step,
     ActResponse,
+    ActManyResult,
+    ActManyStats,
+    ActTask,
     TokenUsage,
 )
 from .base_client import BaseClient, AsyncBaseClient
 from .instance.types import (
     Command,
+    Request,
     Request_MoveMouse,
     Request_ClickMouse,
     Request_DragMouse,
@@ -99,6 +168,19 @@ from .types import (
 
 OMIT = typing.cast(typing.Any, ...)
 SchemaT = TypeVar("SchemaT", bound=BaseModel)
+UploadSource = Union[str, "os.PathLike[str]", bytes, bytearray, memoryview, mmap.mmap]
+ComputerBatchAction = Union[
+    Request,
+    MoveMouseAction,
+    ClickMouseAction,
+    DragMouseAction,
+    ScrollAction,
+    PressKeyAction,
+    TypeTextAction,
+    WaitAction,
+    TakeScreenshotAction,
+    GetCursorPositionAction,
+]
 
 
 class StructuredOutputTool(Tool):
@@ -532,6 +614,146 @@ class AsyncEnv:
         )
 
 
+class BashStream:
+    """Output of a command started by `UbuntuInstance.bash_stream`, iterated as the command produces it.
+
+    The command runs in the background on the instance with its output written to a log file, which is
+    read from the last offset on every poll. Only one chunk of output is held in memory at a time, and a chunk
+    the bash endpoint cuts off is read again in smaller ones. The command is started when iteration begins and `exit_code` is set once it has finished. When iteration
+    ends early, through a timeout, an error or a loop that breaks out, the command and everything it
+    started is terminated and its files are removed. Call `stop` to terminate a command from elsewhere.
+    """
+
+    def __init__(
+        self,
+        instance_id: str,
+        client: BaseClient,
+        command: str,
+        *,
+        session: Optional[int] = OMIT,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.1,
+        max_poll_interval: float = 2.0,
+        chunk_size: int = DEFAULT_BASH_STREAM_CHUNK_SIZE,
+        spool_path: Optional[Union[str, "os.PathLike[str]"]] = None,
+    ):
+        self.instance_id = instance_id
+        self._client = client
+        self._state = _BashStreamState(command, chunk_size, spool_path)
+        self._session = session
+        self._timeout = timeout
+        self._poll_interval = poll_interval
+        self._max_poll_interval = max_poll_interval
+
+    @property
+    def exit_code(self) -> Optional[int]:
+        return self._state.exit_code
+
+    def __iter__(self) -> Iterator[str]:
+        state = self._state
+        deadline = time.monotonic() + self._timeout if self._timeout is not None else None
+        state.started(self._shell(state.start_command(), session=self._session))
+        idle = 0  # Polls in a row that returned no output
+        finished = False
+        try:
+            while True:
+                text, full = state.feed(self._shell(state.poll_command()))
+                if text:
+                    yield text
+                if state.exit_code is not None:
+                    break
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"Command did not finish within {self._timeout} seconds")
+                idle = 0 if text else idle + 1
+                if not full:
+                    time.sleep(_poll_delay(idle, self._poll_interval, self._max_poll_interval))
+            finished = True
+        finally:
+            # Also runs when iteration is abandoned, so the command never outlives its stream
+            try:
+                self._shell(state.cleanup_command())
+            except Exception:
+                if finished:
+                    raise
+            finally:
+                state.close()
+
+    def stop(self) -> None:
+        """Terminates the command if it is still running."""
+        if self._state.pid is not None and self._state.exit_code is None:
+            self._shell(self._state.stop_command())
+
+    def _shell(self, command: str, session: Optional[int] = OMIT) -> str:
+        return _shell_output(self._client.instance.bash(self.instance_id, command=command, session=session), command)
+
+
+class AsyncBashStream:
+    """Output of a command started by `AsyncUbuntuInstance.bash_stream`, see `BashStream`."""
+
+    def __init__(
+        self,
+        instance_id: str,
+        client: AsyncBaseClient,
+        command: str,
+        *,
+        session: Optional[int] = OMIT,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.1,
+        max_poll_interval: float = 2.0,
+        chunk_size: int = DEFAULT_BASH_STREAM_CHUNK_SIZE,
+        spool_path: Optional[Union[str, "os.PathLike[str]"]] = None,
+    ):
+        self.instance_id = instance_id
+        self._client = client
+        self._state = _BashStreamState(command, chunk_size, spool_path)
+        self._session = session
+        self._timeout = timeout
+        self._poll_interval = poll_interval
+        self._max_poll_interval = max_poll_interval
+
+    @property
+    def exit_code(self) -> Optional[int]:
+        return self._state.exit_code
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        state = self._state
+        deadline = time.monotonic() + self._timeout if self._timeout is not None else None
+        state.started(await self._shell(state.start_command(), session=self._session))
+        idle = 0  # Polls in a row that returned no output
+        finished = False
+        try:
+            while True:
+                text, full = state.feed(await self._shell(state.poll_command()))
+                if text:
+                    yield text
+                if state.exit_code is not None:
+                    break
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError(f"Command did not finish within {self._timeout} seconds")
+                idle = 0 if text else idle + 1
+                if not full:
+                    await asyncio.sleep(_poll_delay(idle, self._poll_interval, self._max_poll_interval))
+            finished = True
+        finally:
+            # Also runs when iteration is abandoned, so the command never outlives its stream
+            try:
+                await self._shell(state.cleanup_command())
+            except Exception:
+                if finished:
+                    raise
+            finally:
+                state.close()
+
+    async def stop(self) -> None:
+        """Terminates the command if it is still running."""
+        if self._state.pid is not None and self._state.exit_code is None:
+            await self._shell(self._state.stop_command())
+
+    async def _shell(self, command: str, session: Optional[int] = OMIT) -> str:
+        response = await self._client.instance.bash(self.instance_id, command=command, session=session)
+        return _shell_output(response, command)
+
+
 class BaseInstance:
     def __init__(
         self,
@@ -552,6 +774,23 @@ class BaseInstance:
             self.id, request_options=request_options
         )
 
+    def screenshot_payload(self, request_options: Optional[RequestOptions] = None) -> ScreenshotPayload:
+        """Take a screenshot without copying the image into a string.
+
+        The image is streamed out of the response into a buffer and only decoded when the payload is
+        used. Prefer this over `screenshot` when holding many screenshots or writing them to disk.
+
+        Returns:
+            ScreenshotPayload: The screenshot, with `base_64_image` available for compatibility
+        """
+        with self._client._client_wrapper.httpx_client.stream(
+            f"v1/instance/{jsonable_encoder(self.id)}/screenshot",
+            method="POST",
+            request_options=request_options,
+        ) as response:
+            body = _spooled_json(response, ["base64_image"])
+        return _screenshot_payload(response, body)
+
     def get_stream_url(
         self, request_options: Optional[RequestOptions] = None
     ) -> InstanceGetStreamUrlResponse:
@@ -842,6 +1081,41 @@ class BaseInstance:
             request_options=request_options,
         )
 
+    def computer_batch(
+        self,
+        actions: Sequence[ComputerBatchAction],
+        *,
+        screenshot: bool = True,
+        stop_on_error: bool = True,
+        request_options: Optional[RequestOptions] = None,
+    ) -> ComputerBatchResponse:
+        """Run a sequence of computer actions, taking a screenshot only after the last one.
+
+        Intermediate actions are sent with `screenshot=False`, one after another over the client's
+        keep-alive connection, so a scripted flow such as click, select all, type and enter costs one
+        screenshot instead of one per action.
+
+        Args:
+            actions: Action objects or `Request_*` models, run in order
+            screenshot: Whether the final action returns a screenshot
+            stop_on_error: Skip the remaining actions once one returns an error
+            request_options: Options for each request
+
+        Returns:
+            ComputerBatchResponse: Each action's response and round-trip time
+        """
+        requests = _computer_batch_requests(actions, screenshot)
+        results: List[ComputerActionResult] = []
+        for request in requests:
+            started = time.perf_counter()
+            response = self._client.instance.computer(self.id, request=request, request_options=request_options)
+            results.append(
+                ComputerActionResult(action=request.action, response=response, seconds=time.perf_counter() - started)
+            )
+            if response.error and stop_on_error:
+                break
+        return ComputerBatchResponse(actions=len(requests), results=results)
+
     def stop(
         self, request_options: Optional[RequestOptions] = None
     ) -> StopInstanceResponse:
@@ -864,6 +1138,40 @@ class BaseInstance:
             request_options=request_options,
         )
 
+    def wait_until_ready(
+        self,
+        *,
+        timeout: float = 300,
+        initial_interval: float = 0.5,
+        max_interval: float = 5.0,
+    ) -> None:
+        """Blocks until the instance is running.
+
+        Polls with exponential backoff and jitter. Instances waiting at the same time on the same
+        client are polled on one shared schedule, with a single `get_instances` call per poll instead
+        of one request each.
+
+        Args:
+            timeout: Seconds to wait before giving up
+            initial_interval: Delay before the second poll, doubled on every poll after that
+            max_interval: Upper bound on the delay between polls
+
+        Raises:
+            TimeoutError: If the instance is not running within `timeout` seconds
+            RuntimeError: If the instance enters the error or terminated status
+        """
+        deadline = time.monotonic() + timeout
+        poller = _status_poller(self._client)
+        with poller.waiting(self._client, self.id, initial_interval, max_interval):
+            tick = 0
+            while True:
+                polled = poller.status(self.id, tick, deadline)
+                if polled is None:
+                    raise TimeoutError(f"Instance {self.id} was not ready after {timeout} seconds")
+                self.status, tick = polled
+                if _is_ready(self.id, self.status):
+                    return
+
 
 class UbuntuInstance(BaseInstance):
     def __init__(
@@ -901,6 +1209,50 @@ class UbuntuInstance(BaseInstance):
             request_options=request_options
         )
 
+    def bash_stream(
+        self,
+        command: str,
+        *,
+        session: Optional[int] = OMIT,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.1,
+        max_poll_interval: float = 2.0,
+        chunk_size: int = DEFAULT_BASH_STREAM_CHUNK_SIZE,
+        spool_path: Optional[Union[str, "os.PathLike[str]"]] = None,
+    ) -> BashStream:
+        """Run a command and iterate over its output while it runs.
+
+        ```python
+        stream = instance.bash_stream("make test")
+        for chunk in stream:
+            print(chunk, end="")
+        print(stream.exit_code)
+        ```
+
+        Args:
+            command: Command to run, stdout and stderr are combined
+            session: Bash session whose working directory and environment the command runs with
+            timeout: Seconds after which the command is terminated and TimeoutError is raised
+            poll_interval: Delay between polls while output is arriving
+            max_poll_interval: Upper bound on the delay between polls while the command is quiet
+            chunk_size: Maximum bytes of output read per poll
+            spool_path: Local file the complete output is also written to
+
+        Returns:
+            BashStream: Iterates over the output as text, with `exit_code` set once the command finished
+        """
+        return BashStream(
+            self.id,
+            self._client,
+            command,
+            session=session,
+            timeout=timeout,
+            poll_interval=poll_interval,
+            max_poll_interval=max_poll_interval,
+            chunk_size=chunk_size,
+            spool_path=spool_path,
+        )
+
     def edit(
         self,
         *,
@@ -970,6 +1322,133 @@ class UbuntuInstance(BaseInstance):
             line_numbers=line_numbers,
             request_options=request_options
         )
+
+    def file_batch(
+        self,
+        operations: Sequence[FileOperation],
+        *,
+        concurrency: int = DEFAULT_FILE_BATCH_CONCURRENCY,
+        retries: int = DEFAULT_BATCH_RETRIES,
+        request_options: Optional[RequestOptions] = None,
+    ) -> BatchResult[FileResponse]:
+        """Run many file commands, concurrently where they don't touch the same paths.
+
+        The API has no batch endpoint, so each operation is its own request on the client's keep-alive
+        connections with at most `concurrency` in flight. Operations whose paths overlap, including `src`
+        and `dst` and paths inside a directory another operation touches, run one after another in the
+        order given. Reads, `write` and `mkdir` are retried after server errors too, since running them twice
+        leaves the same result. Other operations, like `append`, `create` or `delete`, are only retried when the
+        request never reached the server, so an operation that already succeeded is never reported as failed.
+
+        Args:
+            operations: File commands to run
+            concurrency: Maximum number of requests in flight
+            retries: Attempts per operation for rate limits, server errors and connection errors
+            request_options: Options for each request
+
+        Returns:
+            BatchResult[FileResponse]: Responses in the order of `operations`, and requests that failed
+        """
+        return _run_batch(
+            operations,
+            lambda operation: self._client.instance.file(
+                self.id, **operation.model_dump(exclude_none=True), request_options=request_options
+            ),
+            concurrency=concurrency,
+            retries=retries,
+            lanes=_file_operation_lanes(operations),
+            retry_if=_is_retryable_file_operation_error,
+        )
+
+    def read_file(
+        self,
+        path: str,
+        *,
+        encoding: Optional[str] = OMIT,
+        request_options: Optional[RequestOptions] = None,
+    ) -> IO[bytes]:
+        """Read a file without holding the response in memory.
+
+        The file's contents are streamed out of the response into a temporary file, which stays in
+        memory for small files and moves to disk for large ones.
+
+        Args:
+            path: Path of the file on the instance
+            encoding: Encoding the instance reads the file with
+            request_options: Options for the request
+
+        Returns:
+            IO[bytes]: The UTF-8 encoded contents, positioned at the start
+
+        Raises:
+            RuntimeError: If the instance could not read the file
+        """
+        with self._client._client_wrapper.httpx_client.stream(
+            f"v1/instance/{jsonable_encoder(self.id)}/file",
+            method="POST",
+            json={"command": "read", "path": path, "encoding": encoding},
+            request_options=request_options,
+            omit=OMIT,
+        ) as response:
+            body = _spooled_json(response, ["output"])
+        return _read_file(path, response, body)
+
+    def download(
+        self,
+        path: str,
+        destination: Union[str, "os.PathLike[str]", IO[bytes]],
+        *,
+        resume: bool = True,
+        verify: bool = True,
+        chunk_size: int = DEFAULT_DOWNLOAD_CHUNK_SIZE,
+        request_options: Optional[RequestOptions] = None,
+    ) -> DownloadResponse:
+        """Download a file from the instance straight to disk.
+
+        The file is read in ranges of `chunk_size` bytes. Each range is streamed out of its response and
+        decoded into `destination` without holding the range in memory. A range whose output comes back cut off
+        is discarded and read again in smaller ranges. When `destination` is a path that already holds the start of
+        the file, and its SHA-256 matches the same bytes on the instance, the download resumes after it.
+
+        Args:
+            path: Path of the file on the instance
+            destination: Local path or binary file object to write to
+            resume: Continue an interrupted download into an existing local file instead of starting over
+            verify: Compare the SHA-256 of the local file with the file on the instance
+            chunk_size: Bytes read from the instance per request
+            request_options: Options for each request
+
+        Returns:
+            DownloadResponse: The size of the file, how much of it was resumed and its SHA-256 when verified
+
+        Raises:
+            RuntimeError: If the file can't be read or the download does not match it
+        """
+        size = _parse_file_size(path, self._shell(_file_size_command(path)))
+        offset = _resume_offset(destination, size) if resume else 0
+        prefix = _resumed_digest(destination, offset)
+        if offset and not _matches_sha256(self._shell(_prefix_sha256_command(path, offset)), prefix):
+            offset, prefix = 0, hashlib.sha256()  # The local file isn't a prefix of the remote one
+        with _download_target(destination, offset) as file:
+            resumed, digest = offset, prefix if verify else None
+            while offset < size:
+                length, mark = min(chunk_size, size - offset), file.tell()
+                checkpoint = digest.copy() if digest is not None else None
+                command = _read_range_command(path, offset, length)
+                with self._client._client_wrapper.httpx_client.stream(
+                    f"v1/instance/{jsonable_encoder(self.id)}/bash",
+                    method="POST",
+                    json={"command": command},
+                    request_options=request_options,
+                ) as response:
+                    body = _spooled_json(response, ["output"])
+                written = _write_range(path, command, body, file, digest)
+                if written == length:
+                    offset += written
+                else:
+                    chunk_size, digest = _shrink_range(path, file, mark, length, written), checkpoint
+        remote = _parse_sha256sum(self._shell(f"sha256sum -- {shlex.quote(path)}")) if verify else {}
+        return _download_response(path, size, resumed, digest, remote)
     
     def upload(
         self,
@@ -984,6 +1463,126 @@ class UbuntuInstance(BaseInstance):
             path=path,
             request_options=request_options,
         )
+
+    def upload_chunked(
+        self,
+        source: UploadSource,
+        path: str,
+        *,
+        chunk_size: int = DEFAULT_UPLOAD_CHUNK_SIZE,
+        concurrency: int = DEFAULT_UPLOAD_CONCURRENCY,
+        retries: int = DEFAULT_BATCH_RETRIES,
+        request_options: Optional[RequestOptions] = None,
+    ) -> ChunkedUploadResponse:
+        """Upload a large file in chunks, resuming where an interrupted upload stopped.
+
+        Files given by path are memory-mapped rather than read, and only `concurrency` chunks are held
+        in memory at a time. Chunks are uploaded in parallel next to `path`, verified against their
+        SHA-256 on the instance and concatenated once all of them match. Chunks that fail to upload or
+        verify are sent again, the others are not. Chunks left by an earlier upload of the same content
+        are verified and reused.
+
+        Args:
+            source: Local file path, or the contents as bytes or a memory map
+            path: Destination path on the instance
+            chunk_size: Size of each chunk in bytes
+            concurrency: Maximum number of chunks uploaded at once
+            retries: Attempts per chunk for rate limits, server errors and connection errors, and rounds
+                of re-sending chunks that fail verification
+            request_options: Options for each request
+
+        Returns:
+            ChunkedUploadResponse: Size and SHA-256 of the file, and how many chunks were skipped or resent
+
+        Raises:
+            RuntimeError: If chunks still fail verification after `retries` rounds, or the assembled file does not match
+        """
+        with _upload_source(source) as data:
+            size, (chunks, digest) = len(data), _plan_chunks(data, chunk_size)
+            parts = _upload_parts_dir(path, digest, chunk_size)
+            remote = _parse_sha256sum(self._shell(_list_parts_command(parts, create=True)))
+            pending = [chunk for chunk in chunks if remote.get(chunk.name) != chunk.sha256]
+            skipped, resent = len(chunks) - len(pending), 0
+
+            def upload(chunk: _Chunk) -> UploadResponse:
+                return self._client.instance.upload(
+                    self.id,
+                    file=(chunk.name, bytes(data[chunk.offset : chunk.offset + chunk.length])),
+                    path=f"{parts}/{chunk.name}",
+                    request_options=request_options,
+                )
+
+            for attempt in itertools.count():
+                batch = _run_batch(pending, upload, concurrency=concurrency, retries=retries)
+                if batch.failures:
+                    raise batch.failures[0].error
+                remote = _parse_sha256sum(self._shell(_list_parts_command(parts)))
+                pending = [chunk for chunk in pending if remote.get(chunk.name) != chunk.sha256]
+                if not pending:
+                    break
+                if attempt >= retries:
+                    raise RuntimeError(f"{len(pending)} chunks of {path} failed verification after {retries} retries")
+                resent += len(pending)
+
+        assembled = _parse_sha256sum(self._shell(_assemble_parts_command(parts, path)))
+        return _chunked_upload_response(path, size, digest, chunks, assembled, skipped, resent)
+
+    def sync_dir(
+        self,
+        local_path: Union[str, "os.PathLike[str]"],
+        remote_path: str,
+        *,
+        delete: bool = False,
+        chunked_threshold: int = DEFAULT_UPLOAD_CHUNK_SIZE,
+        request_options: Optional[RequestOptions] = None,
+    ) -> DirectorySyncResponse:
+        """Make a directory on the instance match a local one, uploading only files that changed.
+
+        Local files are compared by SHA-256 against a manifest built with `sha256sum` on the instance.
+        Changed files smaller than `chunked_threshold` are packed into one gzipped tar upload, larger
+        ones are sent with `upload_chunked`.
+
+        Args:
+            local_path: Local directory to upload
+            remote_path: Directory on the instance, created if missing
+            delete: Remove files from the instance that don't exist locally
+            chunked_threshold: Size in bytes from which a file is uploaded on its own in chunks
+            request_options: Options for each request
+
+        Returns:
+            DirectorySyncResponse: Files uploaded and deleted, and the bytes saved by skipping unchanged files
+        """
+        local = _local_manifest(local_path)
+        remote = _parse_sha256sum(self._shell(_remote_manifest_command(remote_path)))
+        changed = [name for name, (digest, _) in local.items() if remote.get(name) != digest]
+        small = [name for name in changed if local[name][1] < chunked_threshold]
+        uploaded_bytes = 0
+
+        if small:
+            archive_path = f"/tmp/scrapybara-sync-{uuid.uuid4().hex}.tar.gz"
+            with _pack_files(local_path, small) as (archive, archive_size):
+                self._client.instance.upload(
+                    self.id, file=("sync.tar.gz", archive), path=archive_path, request_options=request_options
+                )
+            uploaded_bytes += archive_size
+            self._shell(_unpack_command(archive_path, remote_path))
+        for name in changed:
+            if name not in small:
+                self.upload_chunked(
+                    os.path.join(local_path, name),
+                    posixpath.join(remote_path, name),
+                    chunk_size=chunked_threshold,
+                    request_options=request_options,
+                )
+                uploaded_bytes += local[name][1]
+
+        deleted = sorted(set(remote) - set(local)) if delete else []
+        for command in _delete_commands(remote_path, deleted):
+            self._shell(command)
+        return _directory_sync_response(local, changed, deleted, uploaded_bytes)
+
+    def _shell(self, command: str) -> str:
+        return _shell_output(self._client.instance.bash(self.id, command=command), command)
     
 class BrowserInstance(BaseInstance):
     def __init__(
@@ -1074,6 +1673,23 @@ class AsyncBaseInstance:
             self.id, request_options=request_options
         )
 
+    async def screenshot_payload(self, request_options: Optional[RequestOptions] = None) -> ScreenshotPayload:
+        """Take a screenshot without copying the image into a string.
+
+        The image is streamed out of the response into a buffer and only decoded when the payload is
+        used. Prefer this over `screenshot` when holding many screenshots or writing them to disk.
+
+        Returns:
+            ScreenshotPayload: The screenshot, with `base_64_image` available for compatibility
+        """
+        async with self._client._client_wrapper.httpx_client.stream(
+            f"v1/instance/{jsonable_encoder(self.id)}/screenshot",
+            method="POST",
+            request_options=request_options,
+        ) as response:
+            body = await _async_spooled_json(response, ["base64_image"])
+        return _screenshot_payload(response, body)
+
     async def get_stream_url(
         self, request_options: Optional[RequestOptions] = None
     ) -> InstanceGetStreamUrlResponse:
@@ -1364,6 +1980,41 @@ class AsyncBaseInstance:
             request_options=request_options,
         )
 
+    async def computer_batch(
+        self,
+        actions: Sequence[ComputerBatchAction],
+        *,
+        screenshot: bool = True,
+        stop_on_error: bool = True,
+        request_options: Optional[RequestOptions] = None,
+    ) -> ComputerBatchResponse:
+        """Run a sequence of computer actions, taking a screenshot only after the last one.
+
+        Intermediate actions are sent with `screenshot=False`, one after another over the client's
+        keep-alive connection, so a scripted flow such as click, select all, type and enter costs one
+        screenshot instead of one per action.
+
+        Args:
+            actions: Action objects or `Request_*` models, run in order
+            screenshot: Whether the final action returns a screenshot
+            stop_on_error: Skip the remaining actions once one returns an error
+            request_options: Options for each request
+
+        Returns:
+            ComputerBatchResponse: Each action's response and round-trip time
+        """
+        requests = _computer_batch_requests(actions, screenshot)
+        results: List[ComputerActionResult] = []
+        for request in requests:
+            started = time.perf_counter()
+            response = await self._client.instance.computer(self.id, request=request, request_options=request_options)
+            results.append(
+                ComputerActionResult(action=request.action, response=response, seconds=time.perf_counter() - started)
+            )
+            if response.error and stop_on_error:
+                break
+        return ComputerBatchResponse(actions=len(requests), results=results)
+
     async def stop(
         self, request_options: Optional[RequestOptions] = None
     ) -> StopInstanceResponse:
@@ -1390,6 +2041,39 @@ class AsyncBaseInstance:
             request_options=request_options,
         )
 
+    async def wait_until_ready(
+        self,
+        *,
+        timeout: float = 300,
+        initial_interval: float = 0.5,
+        max_interval: float = 5.0,
+    ) -> None:
+        """Waits until the instance is running.
+
+        Polls with exponential backoff and jitter. Instances waiting at the same time on the same
+        client are polled on one shared schedule, with a single `get_instances` call per poll instead
+        of one request each.
+
+        Args:
+            timeout: Seconds to wait before giving up
+            initial_interval: Delay before the second poll, doubled on every poll after that
+            max_interval: Upper bound on the delay between polls
+
+        Raises:
+            TimeoutError: If the instance is not running within `timeout` seconds
+            RuntimeError: If the instance enters the error or terminated status
+        """
+        deadline = time.monotonic() + timeout
+        poller = _async_status_poller(self._client)
+        with poller.waiting(self._client, self.id, initial_interval, max_interval):
+            while True:
+                status = await poller.status(self.id, deadline)
+                if status is None:
+                    raise TimeoutError(f"Instance {self.id} was not ready after {timeout} seconds")
+                self.status = status
+                if _is_ready(self.id, self.status):
+                    return
+
 
 class AsyncUbuntuInstance(AsyncBaseInstance):
     def __init__(
@@ -1427,6 +2111,50 @@ class AsyncUbuntuInstance(AsyncBaseInstance):
             request_options=request_options
         )
 
+    def bash_stream(
+        self,
+        command: str,
+        *,
+        session: Optional[int] = OMIT,
+        timeout: Optional[float] = None,
+        poll_interval: float = 0.1,
+        max_poll_interval: float = 2.0,
+        chunk_size: int = DEFAULT_BASH_STREAM_CHUNK_SIZE,
+        spool_path: Optional[Union[str, "os.PathLike[str]"]] = None,
+    ) -> AsyncBashStream:
+        """Run a command and iterate over its output while it runs.
+
+        ```python
+        stream = instance.bash_stream("make test")
+        async for chunk in stream:
+            print(chunk, end="")
+        print(stream.exit_code)
+        ```
+
+        Args:
+            command: Command to run, stdout and stderr are combined
+            session: Bash session whose working directory and environment the command runs with
+            timeout: Seconds after which the command is terminated and TimeoutError is raised
+            poll_interval: Delay between polls while output is arriving
+            max_poll_interval: Upper bound on the delay between polls while the command is quiet
+            chunk_size: Maximum bytes of output read per poll
+            spool_path: Local file the complete output is also written to
+
+        Returns:
+            AsyncBashStream: Iterates over the output as text, with `exit_code` set once the command finished
+        """
+        return AsyncBashStream(
+            self.id,
+            self._client,
+            command,
+            session=session,
+            timeout=timeout,
+            poll_interval=poll_interval,
+            max_poll_interval=max_poll_interval,
+            chunk_size=chunk_size,
+            spool_path=spool_path,
+        )
+
     async def edit(
         self,
         *,
@@ -1496,7 +2224,134 @@ class AsyncUbuntuInstance(AsyncBaseInstance):
             line_numbers=line_numbers,
             request_options=request_options
         )
-        
+
+    async def file_batch(
+        self,
+        operations: Sequence[FileOperation],
+        *,
+        concurrency: int = DEFAULT_FILE_BATCH_CONCURRENCY,
+        retries: int = DEFAULT_BATCH_RETRIES,
+        request_options: Optional[RequestOptions] = None,
+    ) -> BatchResult[FileResponse]:
+        """Run many file commands, concurrently where they don't touch the same paths.
+
+        The API has no batch endpoint, so each operation is its own request on the client's keep-alive
+        connections with at most `concurrency` in flight. Operations whose paths overlap, including `src`
+        and `dst` and paths inside a directory another operation touches, run one after another in the
+        order given. Reads, `write` and `mkdir` are retried after server errors too, since running them twice
+        leaves the same result. Other operations, like `append`, `create` or `delete`, are only retried when the
+        request never reached the server, so an operation that already succeeded is never reported as failed.
+
+        Args:
+            operations: File commands to run
+            concurrency: Maximum number of requests in flight
+            retries: Attempts per operation for rate limits, server errors and connection errors
+            request_options: Options for each request
+
+        Returns:
+            BatchResult[FileResponse]: Responses in the order of `operations`, and requests that failed
+        """
+        return await _arun_batch(
+            operations,
+            lambda operation: self._client.instance.file(
+                self.id, **operation.model_dump(exclude_none=True), request_options=request_options
+            ),
+            concurrency=concurrency,
+            retries=retries,
+            lanes=_file_operation_lanes(operations),
+            retry_if=_is_retryable_file_operation_error,
+        )
+    
+    async def read_file(
+        self,
+        path: str,
+        *,
+        encoding: Optional[str] = OMIT,
+        request_options: Optional[RequestOptions] = None,
+    ) -> IO[bytes]:
+        """Read a file without holding the response in memory.
+
+        The file's contents are streamed out of the response into a temporary file, which stays in
+        memory for small files and moves to disk for large ones.
+
+        Args:
+            path: Path of the file on the instance
+            encoding: Encoding the instance reads the file with
+            request_options: Options for the request
+
+        Returns:
+            IO[bytes]: The UTF-8 encoded contents, positioned at the start
+
+        Raises:
+            RuntimeError: If the instance could not read the file
+        """
+        async with self._client._client_wrapper.httpx_client.stream(
+            f"v1/instance/{jsonable_encoder(self.id)}/file",
+            method="POST",
+            json={"command": "read", "path": path, "encoding": encoding},
+            request_options=request_options,
+            omit=OMIT,
+        ) as response:
+            body = await _async_spooled_json(response, ["output"])
+        return _read_file(path, response, body)
+
+    async def download(
+        self,
+        path: str,
+        destination: Union[str, "os.PathLike[str]", IO[bytes]],
+        *,
+        resume: bool = True,
+        verify: bool = True,
+        chunk_size: int = DEFAULT_DOWNLOAD_CHUNK_SIZE,
+        request_options: Optional[RequestOptions] = None,
+    ) -> DownloadResponse:
+        """Download a file from the instance straight to disk.
+
+        The file is read in ranges of `chunk_size` bytes. Each range is streamed out of its response and
+        decoded into `destination` without holding the range in memory. A range whose output comes back cut off
+        is discarded and read again in smaller ranges. When `destination` is a path that already holds the start of
+        the file, and its SHA-256 matches the same bytes on the instance, the download resumes after it.
+
+        Args:
+            path: Path of the file on the instance
+            destination: Local path or binary file object to write to
+            resume: Continue an interrupted download into an existing local file instead of starting over
+            verify: Compare the SHA-256 of the local file with the file on the instance
+            chunk_size: Bytes read from the instance per request
+            request_options: Options for each request
+
+        Returns:
+            DownloadResponse: The size of the file, how much of it was resumed and its SHA-256 when verified
+
+        Raises:
+            RuntimeError: If the file can't be read or the download does not match it
+        """
+        size = _parse_file_size(path, await self._shell(_file_size_command(path)))
+        offset = _resume_offset(destination, size) if resume else 0
+        prefix = _resumed_digest(destination, offset)
+        if offset and not _matches_sha256(await self._shell(_prefix_sha256_command(path, offset)), prefix):
+            offset, prefix = 0, hashlib.sha256()  # The local file isn't a prefix of the remote one
+        with _download_target(destination, offset) as file:
+            resumed, digest = offset, prefix if verify else None
+            while offset < size:
+                length, mark = min(chunk_size, size - offset), file.tell()
+                checkpoint = digest.copy() if digest is not None else None
+                command = _read_range_command(path, offset, length)
+                async with self._client._client_wrapper.httpx_client.stream(
+                    f"v1/instance/{jsonable_encoder(self.id)}/bash",
+                    method="POST",
+                    json={"command": command},
+                    request_options=request_options,
+                ) as response:
+                    body = await _async_spooled_json(response, ["output"])
+                written = _write_range(path, command, body, file, digest)
+                if written == length:
+                    offset += written
+                else:
+                    chunk_size, digest = _shrink_range(path, file, mark, length, written), checkpoint
+        remote = _parse_sha256sum(await self._shell(f"sha256sum -- {shlex.quote(path)}")) if verify else {}
+        return _download_response(path, size, resumed, digest, remote)
+    
     async def upload(
         self,
         *,
@@ -1510,32 +2365,152 @@ class AsyncUbuntuInstance(AsyncBaseInstance):
             path=path,
             request_options=request_options,
         )
-    
-class AsyncBrowserInstance(AsyncBaseInstance):
-    def __init__(
-        self,
-        id: str,
-        launch_time: datetime,
-        status: str,
-        client: AsyncBaseClient,
-    ):
-        super().__init__(id, launch_time, status, client)
-
-    async def get_cdp_url(
-        self, request_options: Optional[RequestOptions] = None
-    ) -> BrowserGetCdpUrlResponse:
-        return await self._client.browser.get_cdp_url(
-            self.id, request_options=request_options
-        )
-    
-    async def get_current_url(
-        self, request_options: Optional[RequestOptions] = None
-    ) -> BrowserGetCurrentUrlResponse:
-        return await self._client.browser.get_current_url(
-            self.id, request_options=request_options
-        )
 
-    async def save_auth(
+    async def upload_chunked(
+        self,
+        source: UploadSource,
+        path: str,
+        *,
+        chunk_size: int = DEFAULT_UPLOAD_CHUNK_SIZE,
+        concurrency: int = DEFAULT_UPLOAD_CONCURRENCY,
+        retries: int = DEFAULT_BATCH_RETRIES,
+        request_options: Optional[RequestOptions] = None,
+    ) -> ChunkedUploadResponse:
+        """Upload a large file in chunks, resuming where an interrupted upload stopped.
+
+        Files given by path are memory-mapped rather than read, and only `concurrency` chunks are held
+        in memory at a time. Chunks are uploaded in parallel next to `path`, verified against their
+        SHA-256 on the instance and concatenated once all of them match. Chunks that fail to upload or
+        verify are sent again, the others are not. Chunks left by an earlier upload of the same content
+        are verified and reused.
+
+        Args:
+            source: Local file path, or the contents as bytes or a memory map
+            path: Destination path on the instance
+            chunk_size: Size of each chunk in bytes
+            concurrency: Maximum number of chunks uploaded at once
+            retries: Attempts per chunk for rate limits, server errors and connection errors, and rounds
+                of re-sending chunks that fail verification
+            request_options: Options for each request
+
+        Returns:
+            ChunkedUploadResponse: Size and SHA-256 of the file, and how many chunks were skipped or resent
+
+        Raises:
+            RuntimeError: If chunks still fail verification after `retries` rounds, or the assembled file does not match
+        """
+        with _upload_source(source) as data:
+            size, (chunks, digest) = len(data), _plan_chunks(data, chunk_size)
+            parts = _upload_parts_dir(path, digest, chunk_size)
+            remote = _parse_sha256sum(await self._shell(_list_parts_command(parts, create=True)))
+            pending = [chunk for chunk in chunks if remote.get(chunk.name) != chunk.sha256]
+            skipped, resent = len(chunks) - len(pending), 0
+
+            async def upload(chunk: _Chunk) -> UploadResponse:
+                return await self._client.instance.upload(
+                    self.id,
+                    file=(chunk.name, bytes(data[chunk.offset : chunk.offset + chunk.length])),
+                    path=f"{parts}/{chunk.name}",
+                    request_options=request_options,
+                )
+
+            for attempt in itertools.count():
+                batch = await _arun_batch(pending, upload, concurrency=concurrency, retries=retries)
+                if batch.failures:
+                    raise batch.failures[0].error
+                remote = _parse_sha256sum(await self._shell(_list_parts_command(parts)))
+                pending = [chunk for chunk in pending if remote.get(chunk.name) != chunk.sha256]
+                if not pending:
+                    break
+                if attempt >= retries:
+                    raise RuntimeError(f"{len(pending)} chunks of {path} failed verification after {retries} retries")
+                resent += len(pending)
+
+        assembled = _parse_sha256sum(await self._shell(_assemble_parts_command(parts, path)))
+        return _chunked_upload_response(path, size, digest, chunks, assembled, skipped, resent)
+
+    async def sync_dir(
+        self,
+        local_path: Union[str, "os.PathLike[str]"],
+        remote_path: str,
+        *,
+        delete: bool = False,
+        chunked_threshold: int = DEFAULT_UPLOAD_CHUNK_SIZE,
+        request_options: Optional[RequestOptions] = None,
+    ) -> DirectorySyncResponse:
+        """Make a directory on the instance match a local one, uploading only files that changed.
+
+        Local files are compared by SHA-256 against a manifest built with `sha256sum` on the instance.
+        Changed files smaller than `chunked_threshold` are packed into one gzipped tar upload, larger
+        ones are sent with `upload_chunked`.
+
+        Args:
+            local_path: Local directory to upload
+            remote_path: Directory on the instance, created if missing
+            delete: Remove files from the instance that don't exist locally
+            chunked_threshold: Size in bytes from which a file is uploaded on its own in chunks
+            request_options: Options for each request
+
+        Returns:
+            DirectorySyncResponse: Files uploaded and deleted, and the bytes saved by skipping unchanged files
+        """
+        local = _local_manifest(local_path)
+        remote = _parse_sha256sum(await self._shell(_remote_manifest_command(remote_path)))
+        changed = [name for name, (digest, _) in local.items() if remote.get(name) != digest]
+        small = [name for name in changed if local[name][1] < chunked_threshold]
+        uploaded_bytes = 0
+
+        if small:
+            archive_path = f"/tmp/scrapybara-sync-{uuid.uuid4().hex}.tar.gz"
+            with _pack_files(local_path, small) as (archive, archive_size):
+                await self._client.instance.upload(
+                    self.id, file=("sync.tar.gz", archive), path=archive_path, request_options=request_options
+                )
+            uploaded_bytes += archive_size
+            await self._shell(_unpack_command(archive_path, remote_path))
+        for name in changed:
+            if name not in small:
+                await self.upload_chunked(
+                    os.path.join(local_path, name),
+                    posixpath.join(remote_path, name),
+                    chunk_size=chunked_threshold,
+                    request_options=request_options,
+                )
+                uploaded_bytes += local[name][1]
+
+        deleted = sorted(set(remote) - set(local)) if delete else []
+        for command in _delete_commands(remote_path, deleted):
+            await self._shell(command)
+        return _directory_sync_response(local, changed, deleted, uploaded_bytes)
+
+    async def _shell(self, command: str) -> str:
+        return _shell_output(await self._client.instance.bash(self.id, command=command), command)
+    
+class AsyncBrowserInstance(AsyncBaseInstance):
+    def __init__(
+        self,
+        id: str,
+        launch_time: datetime,
+        status: str,
+        client: AsyncBaseClient,
+    ):
+        super().__init__(id, launch_time, status, client)
+
+    async def get_cdp_url(
+        self, request_options: Optional[RequestOptions] = None
+    ) -> BrowserGetCdpUrlResponse:
+        return await self._client.browser.get_cdp_url(
+            self.id, request_options=request_options
+        )
+    
+    async def get_current_url(
+        self, request_options: Optional[RequestOptions] = None
+    ) -> BrowserGetCurrentUrlResponse:
+        return await self._client.browser.get_current_url(
+            self.id, request_options=request_options
+        )
+
+    async def save_auth(
         self,
         *,
         name: Optional[str] = None,
@@ -1590,20 +2565,52 @@ class Scrapybara:
         timeout: Optional[float] = None,
         follow_redirects: Optional[bool] = True,
         httpx_client: Optional[httpx.Client] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_connections: Optional[int] = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: Optional[int] = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: Optional[float] = DEFAULT_KEEPALIVE_EXPIRY,
+        http2: bool = False,
+        request_compression: Optional[RequestCompression] = None,
+        request_compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD_BYTES,
     ):
+        # Pool options only apply to the client built here, a custom httpx client keeps its own configuration
+        self._limits: Optional[httpx.Limits] = None
+        if httpx_client is None:
+            if http2:
+                _require_h2()
+            self._limits = httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            )
+            httpx_client = httpx.Client(
+                timeout=timeout if timeout is not None else 600,
+                follow_redirects=bool(follow_redirects),
+                limits=self._limits,
+                http2=http2,
+            )
         self._base_client = BaseClient(
             base_url=base_url,
             environment=environment,
             api_key=api_key,
-            timeout=timeout,
+            timeout=timeout if timeout is not None else 600 if self._limits is not None else None,
             follow_redirects=follow_redirects,
             httpx_client=httpx_client,
         )
+        self._base_client._client_wrapper.httpx_client.rate_limiter = rate_limiter
+        self._base_client._client_wrapper.httpx_client.compression = request_compression
+        self._base_client._client_wrapper.httpx_client.compression_threshold = request_compression_threshold
 
     @property
     def httpx_client(self) -> HttpClient:
         return self._base_client._client_wrapper.httpx_client
 
+    def pool_stats(self) -> ConnectionPoolStats:
+        """
+        Returns a snapshot of the connection pool used by this client.
+        """
+        return _connection_pool_stats(self.httpx_client.httpx_client, self._limits)
+
     def start_ubuntu(
         self,
         *,
@@ -1729,6 +2736,111 @@ class Scrapybara:
                 )
         return instances
 
+    def start_many(
+        self,
+        n: int,
+        *,
+        instance_type: Literal["ubuntu", "browser", "windows"] = "ubuntu",
+        timeout_hours: Optional[float] = OMIT,
+        blocked_domains: Optional[Sequence[str]] = OMIT,
+        resolution: Optional[Sequence[int]] = OMIT,
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        retries: int = DEFAULT_BATCH_RETRIES,
+        request_options: Optional[RequestOptions] = None,
+    ) -> BatchResult[Union[UbuntuInstance, BrowserInstance, WindowsInstance]]:
+        """Start n instances, at most `concurrency` at a time.
+
+        A start is only retried after errors that show the request never reached the server: rate limiting,
+        failing to connect and waiting too long for a pooled connection. Retrying after a server error or a
+        read timeout could start a second instance for a start that succeeded, which would keep running
+        without being in the result.
+
+        Args:
+            n: Number of instances to start
+            instance_type: Type of instance to start
+            timeout_hours: Passed to each start
+            blocked_domains: Passed to each start, ignored for Windows
+            resolution: Passed to each start, ignored for Windows
+            concurrency: Maximum number of requests in flight
+            retries: Retries per start after rate limiting and connection errors
+            request_options: Passed to each request
+
+        Returns:
+            A BatchResult with the started instances in order, failed starts are reported in `failures`
+        """
+
+        def start(_: int) -> Union[UbuntuInstance, BrowserInstance, WindowsInstance]:
+            if instance_type == "ubuntu":
+                return self.start_ubuntu(
+                    timeout_hours=timeout_hours,
+                    blocked_domains=blocked_domains,
+                    resolution=resolution,
+                    request_options=request_options,
+                )
+            if instance_type == "browser":
+                return self.start_browser(
+                    timeout_hours=timeout_hours,
+                    blocked_domains=blocked_domains,
+                    resolution=resolution,
+                    request_options=request_options,
+                )
+            return self.start_windows(timeout_hours=timeout_hours, request_options=request_options)
+
+        return _run_batch(
+            list(range(n)), start, concurrency=concurrency, retries=retries, retry_if=_is_unsent_start_error
+        )
+
+    def stop_many(
+        self,
+        instance_ids: Sequence[str],
+        *,
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        retries: int = DEFAULT_BATCH_RETRIES,
+        request_options: Optional[RequestOptions] = None,
+    ) -> BatchResult[StopInstanceResponse]:
+        """Stop instances by id, at most `concurrency` at a time. Failures are reported per instance."""
+        return _run_batch(
+            instance_ids,
+            lambda instance_id: self._base_client.instance.stop(instance_id, request_options=request_options),
+            concurrency=concurrency,
+            retries=retries,
+        )
+
+    def pause_many(
+        self,
+        instance_ids: Sequence[str],
+        *,
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        retries: int = DEFAULT_BATCH_RETRIES,
+        request_options: Optional[RequestOptions] = None,
+    ) -> BatchResult[StopInstanceResponse]:
+        """Pause instances by id, at most `concurrency` at a time. Failures are reported per instance."""
+        return _run_batch(
+            instance_ids,
+            lambda instance_id: self._base_client.instance.pause(instance_id, request_options=request_options),
+            concurrency=concurrency,
+            retries=retries,
+        )
+
+    def resume_many(
+        self,
+        instance_ids: Sequence[str],
+        *,
+        timeout_hours: Optional[float] = None,
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        retries: int = DEFAULT_BATCH_RETRIES,
+        request_options: Optional[RequestOptions] = None,
+    ) -> BatchResult[GetInstanceResponse]:
+        """Resume instances by id, at most `concurrency` at a time. Failures are reported per instance."""
+        return _run_batch(
+            instance_ids,
+            lambda instance_id: self._base_client.instance.resume(
+                instance_id, timeout_hours=timeout_hours, request_options=request_options
+            ),
+            concurrency=concurrency,
+            retries=retries,
+        )
+
     def get_auth_states(
         self,
         *,
@@ -1752,6 +2864,10 @@ class Scrapybara:
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
         images_to_keep: Optional[int] = 4,
+        dedupe_screenshots: Optional[int] = None,
+        screenshot_options: Optional[ScreenshotOptions] = None,
+        tool_concurrency: Optional[int] = None,
+        pipeline: bool = False,
         request_options: Optional[RequestOptions] = None,
     ) -> ActResponse[SchemaT]:
         """
@@ -1770,6 +2886,10 @@ class Scrapybara:
             temperature: Optional temperature parameter for the model
             max_tokens: Optional max tokens parameter for the model
             images_to_keep: Optional maximum number of most recent images to retain in messages and model call, defaults to 4
+            dedupe_screenshots: Optional maximum perceptual hash distance at which a screenshot counts as unchanged from the previous one and is replaced by a text marker, 0 only matches identical screenshots, disabled by default
+            screenshot_options: Optional downscaling and re-encoding applied to tool result screenshots before they are sent to the model
+            tool_concurrency: Optional maximum number of tool calls from one step to execute concurrently, tools marked as sequential still run in order, defaults to executing one at a time
+            pipeline: Whether to encode the next model request on a background thread while tool calls run, lowering per-step latency on CPU-constrained workers
             request_options: Optional request configuration
 
         Returns:
@@ -1783,6 +2903,7 @@ class Scrapybara:
 
         if messages:
             result_messages.extend(messages)
+        ledger = _ImageLedger(result_messages)
 
         for step in self.act_stream(
             model=model,
@@ -1797,6 +2918,10 @@ class Scrapybara:
             temperature=temperature,
             max_tokens=max_tokens,
             images_to_keep=images_to_keep,
+            dedupe_screenshots=dedupe_screenshots,
+            screenshot_options=screenshot_options,
+            tool_concurrency=tool_concurrency,
+            pipeline=pipeline,
             request_options=request_options,
         ):
             steps.append(step)
@@ -1812,6 +2937,7 @@ class Scrapybara:
             if step.tool_results:
                 tool_msg = ToolMessage(content=step.tool_results)
                 result_messages.append(tool_msg)
+                ledger.track(tool_msg)
 
             if step.usage:
                 total_prompt_tokens += step.usage.prompt_tokens
@@ -1835,12 +2961,64 @@ class Scrapybara:
                 total_tokens=total_tokens,
             )
 
-        _filter_images(result_messages, images_to_keep or 4)
+        ledger.prune(images_to_keep or 4)
 
         return ActResponse(
             messages=result_messages, steps=steps, text=text, output=output, usage=usage
         )
 
+    def act_many(
+        self,
+        tasks: Sequence[ActTask],
+        *,
+        concurrency: int = DEFAULT_ACT_CONCURRENCY,
+        request_options: Optional[RequestOptions] = None,
+    ) -> Generator[ActManyResult, None, None]:
+        """
+        Run many independent agent loops concurrently on a thread pool, yielding each result as it finishes.
+
+        All loops share this client's connection pool and rate limiter. A failing task does not stop the
+        others, its exception is reported on its result.
+
+        Args:
+            tasks: Agent loops to run, each with its own model, prompt and tools
+            concurrency: Maximum number of agent loops running at once
+            request_options: Optional request configuration for every model call
+
+        Returns:
+            Generator of ActManyResult in completion order, each carrying the run's aggregate throughput and token usage
+        """
+        stats = ActManyStats()
+        started = time.monotonic()
+
+        def run(index: int) -> Tuple[int, Optional[ActResponse[Any]], Optional[BaseException], float]:
+            task_started = time.monotonic()
+            try:
+                response: ActResponse[Any] = self.act(
+                    **_act_task_kwargs(tasks[index]), request_options=request_options
+                )
+            except Exception as e:
+                return index, None, e, time.monotonic() - task_started
+            return index, response, None, time.monotonic() - task_started
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(tasks) or 1)))
+        futures = [executor.submit(run, index) for index in range(len(tasks))]
+        try:
+            for future in as_completed(futures):
+                index, response, error, elapsed = future.result()
+                yield ActManyResult(
+                    index=index,
+                    response=response,
+                    error=error,
+                    elapsed=elapsed,
+                    stats=_record_act_result(stats, response, started),
+                )
+        finally:
+            # Tasks that have not started yet are dropped when the caller stops iterating early
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
     def act_stream(
         self,
         *,
@@ -1856,6 +3034,10 @@ class Scrapybara:
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
         images_to_keep: Optional[int] = 4,
+        dedupe_screenshots: Optional[int] = None,
+        screenshot_options: Optional[ScreenshotOptions] = None,
+        tool_concurrency: Optional[int] = None,
+        pipeline: bool = False,
         request_options: Optional[RequestOptions] = None,
     ) -> Generator[Step, None, None]:
         """
@@ -1874,11 +3056,17 @@ class Scrapybara:
             temperature: Optional temperature parameter for the model
             max_tokens: Optional max tokens parameter for the model
             images_to_keep: Optional maximum number of most recent images to retain in messages and model call, defaults to 4
+            dedupe_screenshots: Optional maximum perceptual hash distance at which a screenshot counts as unchanged from the previous one and is replaced by a text marker, 0 only matches identical screenshots, disabled by default
+            screenshot_options: Optional downscaling and re-encoding applied to tool result screenshots before they are sent to the model
+            tool_concurrency: Optional maximum number of tool calls from one step to execute concurrently, tools marked as sequential still run in order, defaults to executing one at a time
+            pipeline: Whether to encode the next model request on a background thread while tool calls run, lowering per-step latency on CPU-constrained workers
             request_options: Optional request configuration
 
         Yields:
             Steps from the conversation, including tool results
         """
+        screenshots = _ScreenshotPipeline(options=screenshot_options, dedupe_threshold=dedupe_screenshots)
+
         current_messages: List[Message] = []
         if messages is None:
             if prompt is None:
@@ -1936,27 +3124,34 @@ class Scrapybara:
                             # For OpenAI prompts, simply append the structured output section
                             system = system + STRUCTURED_OUTPUT_SECTION
 
+        encoder = _ActRequestEncoder()
+        ledger = _ImageLedger(current_messages)
+        prepared: Optional["Future[List[ApiTool]]"] = None
+
         while True:
-            # Convert tools to ApiTools
-            api_tools = [ApiTool.from_tool(tool) for tool in current_tools]
+            # Convert tools to ApiTools, pipelined loops already did this while the previous step's tools ran
+            if prepared is None:
+                api_tools = _api_tools(current_tools)
+            else:
+                api_tools = prepared.result()
+                prepared = None
             
-            _filter_images(current_messages, images_to_keep or 4)
-
-            request = SingleActRequest(
-                model=model,
-                system=system,
-                messages=current_messages,
-                tools=api_tools,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
+            encoder.invalidate(ledger.prune(images_to_keep or 4))
 
             response = self.httpx_client.request(
                 "v1/act",
                 method="POST",
-                json=request.model_dump(exclude_none=True),
+                content=encoder.encode(
+                    model=model,
+                    system=system,
+                    messages=current_messages,
+                    tools=api_tools,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    request_options=request_options,
+                ),
                 headers={"content-type": "application/json"},
-                request_options=request_options,
+                request_options=_without_body_parameters(request_options),
             )
 
             if not 200 <= response.status_code < 300:
@@ -2003,32 +3198,36 @@ class Scrapybara:
             has_structured_output = False
 
             if has_tool_calls:
-                tool_results: List[ToolResultPart] = []
+                calls: List[Tuple[Tool, ToolCallPart]] = []
                 for part in tool_calls:
                     tool = next(t for t in current_tools if t.name == part.tool_name)
-                    try:
-                        if tool.name == "structured_output" and schema:
-                            has_structured_output = True
-                        result = tool(**part.args)
-                        tool_results.append(
-                            ToolResultPart(
-                                tool_call_id=part.tool_call_id,
-                                tool_name=part.tool_name,
-                                result=result,
-                            )
-                        )
-                    except Exception as e:
-                        tool_results.append(
-                            ToolResultPart(
-                                tool_call_id=part.tool_call_id,
-                                tool_name=part.tool_name,
-                                result=str(e),
-                                is_error=True,
-                            )
+                    if tool.name == "structured_output" and schema:
+                        has_structured_output = True
+                    calls.append((tool, screenshots.scale_call(tool, part)))
+
+                if pipeline and not has_structured_output:
+                    prepared = _prefetch_executor().submit(
+                        _prepare_next_step,
+                        encoder,
+                        list(current_messages),
+                        _stable_prefix(current_messages, ledger.at_risk(images_to_keep or 4, len(calls))),
+                        current_tools,
+                    )
+
+                tool_results: List[ToolResultPart] = []
+                for (tool, part), (result, is_error) in zip(calls, _execute_tool_calls(calls, tool_concurrency)):
+                    tool_results.append(
+                        ToolResultPart(
+                            tool_call_id=part.tool_call_id,
+                            tool_name=part.tool_name,
+                            result=result if is_error else screenshots.process(result, tool),
+                            is_error=is_error,
                         )
+                    )
                 step.tool_results = tool_results
                 tool_message = ToolMessage(content=tool_results)
                 current_messages.append(tool_message)
+                ledger.track(tool_message)
                 if on_tool_message:
                     on_tool_message(tool_message)
 
@@ -2050,20 +3249,52 @@ class AsyncScrapybara:
         timeout: Optional[float] = None,
         follow_redirects: Optional[bool] = True,
         httpx_client: Optional[httpx.AsyncClient] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        max_connections: Optional[int] = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: Optional[int] = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: Optional[float] = DEFAULT_KEEPALIVE_EXPIRY,
+        http2: bool = False,
+        request_compression: Optional[RequestCompression] = None,
+        request_compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD_BYTES,
     ):
+        # Pool options only apply to the client built here, a custom httpx client keeps its own configuration
+        self._limits: Optional[httpx.Limits] = None
+        if httpx_client is None:
+            if http2:
+                _require_h2()
+            self._limits = httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            )
+            httpx_client = httpx.AsyncClient(
+                timeout=timeout if timeout is not None else 600,
+                follow_redirects=bool(follow_redirects),
+                limits=self._limits,
+                http2=http2,
+            )
         self._base_client = AsyncBaseClient(
             base_url=base_url,
             environment=environment,
             api_key=api_key,
-            timeout=timeout,
+            timeout=timeout if timeout is not None else 600 if self._limits is not None else None,
             follow_redirects=follow_redirects,
             httpx_client=httpx_client,
         )
+        self._base_client._client_wrapper.httpx_client.rate_limiter = rate_limiter
+        self._base_client._client_wrapper.httpx_client.compression = request_compression
+        self._base_client._client_wrapper.httpx_client.compression_threshold = request_compression_threshold
 
     @property
     def httpx_client(self) -> AsyncHttpClient:
         return self._base_client._client_wrapper.httpx_client
 
+    def pool_stats(self) -> ConnectionPoolStats:
+        """
+        Returns a snapshot of the connection pool used by this client.
+        """
+        return _connection_pool_stats(self.httpx_client.httpx_client, self._limits)
+
     async def start_ubuntu(
         self,
         *,
@@ -2195,6 +3426,111 @@ class AsyncScrapybara:
                 )
         return instances
 
+    async def start_many(
+        self,
+        n: int,
+        *,
+        instance_type: Literal["ubuntu", "browser", "windows"] = "ubuntu",
+        timeout_hours: Optional[float] = OMIT,
+        blocked_domains: Optional[Sequence[str]] = OMIT,
+        resolution: Optional[Sequence[int]] = OMIT,
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        retries: int = DEFAULT_BATCH_RETRIES,
+        request_options: Optional[RequestOptions] = None,
+    ) -> BatchResult[Union[AsyncUbuntuInstance, AsyncBrowserInstance, AsyncWindowsInstance]]:
+        """Start n instances, at most `concurrency` at a time.
+
+        A start is only retried after errors that show the request never reached the server: rate limiting,
+        failing to connect and waiting too long for a pooled connection. Retrying after a server error or a
+        read timeout could start a second instance for a start that succeeded, which would keep running
+        without being in the result.
+
+        Args:
+            n: Number of instances to start
+            instance_type: Type of instance to start
+            timeout_hours: Passed to each start
+            blocked_domains: Passed to each start, ignored for Windows
+            resolution: Passed to each start, ignored for Windows
+            concurrency: Maximum number of requests in flight
+            retries: Retries per start after rate limiting and connection errors
+            request_options: Passed to each request
+
+        Returns:
+            A BatchResult with the started instances in order, failed starts are reported in `failures`
+        """
+
+        async def start(_: int) -> Union[AsyncUbuntuInstance, AsyncBrowserInstance, AsyncWindowsInstance]:
+            if instance_type == "ubuntu":
+                return await self.start_ubuntu(
+                    timeout_hours=timeout_hours,
+                    blocked_domains=blocked_domains,
+                    resolution=resolution,
+                    request_options=request_options,
+                )
+            if instance_type == "browser":
+                return await self.start_browser(
+                    timeout_hours=timeout_hours,
+                    blocked_domains=blocked_domains,
+                    resolution=resolution,
+                    request_options=request_options,
+                )
+            return await self.start_windows(timeout_hours=timeout_hours, request_options=request_options)
+
+        return await _arun_batch(
+            list(range(n)), start, concurrency=concurrency, retries=retries, retry_if=_is_unsent_start_error
+        )
+
+    async def stop_many(
+        self,
+        instance_ids: Sequence[str],
+        *,
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        retries: int = DEFAULT_BATCH_RETRIES,
+        request_options: Optional[RequestOptions] = None,
+    ) -> BatchResult[StopInstanceResponse]:
+        """Stop instances by id, at most `concurrency` at a time. Failures are reported per instance."""
+        return await _arun_batch(
+            instance_ids,
+            lambda instance_id: self._base_client.instance.stop(instance_id, request_options=request_options),
+            concurrency=concurrency,
+            retries=retries,
+        )
+
+    async def pause_many(
+        self,
+        instance_ids: Sequence[str],
+        *,
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        retries: int = DEFAULT_BATCH_RETRIES,
+        request_options: Optional[RequestOptions] = None,
+    ) -> BatchResult[StopInstanceResponse]:
+        """Pause instances by id, at most `concurrency` at a time. Failures are reported per instance."""
+        return await _arun_batch(
+            instance_ids,
+            lambda instance_id: self._base_client.instance.pause(instance_id, request_options=request_options),
+            concurrency=concurrency,
+            retries=retries,
+        )
+
+    async def resume_many(
+        self,
+        instance_ids: Sequence[str],
+        *,
+        timeout_hours: Optional[float] = None,
+        concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+        retries: int = DEFAULT_BATCH_RETRIES,
+        request_options: Optional[RequestOptions] = None,
+    ) -> BatchResult[GetInstanceResponse]:
+        """Resume instances by id, at most `concurrency` at a time. Failures are reported per instance."""
+        return await _arun_batch(
+            instance_ids,
+            lambda instance_id: self._base_client.instance.resume(
+                instance_id, timeout_hours=timeout_hours, request_options=request_options
+            ),
+            concurrency=concurrency,
+            retries=retries,
+        )
+
     async def get_auth_states(
         self,
         *,
@@ -2220,6 +3556,10 @@ class AsyncScrapybara:
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
         images_to_keep: Optional[int] = 4,
+        dedupe_screenshots: Optional[int] = None,
+        screenshot_options: Optional[ScreenshotOptions] = None,
+        tool_concurrency: Optional[int] = None,
+        pipeline: bool = False,
         request_options: Optional[RequestOptions] = None,
     ) -> ActResponse[SchemaT]:
         """
@@ -2238,6 +3578,10 @@ class AsyncScrapybara:
             temperature: Optional temperature parameter for the model
             max_tokens: Optional max tokens parameter for the model
             images_to_keep: Optional maximum number of most recent images to retain in messages and model call, defaults to 4
+            dedupe_screenshots: Optional maximum perceptual hash distance at which a screenshot counts as unchanged from the previous one and is replaced by a text marker, 0 only matches identical screenshots, disabled by default
+            screenshot_options: Optional downscaling and re-encoding applied to tool result screenshots before they are sent to the model
+            tool_concurrency: Optional maximum number of tool calls from one step to execute concurrently, tools marked as sequential still run in order, defaults to executing one at a time
+            pipeline: Whether to encode the next model request on a background thread while tool calls run, lowering per-step latency on CPU-constrained workers
             request_options: Optional request configuration
 
         Returns:
@@ -2251,6 +3595,7 @@ class AsyncScrapybara:
 
         if messages:
             result_messages.extend(messages)
+        ledger = _ImageLedger(result_messages)
 
         async for step in self.act_stream(
             tools=tools,
@@ -2265,6 +3610,10 @@ class AsyncScrapybara:
             temperature=temperature,
             max_tokens=max_tokens,
             images_to_keep=images_to_keep,
+            dedupe_screenshots=dedupe_screenshots,
+            screenshot_options=screenshot_options,
+            tool_concurrency=tool_concurrency,
+            pipeline=pipeline,
             request_options=request_options,
         ):
             steps.append(step)
@@ -2280,6 +3629,7 @@ class AsyncScrapybara:
             if step.tool_results:
                 tool_msg = ToolMessage(content=step.tool_results)
                 result_messages.append(tool_msg)
+                ledger.track(tool_msg)
 
             if step.usage:
                 total_prompt_tokens += step.usage.prompt_tokens
@@ -2303,12 +3653,64 @@ class AsyncScrapybara:
                 total_tokens=total_tokens,
             )
 
-        _filter_images(result_messages, images_to_keep or 4)
+        ledger.prune(images_to_keep or 4)
 
         return ActResponse(
             messages=result_messages, steps=steps, text=text, output=output, usage=usage
         )
 
+    async def act_many(
+        self,
+        tasks: Sequence[ActTask],
+        *,
+        concurrency: int = DEFAULT_ACT_CONCURRENCY,
+        request_options: Optional[RequestOptions] = None,
+    ) -> AsyncGenerator[ActManyResult, None]:
+        """
+        Run many independent agent loops concurrently as tasks, yielding each result as it finishes.
+
+        All loops share this client's connection pool and rate limiter. A failing task does not stop the
+        others, its exception is reported on its result.
+
+        Args:
+            tasks: Agent loops to run, each with its own model, prompt and tools
+            concurrency: Maximum number of agent loops running at once
+            request_options: Optional request configuration for every model call
+
+        Returns:
+            AsyncGenerator of ActManyResult in completion order, each carrying the run's aggregate throughput and token usage
+        """
+        stats = ActManyStats()
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run(index: int) -> Tuple[int, Optional[ActResponse[Any]], Optional[BaseException], float]:
+            async with semaphore:
+                task_started = time.monotonic()
+                try:
+                    response: ActResponse[Any] = await self.act(
+                        **_act_task_kwargs(tasks[index]), request_options=request_options
+                    )
+                except Exception as e:
+                    return index, None, e, time.monotonic() - task_started
+                return index, response, None, time.monotonic() - task_started
+
+        pending = [asyncio.ensure_future(run(index)) for index in range(len(tasks))]
+        try:
+            for next_done in asyncio.as_completed(pending):
+                index, response, error, elapsed = await next_done
+                yield ActManyResult(
+                    index=index,
+                    response=response,
+                    error=error,
+                    elapsed=elapsed,
+                    stats=_record_act_result(stats, response, started),
+                )
+        finally:
+            # Loops still running are cancelled when the caller stops iterating early
+            for task in pending:
+                task.cancel()
+
     async def act_stream(
         self,
         *,
@@ -2324,6 +3726,10 @@ class AsyncScrapybara:
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
         images_to_keep: Optional[int] = 4,
+        dedupe_screenshots: Optional[int] = None,
+        screenshot_options: Optional[ScreenshotOptions] = None,
+        tool_concurrency: Optional[int] = None,
+        pipeline: bool = False,
         request_options: Optional[RequestOptions] = None,
     ) -> AsyncGenerator[Step, None]:
         """
@@ -2342,11 +3748,17 @@ class AsyncScrapybara:
             temperature: Optional temperature parameter for the model
             max_tokens: Optional max tokens parameter for the model
             images_to_keep: Optional maximum number of most recent images to retain in messages and model call, defaults to 4
+            dedupe_screenshots: Optional maximum perceptual hash distance at which a screenshot counts as unchanged from the previous one and is replaced by a text marker, 0 only matches identical screenshots, disabled by default
+            screenshot_options: Optional downscaling and re-encoding applied to tool result screenshots before they are sent to the model
+            tool_concurrency: Optional maximum number of tool calls from one step to execute concurrently, tools marked as sequential still run in order, defaults to executing one at a time
+            pipeline: Whether to encode the next model request on a background thread while tool calls run, lowering per-step latency on CPU-constrained workers
             request_options: Optional request configuration
 
         Yields:
             Steps from the conversation, including tool results
         """
+        screenshots = _ScreenshotPipeline(options=screenshot_options, dedupe_threshold=dedupe_screenshots)
+
         current_messages: List[Message] = []
         if messages is None:
             if prompt is None:
@@ -2404,27 +3816,34 @@ class AsyncScrapybara:
                             # For OpenAI prompts, simply append the structured output section
                             system = system + STRUCTURED_OUTPUT_SECTION
 
+        encoder = _ActRequestEncoder()
+        ledger = _ImageLedger(current_messages)
+        prepared: Optional["asyncio.Future[List[ApiTool]]"] = None
+
         while True:
-            # Convert tools to ApiTools
-            api_tools = [ApiTool.from_tool(tool) for tool in current_tools]
-
-            _filter_images(current_messages, images_to_keep or 4)
-
-            request = SingleActRequest(
-                model=model,
-                system=system,
-                messages=current_messages,
-                tools=api_tools,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
+            # Convert tools to ApiTools, pipelined loops already did this while the previous step's tools ran
+            if prepared is None:
+                api_tools = _api_tools(current_tools)
+            else:
+                api_tools = await prepared
+                prepared = None
+
+            encoder.invalidate(ledger.prune(images_to_keep or 4))
 
             response = await self.httpx_client.request(
                 "v1/act",
                 method="POST",
-                json=request.model_dump(exclude_none=True),
+                content=encoder.encode(
+                    model=model,
+                    system=system,
+                    messages=current_messages,
+                    tools=api_tools,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    request_options=request_options,
+                ),
                 headers={"content-type": "application/json"},
-                request_options=request_options,
+                request_options=_without_body_parameters(request_options),
             )
 
             if not 200 <= response.status_code < 300:
@@ -2473,36 +3892,41 @@ class AsyncScrapybara:
             has_structured_output = False
 
             if has_tool_calls:
-                tool_results: List[ToolResultPart] = []
+                calls: List[Tuple[Tool, ToolCallPart]] = []
                 for part in tool_calls:
                     tool = next(t for t in current_tools if t.name == part.tool_name)
-                    try:
-                        if tool.name == "structured_output" and schema:
-                            has_structured_output = True
-                        raw_result = tool(**part.args)
-                        if inspect.isawaitable(raw_result):
-                            result = await raw_result
-                        else:
-                            result = raw_result
-                        tool_results.append(
-                            ToolResultPart(
-                                tool_call_id=part.tool_call_id,
-                                tool_name=part.tool_name,
-                                result=result,
-                            )
+                    if tool.name == "structured_output" and schema:
+                        has_structured_output = True
+                    calls.append((tool, screenshots.scale_call(tool, part)))
+
+                if pipeline and not has_structured_output:
+                    prepared = asyncio.get_running_loop().run_in_executor(
+                        _prefetch_executor(),
+                        _prepare_next_step,
+                        encoder,
+                        list(current_messages),
+                        _stable_prefix(current_messages, ledger.at_risk(images_to_keep or 4, len(calls))),
+                        current_tools,
+                    )
+
+                tool_results: List[ToolResultPart] = []
+                for (tool, part), (result, is_error) in zip(calls, await _aexecute_tool_calls(calls, tool_concurrency)):
+                    if not is_error and screenshots.enabled:
+                        result = await asyncio.get_running_loop().run_in_executor(
+                            None, screenshots.process, result, tool
                         )
-                    except Exception as e:
-                        tool_results.append(
-                            ToolResultPart(
-                                tool_call_id=part.tool_call_id,
-                                tool_name=part.tool_name,
-                                result=str(e),
-                                is_error=True,
-                            )
+                    tool_results.append(
+                        ToolResultPart(
+                            tool_call_id=part.tool_call_id,
+                            tool_name=part.tool_name,
+                            result=result,
+                            is_error=is_error,
                         )
+                    )
                 step.tool_results = tool_results
                 tool_message = ToolMessage(content=tool_results)
                 current_messages.append(tool_message)
+                ledger.track(tool_message)
                 if on_tool_message:
                     result = on_tool_message(tool_message)
                     if inspect.isawaitable(result):
@@ -2572,30 +3996,1314 @@ def _create_request_from_action(action):
     else:
         return None
 
-def _filter_images(messages: List[Message], images_to_keep: int):
+def _computer_batch_requests(actions: Sequence[ComputerBatchAction], screenshot: bool) -> List[Request]:
+    """Helper function to convert batch actions to requests, with only the last one taking a screenshot."""
+    requests: List[Request] = []
+    for i, action in enumerate(actions):
+        request = action if isinstance(action, typing.get_args(Request)) else _create_request_from_action(action)
+        if request is None:
+            raise ValueError(f"Unsupported computer action at index {i}: {action!r}")
+        if "screenshot" in type(request).model_fields:
+            request = request.model_copy(update={"screenshot": screenshot and i == len(actions) - 1})
+        requests.append(request)
+    return requests
+
+
+def _raise_for_status(response: httpx.Response) -> None:
+    """Helper function to raise the same errors as the generated clients for responses read directly."""
+    if 200 <= response.status_code < 300:
+        return
+    try:
+        body = response.json()
+    except json.JSONDecodeError:
+        raise ApiError(status_code=response.status_code, body=response.text)
+    if response.status_code == 422:
+        raise UnprocessableEntityError(typing.cast(HttpValidationError, parse_obj_as(HttpValidationError, body)))
+    raise ApiError(status_code=response.status_code, body=body)
+
+
+def _spooled_json(response: httpx.Response, spool_fields: List[str]) -> Dict[str, Any]:
+    """Helper function to parse a streamed response, spooling the large string fields instead of buffering them."""
+    if not 200 <= response.status_code < 300:
+        response.read()
+        _raise_for_status(response)
+    return parse_json_response(response, spool_fields=spool_fields)
+
+
+async def _async_spooled_json(response: httpx.Response, spool_fields: List[str]) -> Dict[str, Any]:
+    if not 200 <= response.status_code < 300:
+        await response.aread()
+        _raise_for_status(response)
+    return await async_parse_json_response(response, spool_fields=spool_fields)
+
+
+def _screenshot_payload(response: httpx.Response, body: Dict[str, Any]) -> ScreenshotPayload:
+    image: Any = body.get("base64_image")
+    if not hasattr(image, "read"):
+        raise ApiError(status_code=response.status_code, body=body)
+    # Reading a spool that stayed in memory returns its buffer without copying it
+    return ScreenshotPayload(image.read())
+
+
+def _read_file(path: str, response: httpx.Response, body: Dict[str, Any]) -> IO[bytes]:
+    if body.get("error"):
+        raise RuntimeError(f"Failed to read {path}: {body['error']}")
+    output: Any = body.get("output")
+    if output is None:
+        return io.BytesIO()
+    if not hasattr(output, "read"):
+        raise ApiError(status_code=response.status_code, body=body)
+    return output
+
+
+def _file_size_command(path: str) -> str:
+    return f"stat -c %s -- {shlex.quote(path)}"
+
+
+def _parse_file_size(path: str, output: str) -> int:
+    try:
+        return int(output.strip())
+    except ValueError:
+        raise RuntimeError(f"Could not read the size of {path}: {output.strip()}")
+
+
+def _read_range_command(path: str, offset: int, length: int) -> str:
+    # tail seeks to the offset of a regular file rather than reading up to it
+    return f"tail -c +{offset + 1} -- {shlex.quote(path)} | head -c {length} | base64 -w 0"
+
+
+def _resume_offset(destination: Union[str, "os.PathLike[str]", IO[bytes]], size: int) -> int:
+    """Helper function to find how much of a `size` byte download a local destination may already hold."""
+    if not isinstance(destination, (str, os.PathLike)) or not os.path.isfile(destination):
+        return 0
+    offset = os.path.getsize(destination)
+    return offset if offset <= size else 0
+
+
+def _prefix_sha256_command(path: str, offset: int) -> str:
+    return f"head -c {offset} -- {shlex.quote(path)} | sha256sum"
+
+
+def _matches_sha256(output: str, digest: "hashlib._Hash") -> bool:
+    return output.split()[:1] == [digest.hexdigest()]
+
+
+@contextmanager
+def _download_target(destination: Union[str, "os.PathLike[str]", IO[bytes]], offset: int) -> Iterator[IO[bytes]]:
+    """Helper function to open a download destination positioned at the offset the download starts at."""
+    if not isinstance(destination, (str, os.PathLike)):
+        yield destination
+        return
+    with open(destination, "r+b" if offset else "wb") as file:
+        file.seek(offset)
+        file.truncate()
+        yield typing.cast(IO[bytes], file)
+
+
+def _resumed_digest(destination: Union[str, "os.PathLike[str]", IO[bytes]], offset: int) -> "hashlib._Hash":
+    digest = hashlib.sha256()
+    if offset and isinstance(destination, (str, os.PathLike)):
+        with open(destination, "rb") as file:
+            for block in iter(lambda: file.read(min(1024 * 1024, offset - file.tell())), b""):
+                digest.update(block)
+    return digest
+
+
+def _write_range(
+    path: str, command: str, body: Dict[str, Any], file: IO[bytes], digest: Optional["hashlib._Hash"]
+) -> int:
+    """Helper function to decode a base64 range spooled from a bash response into `file`, returning its size."""
+    encoded: Any = body.get("output")
+    if body.get("error") or not hasattr(encoded, "read"):
+        raise RuntimeError(f"Command `{command}` failed: {body.get('error') or 'no output'}")
+    written, pending = 0, b""
+    for block in iter(lambda: encoded.read(256 * 1024), b""):
+        block = pending + block.strip()
+        cut = len(block) - len(block) % 4
+        decoded, pending = binascii.a2b_base64(block[:cut]), block[cut:]
+        file.write(decoded)
+        if digest is not None:
+            digest.update(decoded)
+        written += len(decoded)
+    return written
+
+
+def _shrink_range(path: str, file: IO[bytes], mark: int, length: int, written: int) -> int:
+    """Helper function to discard a range that came back short, returning the smaller chunk size to reread it with.
+
+    The bash endpoint may cut off a large output, so a range that decodes to fewer bytes than requested is rewound
+    out of `file` and read again in halves instead of leaving a short file behind.
     """
-    Helper function to filter base64 images in messages, keeping only the latest ones up to specified limit.
-    
-    Args:
-        messages: List of messages to filter
-        images_to_keep: Maximum number of images to keep
+    if not written or written > length:
+        raise RuntimeError(f"Reading {path} returned {written} bytes of a {length} byte range")
+    try:
+        file.seek(mark)
+        file.truncate()
+    except (OSError, ValueError):
+        raise RuntimeError(f"Reading {path} returned a truncated range and the destination can't be rewound")
+    return length // 2
+
+
+def _download_response(
+    path: str, size: int, resumed: int, digest: Optional["hashlib._Hash"], remote: Dict[str, str]
+) -> DownloadResponse:
+    if digest is None:
+        return DownloadResponse(path=path, size=size, resumed_bytes=resumed)
+    if remote.get(path) != digest.hexdigest():
+        raise RuntimeError(f"Downloaded file does not match {path}")
+    return DownloadResponse(path=path, size=size, resumed_bytes=resumed, sha256=digest.hexdigest())
+
+
+def _call_tool(tool: Tool, part: ToolCallPart) -> Tuple[Any, bool]:
+    """Helper function to execute a tool call, returning its result and whether it failed."""
+    try:
+        return tool(**part.args), False
+    except Exception as e:
+        return str(e), True
+
+
+async def _acall_tool(tool: Tool, part: ToolCallPart) -> Tuple[Any, bool]:
+    """Helper function to execute and await a tool call, returning its result and whether it failed."""
+    try:
+        result = tool(**part.args)
+        if inspect.isawaitable(result):
+            result = await result
+        return result, False
+    except Exception as e:
+        return str(e), True
+
+
+def _tool_call_lanes(calls: Sequence[Tuple[Tool, ToolCallPart]]) -> List[List[int]]:
     """
-    images_kept = 0
-    
+    Helper function to group tool calls into lanes that may run concurrently.
+
+    Calls to tools marked as `sequential` share one lane per instance the tools act on, falling back to the
+    tool's name for tools without an instance, and keep their original order. This way an edit and a bash
+    command on the same instance never race. Every other call gets a lane of its own.
+    """
+    lanes: List[List[int]] = []
+    sequential_lanes: Dict[Tuple[str, Any], List[int]] = {}
+    for index, (tool, _) in enumerate(calls):
+        if not tool.sequential:
+            lanes.append([index])
+            continue
+        instance = getattr(tool, "_instance", None)
+        key = ("instance", id(instance)) if instance is not None else ("name", tool.name)
+        if key in sequential_lanes:
+            sequential_lanes[key].append(index)
+        else:
+            sequential_lanes[key] = [index]
+            lanes.append(sequential_lanes[key])
+    return lanes
+
+
+def _file_operation_lanes(operations: Sequence[FileOperation]) -> List[List[int]]:
+    """Helper function to group file operations whose paths overlap into lanes, keeping their order.
+
+    Paths overlap when they are equal once normalized or one is a parent directory of the other, so creating a
+    directory, writing a file in it and deleting the directory run one after another.
+    """
+    parent = list(range(len(operations)))
+
+    def find(index: int) -> int:
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    def union(index: int, other: int) -> None:
+        parent[find(other)] = find(index)
+
+    owner: Dict[str, int] = {}  # An operation that touched each path
+    beneath: Dict[str, List[int]] = {}  # Operations that touched a path inside each directory
+    for index, operation in enumerate(operations):
+        for path in {posixpath.normpath(path) for path in (operation.path, operation.src, operation.dst) if path}:
+            ancestors = _posix_ancestors(path)
+            for ancestor in [path, *ancestors]:
+                if ancestor in owner:
+                    union(index, owner[ancestor])
+            for other in beneath.get(path, []):
+                union(index, other)
+            owner[path] = index
+            beneath[path] = [index]  # Everything beneath it is in this operation's lane now
+            for ancestor in ancestors:
+                beneath.setdefault(ancestor, []).append(index)
+
+    lanes: Dict[int, List[int]] = {}
+    for index in range(len(operations)):
+        lanes.setdefault(find(index), []).append(index)
+    return list(lanes.values())
+
+
+def _posix_ancestors(path: str) -> List[str]:
+    ancestors: List[str] = []
+    while True:
+        directory = posixpath.dirname(path)
+        if not directory or directory == path:
+            return ancestors
+        ancestors.append(directory)
+        path = directory
+
+
+def _execute_tool_calls(
+    calls: List[Tuple[Tool, ToolCallPart]], concurrency: Optional[int]
+) -> List[Tuple[Any, bool]]:
+    """Helper function to execute a step's tool calls on a thread pool, returning outcomes in call order."""
+    lanes = _tool_call_lanes(calls)
+    if not concurrency or concurrency <= 1 or len(lanes) <= 1:
+        return [_call_tool(tool, part) for tool, part in calls]
+
+    outcomes: List[Tuple[Any, bool]] = [(None, False)] * len(calls)
+
+    def run_lane(lane: List[int]) -> None:
+        for index in lane:
+            outcomes[index] = _call_tool(*calls[index])
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(lanes))) as executor:
+        list(executor.map(run_lane, lanes))
+    return outcomes
+
+
+async def _aexecute_tool_calls(
+    calls: List[Tuple[Tool, ToolCallPart]], concurrency: Optional[int]
+) -> List[Tuple[Any, bool]]:
+    """Helper function to execute a step's tool calls as concurrent tasks, returning outcomes in call order."""
+    lanes = _tool_call_lanes(calls)
+    if not concurrency or concurrency <= 1 or len(lanes) <= 1:
+        return [await _acall_tool(tool, part) for tool, part in calls]
+
+    outcomes: List[Tuple[Any, bool]] = [(None, False)] * len(calls)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_lane(lane: List[int]) -> None:
+        async with semaphore:
+            for index in lane:
+                outcomes[index] = await _acall_tool(*calls[index])
+
+    await asyncio.gather(*(run_lane(lane) for lane in lanes))
+    return outcomes
+
+
+def _has_image(tool_result: ToolResultPart) -> bool:
+    """Helper function to check whether a tool result still carries a base64 image."""
+    return bool(
+        tool_result
+        and hasattr(tool_result, "result")
+        and tool_result.result
+        and isinstance(tool_result.result, dict)
+        and "base_64_image" in tool_result.result
+    )
+
+
+class _ImageLedger:
+    """
+    Tracks the tool results that carry a base64 image, oldest first, as messages are appended.
+
+    Pruning keeps only the latest `images_to_keep` images and only touches the evicted entries,
+    so each step costs O(1) amortized instead of a scan over the whole message history.
+    Results whose image was already removed (e.g. by another ledger over the same messages)
+    are dropped as they reach the front of the ledger.
+    """
+
+    def __init__(self, messages: Optional[Iterable[Message]] = None) -> None:
+        self._entries: Deque[Tuple[ToolResultPart, Message]] = deque()
+        for message in messages or []:
+            self.track(message)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def track(self, message: Message) -> None:
+        if isinstance(message, ToolMessage) and message.content:
+            for tool_result in message.content:
+                if _has_image(tool_result):
+                    self._entries.append((tool_result, message))
+
+    def at_risk(self, images_to_keep: int, new_images: int) -> List[Message]:
+        """
+        The messages that `prune(images_to_keep)` could modify once up to `new_images` more images are tracked.
+        """
+        evicted = max(0, len(self._entries) + new_images - images_to_keep)
+        return [message for _, message in itertools.islice(self._entries, evicted)]
+
+    def prune(self, images_to_keep: int) -> List[Message]:
+        """
+        Remove images beyond the latest `images_to_keep`.
+
+        Returns:
+            The messages that had at least one image removed
+        """
+        modified: List[Message] = []
+        while self._entries and (len(self._entries) > images_to_keep or not _has_image(self._entries[0][0])):
+            tool_result, message = self._entries.popleft()
+            if _has_image(tool_result):
+                del tool_result.result["base_64_image"]
+                if not modified or modified[-1] is not message:
+                    modified.append(message)
+        return modified
+
+
+def _get_image(result: Any) -> Optional[str]:
+    """Helper function to read the base64 screenshot from a tool result, if it has one."""
+    image = result.get("base_64_image") if isinstance(result, dict) else getattr(result, "base_64_image", None)
+    return image if isinstance(image, str) and image else None
+
+
+def _get_output(result: Any) -> Optional[str]:
+    """Helper function to read the text output from a tool result, if it has one."""
+    output = result.get("output") if isinstance(result, dict) else getattr(result, "output", None)
+    return output if isinstance(output, str) and output else None
+
+
+def _replace_image(result: Any, **updates: Any) -> Any:
+    """Helper function to copy a tool result with its screenshot fields updated, a None value removes the field."""
+    if isinstance(result, dict):
+        updated = {**result, **updates}
+        return {key: value for key, value in updated.items() if key not in updates or value is not None}
+    # Response models are frozen, so copy them instead of mutating in place
+    return result.model_copy(update=updates)
+
+
+def _require_h2() -> None:
+    if importlib.util.find_spec("h2") is None:
+        raise ImportError("http2=True requires the h2 package, install it with `pip install httpx[http2]`")
+
+
+def _require_pillow(option: str) -> None:
+    if importlib.util.find_spec("PIL") is None:
+        raise ImportError(f"{option} requires Pillow, install it with `pip install pillow`")
+
+
+def _encode_screenshot(base_64_image: str, options: ScreenshotOptions) -> Tuple[str, Tuple[float, float]]:
+    """
+    Helper function to resize and re-encode a base64 screenshot, returning the original if that isn't smaller.
+
+    Also returns the factors from the returned image's coordinates to the original's on each axis.
+    """
+    from PIL import Image  # type: ignore
+
+    try:
+        image: Any = Image.open(io.BytesIO(base64.b64decode(base_64_image)))
+        image.load()
+    except (OSError, ValueError):
+        return base_64_image, (1.0, 1.0)
+
+    width, height = image.size
+    if options.max_edge and max(image.size) > options.max_edge:
+        image.thumbnail((options.max_edge, options.max_edge))
+    scale = (width / image.size[0], height / image.size[1])
+    if options.format == "jpeg" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    buffer = io.BytesIO()
+    if options.format == "png":
+        image.save(buffer, format="PNG", optimize=True)
+    else:
+        image.save(buffer, format=options.format.upper(), quality=options.quality)
+
+    encoded = base64.b64encode(buffer.getvalue()).decode("ascii")
+    return (encoded, scale) if len(encoded) < len(base_64_image) else (base_64_image, (1.0, 1.0))
+
+
+def _process_screenshot(result: Any, options: Optional[ScreenshotOptions]) -> Any:
+    """Helper function to apply the screenshot options to a tool result before it is sent to the model."""
+    return _process_screenshot_with_scale(result, options)[0]
+
+
+def _process_screenshot_with_scale(
+    result: Any, options: Optional[ScreenshotOptions]
+) -> Tuple[Any, Optional[Tuple[float, float]]]:
+    if options is None:
+        return result, None
+    image = _get_image(result)
+    if image is None:
+        return result, None
+    encoded, scale = _encode_screenshot(image, options)
+    return (result if encoded is image else _replace_image(result, base_64_image=encoded)), scale
+
+
+def _scale_computer_args(args: Dict[str, Any], scale: Tuple[float, float]) -> Dict[str, Any]:
+    """Helper function to map the coordinates of computer tool arguments from a downscaled screenshot to the screen."""
+
+    def point(value: Any) -> Any:
+        if not isinstance(value, list) or len(value) != 2 or not all(isinstance(v, (int, float)) for v in value):
+            return value
+        return [round(value[0] * scale[0]), round(value[1] * scale[1])]
+
+    scaled = dict(args)
+    if "coordinates" in scaled:
+        scaled["coordinates"] = point(scaled["coordinates"])
+    if isinstance(scaled.get("path"), list):
+        scaled["path"] = [point(value) for value in scaled["path"]]
+    return scaled
+
+
+def _dhash(base_64_image: str) -> Optional[int]:
+    """Helper function to compute the 64-bit difference hash of a base64 screenshot."""
+    from PIL import Image  # type: ignore
+
+    try:
+        with Image.open(io.BytesIO(base64.b64decode(base_64_image))) as image:
+            pixels = image.convert("L").resize((9, 8)).tobytes()
+    except (OSError, ValueError):
+        return None
+
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+UNCHANGED_SCREENSHOT_MARKER = "Screen unchanged since the previous screenshot."
+
+
+class _ScreenshotPipeline:
+    """
+    Applies deduplication and `ScreenshotOptions` to the tool results of a single agent loop.
+
+    A screenshot that is identical to the last one sent to the model, or within `dedupe_threshold`
+    bits of it by difference hash, is dropped and the result's output gets a short text marker instead.
+
+    The model picks coordinates on the screenshots it sees, so when `max_edge` downscales the screenshots of
+    a tool's instance, the coordinates of later computer tool calls on that instance are scaled back up.
+    """
+
+    def __init__(self, *, options: Optional[ScreenshotOptions], dedupe_threshold: Optional[int]) -> None:
+        if options is not None:
+            _require_pillow("screenshot_options")
+        if dedupe_threshold:
+            _require_pillow("dedupe_screenshots")
+        self._options = options
+        self._dedupe_threshold = dedupe_threshold
+        self._last_digest: Optional[bytes] = None
+        self._last_dhash: Optional[int] = None
+        self._scales: Dict[Any, Tuple[float, float]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self._options is not None or self._dedupe_threshold is not None
+
+    def process(self, result: Any, tool: Optional[Tool] = None) -> Any:
+        image = _get_image(result)
+        if image is None:
+            return result
+        if self._dedupe_threshold is not None and self._is_duplicate(image):
+            output = _get_output(result)
+            return _replace_image(
+                result,
+                base_64_image=None,
+                output=f"{output}\n{UNCHANGED_SCREENSHOT_MARKER}" if output else UNCHANGED_SCREENSHOT_MARKER,
+            )
+        result, scale = _process_screenshot_with_scale(result, self._options)
+        instance = getattr(tool, "_instance", None)
+        if scale is not None and instance is not None:
+            self._scales[id(instance)] = scale
+        return result
+
+    def scale_call(self, tool: Tool, part: ToolCallPart) -> ToolCallPart:
+        """Maps the coordinates of a computer tool call from the last screenshot of its instance to the screen."""
+        instance = getattr(tool, "_instance", None)
+        scale = self._scales.get(id(instance)) if instance is not None and tool.name == "computer" else None
+        if scale is None or scale == (1.0, 1.0):
+            return part
+        return part.model_copy(update={"args": _scale_computer_args(part.args, scale)})
+
+    def _is_duplicate(self, image: str) -> bool:
+        digest = hashlib.sha256(image.encode("ascii", "replace")).digest()
+        if digest == self._last_digest:
+            return True
+
+        dhash = _dhash(image) if self._dedupe_threshold else None
+        if (
+            dhash is not None
+            and self._last_dhash is not None
+            and bin(dhash ^ self._last_dhash).count("1") <= (self._dedupe_threshold or 0)
+        ):
+            return True
+
+        # Only frames that are actually sent become the reference, so slow drift is still caught
+        self._last_digest = digest
+        self._last_dhash = dhash
+        return False
+
+
+def _without_body_parameters(request_options: Optional[RequestOptions]) -> Optional[RequestOptions]:
+    """Helper function to drop additional body parameters that were already merged into a pre-encoded body."""
+    if request_options is None or "additional_body_parameters" not in request_options:
+        return request_options
+    options = request_options.copy()
+    del options["additional_body_parameters"]
+    return options
+
+
+def _dump_json(value: Any) -> bytes:
+    """Helper function to serialize a model to JSON bytes, falling back to the SDK encoder for arbitrary values."""
+    if not isinstance(value, BaseModel):
+        # Plain dict messages are validated the same way SingleActRequest would
+        value = TypeAdapter(Message).validate_python(value)
+    try:
+        return value.model_dump_json(exclude_none=True).encode()
+    except PydanticSerializationError:
+        # Tool results may hold values pydantic can't serialize on its own
+        return json.dumps(jsonable_encoder(value.model_dump(exclude_none=True))).encode()
+
+
+class _ActRequestEncoder:
+    """
+    Incrementally encodes `v1/act` request bodies for a single agent loop.
+
+    The message history only grows between steps, so the JSON for every message that was already
+    sent is cached and only newly appended messages are serialized. Messages mutated in place
+    (e.g. by `_ImageLedger.prune`) must be passed to `invalidate` so they are re-encoded on the next step.
+
+    `prefetch` additionally joins a prefix of the history that the next step will not modify, so
+    pipelined loops can do that work while tools are running.
+    """
+
+    def __init__(self) -> None:
+        self._messages: List[Message] = []
+        self._encoded: List[bytes] = []
+        self._stale: Set[int] = set()
+        self._prefix = b""
+        self._prefix_len = 0
+
+    def invalidate(self, messages: Iterable[Message]) -> None:
+        for message in messages:
+            self._stale.add(id(message))
+
+    def encode_messages(self, messages: List[Message]) -> List[bytes]:
+        for i, message in enumerate(messages):
+            if i < len(self._messages):
+                if self._messages[i] is message and id(message) not in self._stale:
+                    continue
+                self._messages[i] = message
+                self._encoded[i] = _dump_json(message)
+                if i < self._prefix_len:
+                    self._prefix, self._prefix_len = b"", 0
+            else:
+                self._messages.append(message)
+                self._encoded.append(_dump_json(message))
+        del self._messages[len(messages):]
+        del self._encoded[len(messages):]
+        if len(messages) < self._prefix_len:
+            self._prefix, self._prefix_len = b"", 0
+        self._stale.clear()
+        return self._encoded
+
+    def prefetch(self, messages: List[Message], stable: int) -> None:
+        """Encode `messages` and join the first `stable` of them ahead of the next `encode`."""
+        encoded = self.encode_messages(messages)
+        if stable > self._prefix_len:
+            joined = b",".join(encoded[self._prefix_len:stable])
+            self._prefix = self._prefix + b"," + joined if self._prefix_len else joined
+            self._prefix_len = stable
+
+    def _join_messages(self, messages: List[Message]) -> bytes:
+        encoded = self.encode_messages(messages)
+        rest = encoded[self._prefix_len:]
+        if not self._prefix_len:
+            return b"[" + b",".join(rest) + b"]"
+        if not rest:
+            return b"[" + self._prefix + b"]"
+        return b"".join((b"[", self._prefix, b",", b",".join(rest), b"]"))
+
+    def encode(
+        self,
+        *,
+        model: Model,
+        system: Optional[str],
+        messages: List[Message],
+        tools: List[ApiTool],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        request_options: Optional[RequestOptions] = None,
+    ) -> bytes:
+        """Encode a request body equivalent to `SingleActRequest(...).model_dump(exclude_none=True)`."""
+        fields: Dict[str, bytes] = {"model": _dump_json(model)}
+        if system is not None:
+            fields["system"] = json.dumps(system).encode()
+        fields["messages"] = self._join_messages(messages)
+        fields["tools"] = b"[" + b",".join(tool.json_bytes() for tool in tools) + b"]"
+        if temperature is not None:
+            fields["temperature"] = json.dumps(temperature).encode()
+        if max_tokens is not None:
+            fields["max_tokens"] = json.dumps(max_tokens).encode()
+        if request_options is not None:
+            for key, value in (jsonable_encoder(request_options.get("additional_body_parameters", {})) or {}).items():
+                fields[key] = json.dumps(value).encode()
+        return b"{" + b",".join(json.dumps(key).encode() + b":" + value for key, value in fields.items()) + b"}"
+
+
+def _connection_pool_stats(
+    httpx_client: Union[httpx.Client, httpx.AsyncClient], limits: Optional[httpx.Limits]
+) -> ConnectionPoolStats:
+    stats = ConnectionPoolStats(
+        max_connections=limits.max_connections if limits is not None else None,
+        max_keepalive_connections=limits.max_keepalive_connections if limits is not None else None,
+    )
+    # Only the default transports are backed by an httpcore pool that can be inspected
+    pool = getattr(getattr(httpx_client, "_transport", None), "_pool", None)
+    if pool is None:
+        return stats
+    for connection in list(pool.connections):
+        if connection.is_closed():
+            continue
+        stats.connections += 1
+        if connection.is_idle():
+            stats.idle += 1
+        else:
+            stats.active += 1
+        if "HTTP/2" in connection.info():
+            stats.http2 += 1
+    stats.queued = sum(1 for request in list(getattr(pool, "_requests", [])) if getattr(request, "connection", None) is None)
+    return stats
+
+
+def _is_ready(instance_id: str, status: str) -> bool:
+    if status in ("error", "terminated"):
+        raise RuntimeError(f"Instance {instance_id} is {status} and will not become ready")
+    return status == "running"
+
+
+def _poll_delay(attempt: int, initial_interval: float, max_interval: float) -> float:
+    # Equal jitter keeps concurrent waiters from polling in lockstep without collapsing the delay to zero
+    delay = min(max_interval, initial_interval * 2**attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class _StatusPoller:
+    """Polls the statuses of every instance waiting on a client from one shared schedule.
+
+    A background thread ticks while instances are waiting. Each tick sends one request, `get` for a single
+    waiter and `get_instances` for several, and wakes the waiters to read the result. Instances missing from
+    the listing are fetched directly in the same tick. A new waiter triggers a tick right away and restarts
+    the backoff from the smallest `initial_interval` of the waiters.
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._waiting: Dict[str, int] = {}
+        self._intervals: List[Tuple[float, float]] = []
+        self._joined = False
+        self._statuses: Dict[str, str] = {}
+        self._error: Optional[BaseException] = None
+        self._tick = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @contextmanager
+    def waiting(
+        self, client: BaseClient, instance_id: str, initial_interval: float, max_interval: float
+    ) -> Generator[None, None, None]:
+        interval = (initial_interval, max_interval)
+        with self._condition:
+            self._waiting[instance_id] = self._waiting.get(instance_id, 0) + 1
+            self._intervals.append(interval)
+            self._joined = True
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, args=(client,), name="scrapybara-status-poller", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify_all()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._intervals.remove(interval)
+                self._waiting[instance_id] -= 1
+                if not self._waiting[instance_id]:
+                    del self._waiting[instance_id]
+                self._condition.notify_all()
+
+    def status(self, instance_id: str, after: int, deadline: float) -> Optional[Tuple[str, int]]:
+        """Waits for the first tick after `after` that has the instance's status, or returns None at `deadline`."""
+        with self._condition:
+            while True:
+                if self._tick > after:
+                    if self._error is not None:
+                        raise self._error
+                    if instance_id in self._statuses:
+                        return self._statuses[instance_id], self._tick
+                    after = self._tick  # It started waiting while the tick was in flight, the next one follows
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+    def _run(self, client: BaseClient) -> None:
+        attempt = 0
+        with self._condition:
+            while self._waiting:
+                if self._joined:
+                    self._joined, attempt = False, 0
+                waiting = list(self._waiting)
+                initial_interval = min(interval[0] for interval in self._intervals)
+                max_interval = min(interval[1] for interval in self._intervals)
+                self._condition.release()
+                try:
+                    statuses, error = _fetch_statuses(client, waiting), None
+                except Exception as e:
+                    statuses, error = {}, e
+                finally:
+                    self._condition.acquire()
+                self._statuses, self._error = statuses, error
+                self._tick += 1
+                self._condition.notify_all()
+                if not self._joined:
+                    delay = _poll_delay(attempt, initial_interval, max_interval)
+                    attempt += 1
+                    self._condition.wait_for(lambda: self._joined or not self._waiting, delay)
+            self._thread = None
+
+
+def _fetch_statuses(client: BaseClient, waiting: List[str]) -> Dict[str, str]:
+    statuses = {}
+    if len(waiting) > 1:
+        statuses = {instance.id: instance.status for instance in client.get_instances()}
+    for instance_id in waiting:
+        if instance_id not in statuses:
+            statuses[instance_id] = client.get(instance_id).status
+    return statuses
+
+
+class _AsyncStatusPoller:
+    """Polls the statuses of every instance waiting on an async client from one shared schedule.
+
+    The async counterpart of `_StatusPoller`, ticking in a task on the running event loop.
+    """
+
+    def __init__(self) -> None:
+        self._waiting: Dict[str, int] = {}
+        self._intervals: List[Tuple[float, float]] = []
+        self._joined = False
+        self._tick = 0
+        self._next: Optional["asyncio.Future[Dict[str, str]]"] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    @contextmanager
+    def waiting(
+        self, client: AsyncBaseClient, instance_id: str, initial_interval: float, max_interval: float
+    ) -> Generator[None, None, None]:
+        interval = (initial_interval, max_interval)
+        self._waiting[instance_id] = self._waiting.get(instance_id, 0) + 1
+        self._intervals.append(interval)
+        self._joined = True
+        if self._task is None or self._task.get_loop() is not asyncio.get_running_loop():
+            self._wake, self._next = asyncio.Event(), self._future()
+            self._task = asyncio.ensure_future(self._run(client))
+        assert self._wake is not None
+        self._wake.set()
+        try:
+            yield
+        finally:
+            self._intervals.remove(interval)
+            self._waiting[instance_id] -= 1
+            if not self._waiting[instance_id]:
+                del self._waiting[instance_id]
+            self._wake.set()
+
+    async def status(self, instance_id: str, deadline: float) -> Optional[str]:
+        """Waits for the next tick that has the instance's status, or returns None at `deadline`."""
+        while True:
+            assert self._next is not None
+            try:
+                # Shielded so that a waiter timing out does not cancel the tick shared with the others
+                statuses = await asyncio.wait_for(asyncio.shield(self._next), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                return None
+            if instance_id in statuses:
+                return statuses[instance_id]
+
+    @staticmethod
+    def _future() -> "asyncio.Future[Dict[str, str]]":
+        future: "asyncio.Future[Dict[str, str]]" = asyncio.get_running_loop().create_future()
+        # Mark the exception as retrieved when every waiter has gone away
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        return future
+
+    async def _run(self, client: AsyncBaseClient) -> None:
+        assert self._wake is not None
+        attempt = 0
+        try:
+            while self._waiting:
+                if self._joined:
+                    self._joined, attempt = False, 0
+                waiting = list(self._waiting)
+                initial_interval = min(interval[0] for interval in self._intervals)
+                max_interval = min(interval[1] for interval in self._intervals)
+                current, self._next = self._next, self._future()
+                assert current is not None
+                try:
+                    current.set_result(await _async_fetch_statuses(client, waiting))
+                except Exception as e:
+                    current.set_exception(e)
+                self._tick += 1
+                if not self._joined:
+                    delay = _poll_delay(attempt, initial_interval, max_interval)
+                    attempt += 1
+                    self._wake.clear()
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self._task = None
+
+
+async def _async_fetch_statuses(client: AsyncBaseClient, waiting: List[str]) -> Dict[str, str]:
+    statuses = {}
+    if len(waiting) > 1:
+        statuses = {instance.id: instance.status for instance in await client.get_instances()}
+    for instance_id in waiting:
+        if instance_id not in statuses:
+            statuses[instance_id] = (await client.get(instance_id)).status
+    return statuses
+
+
+_status_pollers: "weakref.WeakKeyDictionary[BaseClient, _StatusPoller]" = weakref.WeakKeyDictionary()
+_async_status_pollers: "weakref.WeakKeyDictionary[AsyncBaseClient, _AsyncStatusPoller]" = weakref.WeakKeyDictionary()
+_status_pollers_lock = threading.Lock()
+
+
+def _status_poller(client: BaseClient) -> _StatusPoller:
+    with _status_pollers_lock:
+        poller = _status_pollers.get(client)
+        if poller is None:
+            poller = _status_pollers[client] = _StatusPoller()
+        return poller
+
+
+def _async_status_poller(client: AsyncBaseClient) -> _AsyncStatusPoller:
+    poller = _async_status_pollers.get(client)
+    if poller is None:
+        poller = _async_status_pollers[client] = _AsyncStatusPoller()
+    return poller
+
+
+ItemT = TypeVar("ItemT")
+ResultT = TypeVar("ResultT")
+
+
+def _is_retryable_batch_error(error: BaseException) -> bool:
+    if isinstance(error, ApiError):
+        return error.status_code is not None and (error.status_code in (408, 429) or error.status_code >= 500)
+    return isinstance(error, httpx.TransportError)
+
+
+def _is_unsent_batch_error(error: BaseException) -> bool:
+    """Whether the request failed before the server acted on it, so sending it again can't repeat its effect."""
+    if isinstance(error, ApiError):
+        return error.status_code == 429
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+def _is_unsent_start_error(_: int, error: BaseException) -> bool:
+    return _is_unsent_batch_error(error)
+
+
+# File commands that leave the same result, and respond the same way, when the server runs them twice. A repeated
+# `delete` or `create` would fail on the path the first attempt already removed or created
+_IDEMPOTENT_FILE_COMMANDS = frozenset({"read", "view", "list", "exists", "search", "write", "mkdir"})
+
+
+def _is_retryable_file_operation_error(operation: FileOperation, error: BaseException) -> bool:
+    if operation.command in _IDEMPOTENT_FILE_COMMANDS:
+        return _is_retryable_batch_error(error)
+    return _is_unsent_batch_error(error)
+
+
+def _batch_failure(index: int, item: Any, error: BaseException, attempts: int) -> BatchFailure:
+    return BatchFailure(
+        index=index, instance_id=item if isinstance(item, str) else None, error=error, attempts=attempts
+    )
+
+
+def _run_batch(
+    items: Sequence[ItemT],
+    fn: Callable[[ItemT], ResultT],
+    *,
+    concurrency: int,
+    retries: int,
+    lanes: Optional[List[List[int]]] = None,
+    retry_if: Optional[Callable[[ItemT, BaseException], bool]] = None,
+) -> BatchResult[ResultT]:
+    """
+    Helper function to run `fn` over items on a thread pool, retrying transient errors per item.
+
+    Items in the same lane run one after another in lane order, by default every item has a lane of its own.
+    `retry_if` decides whether an item is retried after an error, by default for transient API and transport errors.
+    """
+
+    def run(index: int) -> Union[ResultT, BatchFailure]:
+        for attempt in itertools.count(1):
+            try:
+                return fn(items[index])
+            except Exception as e:
+                retryable = retry_if(items[index], e) if retry_if is not None else _is_retryable_batch_error(e)
+                if attempt > retries or not retryable:
+                    return _batch_failure(index, items[index], e, attempt)
+                time.sleep(_poll_delay(attempt - 1, 0.5, 10.0))
+        raise AssertionError("unreachable")
+
+    def run_lane(lane: List[int]) -> List[Tuple[int, Union[ResultT, BatchFailure]]]:
+        return [(index, run(index)) for index in lane]
+
+    results: List[Optional[ResultT]] = [None] * len(items)
+    failures: List[BatchFailure] = []
+    if not items:
+        return BatchResult(results=results, failures=failures)
+    lanes = lanes if lanes is not None else [[index] for index in range(len(items))]
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(lanes)))) as executor:
+        for outcomes in executor.map(run_lane, lanes):
+            for index, outcome in outcomes:
+                if isinstance(outcome, BatchFailure):
+                    failures.append(outcome)
+                else:
+                    results[index] = outcome
+    return BatchResult(results=results, failures=sorted(failures, key=lambda failure: failure.index))
+
+
+async def _arun_batch(
+    items: Sequence[ItemT],
+    fn: Callable[[ItemT], typing.Awaitable[ResultT]],
+    *,
+    concurrency: int,
+    retries: int,
+    lanes: Optional[List[List[int]]] = None,
+    retry_if: Optional[Callable[[ItemT, BaseException], bool]] = None,
+) -> BatchResult[ResultT]:
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(index: int) -> Union[ResultT, BatchFailure]:
+        for attempt in itertools.count(1):
+            try:
+                async with semaphore:
+                    return await fn(items[index])
+            except Exception as e:
+                retryable = retry_if(items[index], e) if retry_if is not None else _is_retryable_batch_error(e)
+                if attempt > retries or not retryable:
+                    return _batch_failure(index, items[index], e, attempt)
+            # Back off without holding a slot so other items keep making progress
+            await asyncio.sleep(_poll_delay(attempt - 1, 0.5, 10.0))
+        raise AssertionError("unreachable")
+
+    async def run_lane(lane: List[int]) -> List[Tuple[int, Union[ResultT, BatchFailure]]]:
+        return [(index, await run(index)) for index in lane]
+
+    results: List[Optional[ResultT]] = [None] * len(items)
+    failures: List[BatchFailure] = []
+    lanes = lanes if lanes is not None else [[index] for index in range(len(items))]
+    for outcomes in await asyncio.gather(*(run_lane(lane) for lane in lanes)):
+        for index, outcome in outcomes:
+            if isinstance(outcome, BatchFailure):
+                failures.append(outcome)
+            else:
+                results[index] = outcome
+    return BatchResult(results=results, failures=sorted(failures, key=lambda failure: failure.index))
+
+
+class _Chunk(NamedTuple):
+    number: int
+    offset: int
+    length: int
+    sha256: str
+
+    @property
+    def name(self) -> str:
+        return f"part-{self.number:06d}"
+
+
+@contextmanager
+def _upload_source(source: UploadSource) -> Iterator[Any]:
+    """Helper function to expose an upload source as a sliceable buffer, memory-mapping files given by path."""
+    if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+        yield source
+        return
+    with open(source, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield b""  # Empty files can't be mapped
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def _plan_chunks(data: Any, chunk_size: int) -> Tuple[List[_Chunk], str]:
+    """Helper function to split data into chunks, returning them with the SHA-256 of the whole data."""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    digest = hashlib.sha256()
+    chunks: List[_Chunk] = []
+    # An empty file is still uploaded as one empty chunk
+    for number, offset in enumerate(range(0, max(len(data), 1), chunk_size)):
+        chunk = data[offset : offset + chunk_size]
+        digest.update(chunk)
+        chunks.append(_Chunk(number, offset, len(chunk), hashlib.sha256(chunk).hexdigest()))
+    return chunks, digest.hexdigest()
+
+
+def _upload_parts_dir(path: str, digest: str, chunk_size: int) -> str:
+    # Parts are only reused by an upload of the same content split the same way
+    return f"{path}.upload-{digest[:16]}-{chunk_size}"
+
+
+def _list_parts_command(parts: str, create: bool = False) -> str:
+    # The subshell keeps the `cd` out of the caller's bash session, which would be left in a deleted directory
+    prefix = f"mkdir -p {shlex.quote(parts)} && " if create else ""
+    return f"{prefix}( cd {shlex.quote(parts)} && sha256sum -- part-* 2>/dev/null ); true"
+
+
+def _assemble_parts_command(parts: str, path: str) -> str:
+    parts, path = shlex.quote(parts), shlex.quote(path)
+    return f"cat {parts}/part-* > {path} && rm -rf {parts} && sha256sum -- {path}"
+
+
+def _parse_sha256sum(output: str) -> Dict[str, str]:
+    """Helper function to map each file listed in `sha256sum` output to its hash."""
+    hashes: Dict[str, str] = {}
+    for line in output.splitlines():
+        digest, _, name = line.partition("  ")
+        if name:
+            hashes[name] = digest
+    return hashes
+
+
+def _shell_output(response: Any, command: str) -> str:
+    """Helper function to return the output of a bash command run by the SDK, raising if it failed."""
+    if response.error:
+        raise RuntimeError(f"Command `{command}` failed: {response.error}")
+    return response.output or ""
+
+
+def _chunked_upload_response(
+    path: str, size: int, digest: str, chunks: List[_Chunk], assembled: Dict[str, str], skipped: int, resent: int
+) -> ChunkedUploadResponse:
+    if list(assembled.values()) != [digest]:
+        raise RuntimeError(f"Assembled file {path} does not match the uploaded data")
+    return ChunkedUploadResponse(
+        path=path, size=size, sha256=digest, chunks=len(chunks), skipped_chunks=skipped, resent_chunks=resent
+    )
+
+
+class _BashStreamState:
+    """Commands and decoding shared by `BashStream` and `AsyncBashStream`."""
+
+    def __init__(self, command: str, chunk_size: int, spool_path: Optional[Union[str, "os.PathLike[str]"]]):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be positive")
+        name = f"/tmp/scrapybara-bash-{uuid.uuid4().hex}"
+        self.command = command
+        self.log, self.status = shlex.quote(f"{name}.log"), shlex.quote(f"{name}.status")
+        self.chunk_size = chunk_size
+        self.offset = 0
+        self.pid: Optional[int] = None
+        self.exit_code: Optional[int] = None
+        self._short = False  # Whether the last read after the command exited returned less than a chunk
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._spool = open(spool_path, "wb") if spool_path is not None else None
+
+    def start_command(self) -> str:
+        # A subshell keeps the session's working directory and variables, the newline ends trailing comments.
+        # Job control puts the command in a process group of its own, so stopping it reaches every descendant
+        return (
+            f"( set -m; ( ( {self.command}\n ) > {self.log} 2>&1; echo $? > {self.status} ) > /dev/null 2>&1 & "
+            "echo $! )"
+        )
+
+    def started(self, output: str) -> None:
+        self.pid = int(output.split()[-1])
+
+    def poll_command(self) -> str:
+        # The status is read first, so once it exists the log read after it is complete
+        return (
+            f"cat -- {self.status} 2>/dev/null; echo; "
+            f"tail -c +{self.offset + 1} -- {self.log} | head -c {self.chunk_size} | base64 -w 0"
+        )
+
+    def stop_command(self) -> str:
+        return f"kill -TERM -- -{self.pid} 2>/dev/null; true"
+
+    def cleanup_command(self) -> str:
+        """Terminates the command if it is still running and removes its files."""
+        stop = f"{self.stop_command()}; " if self.exit_code is None else ""
+        return f"{stop}rm -f -- {self.log} {self.status}"
+
+    def feed(self, output: str) -> Tuple[str, bool]:
+        """Decodes a poll's output, returning the new text and whether more output may be ready to read."""
+        status, _, encoded = output.partition("\n")
+        encoded = encoded.strip()
+        cut = len(encoded) - len(encoded) % 4
+        data, requested = base64.b64decode(encoded[:cut]), self.chunk_size
+        # The bash endpoint may cut off a large output. A partial base64 group shows that directly, and once the
+        # command has exited a short read followed by more output shows it too. Only the decoded bytes count, so
+        # the rest is read again from the new offset in smaller chunks
+        cut_off = cut < len(encoded) or (self._short and bool(data))
+        if cut_off:
+            if not data and requested == 1:
+                raise RuntimeError("Bash output is cut off before a single byte of the command's output")
+            self.chunk_size = max(1, requested // 2)
+        self.offset += len(data)
+        if self._spool is not None:
+            self._spool.write(data)
+        text = self._decoder.decode(data)
+        exited = bool(status.strip())
+        self._short = exited and 0 < len(data) < requested
+        if exited and not data and not cut_off:
+            # The status is written after the log, so a poll that sees it and reads nothing has read everything
+            self.exit_code = int(status.strip())
+            text += self._decoder.decode(b"", final=True)
+        return text, cut_off or len(data) == requested or (exited and bool(data))
+
+    def close(self) -> None:
+        if self._spool is not None:
+            self._spool.close()
+
+
+def _local_manifest(root: Union[str, "os.PathLike[str]"]) -> Dict[str, Tuple[str, int]]:
+    """Helper function to map each file under `root`, as a relative POSIX path, to its SHA-256 and size."""
+    manifest: Dict[str, Tuple[str, int]] = {}
+    if not os.path.isdir(root):
+        raise NotADirectoryError(f"{os.fspath(root)} is not a directory")
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            if not os.path.isfile(path):
+                continue  # Broken symlinks, sockets and the like can't be uploaded
+            digest = hashlib.sha256()
+            with open(path, "rb") as file:
+                for block in iter(lambda: file.read(1024 * 1024), b""):
+                    digest.update(block)
+            manifest[Path(os.path.relpath(path, root)).as_posix()] = (digest.hexdigest(), os.path.getsize(path))
+    return manifest
+
+
+def _remote_manifest_command(remote_path: str) -> str:
+    # Paths are listed relative to the directory without the leading ./ so they match the local manifest. The
+    # subshell keeps the `cd` out of the caller's bash session
+    return (
+        f"mkdir -p {shlex.quote(remote_path)} && ( cd {shlex.quote(remote_path)} && "
+        "find . -type f -printf '%P\\0' | xargs -0 -r sha256sum -- )"
+    )
+
+
+@contextmanager
+def _pack_files(root: Union[str, "os.PathLike[str]"], names: List[str]) -> Iterator[Tuple[IO[bytes], int]]:
+    """Helper function to pack files into a gzipped tar, yielding it positioned at its start with its size."""
+    with tempfile.SpooledTemporaryFile(max_size=DEFAULT_UPLOAD_CHUNK_SIZE) as archive:
+        with tarfile.open(fileobj=archive, mode="w:gz") as tar:
+            for name in names:
+                tar.add(os.path.join(root, name), arcname=name, recursive=False)
+        size = archive.tell()
+        archive.seek(0)
+        yield typing.cast(IO[bytes], archive), size
+
+
+def _unpack_command(archive_path: str, remote_path: str) -> str:
+    archive_path, remote_path = shlex.quote(archive_path), shlex.quote(remote_path)
+    return f"tar -xzf {archive_path} -C {remote_path} && rm -f {archive_path}"
+
+
+def _delete_commands(remote_path: str, names: List[str], batch_size: int = 500) -> List[str]:
+    """Helper function to build `rm` commands for files under `remote_path`, split to stay under argument limits."""
+    return [
+        f"( cd {shlex.quote(remote_path)} && rm -f -- "
+        + " ".join(shlex.quote(name) for name in names[i : i + batch_size])
+        + " )"
+        for i in range(0, len(names), batch_size)
+    ]
+
+
+def _directory_sync_response(
+    local: Dict[str, Tuple[str, int]], changed: List[str], deleted: List[str], uploaded_bytes: int
+) -> DirectorySyncResponse:
+    return DirectorySyncResponse(
+        files=len(local),
+        uploaded_files=len(changed),
+        deleted_files=len(deleted),
+        total_bytes=sum(size for _, size in local.values()),
+        uploaded_bytes=uploaded_bytes,
+    )
+
+
+def _act_task_kwargs(task: ActTask) -> Dict[str, Any]:
+    return dict(
+        model=task.model,
+        tools=task.tools,
+        system=task.system,
+        prompt=task.prompt,
+        messages=task.messages,
+        schema=task.schema_,
+        temperature=task.temperature,
+        max_tokens=task.max_tokens,
+        images_to_keep=task.images_to_keep,
+        dedupe_screenshots=task.dedupe_screenshots,
+        screenshot_options=task.screenshot_options,
+        tool_concurrency=task.tool_concurrency,
+        pipeline=task.pipeline,
+    )
+
+
+def _record_act_result(stats: ActManyStats, response: Optional[ActResponse[Any]], started: float) -> ActManyStats:
+    """Adds a finished task to the running totals and returns a snapshot of them."""
+    if response is None:
+        stats.failed += 1
+    else:
+        stats.completed += 1
+        stats.steps += len(response.steps)
+        if response.usage:
+            stats.prompt_tokens += response.usage.prompt_tokens
+            stats.completion_tokens += response.usage.completion_tokens
+            stats.total_tokens += response.usage.total_tokens
+    stats.elapsed = time.monotonic() - started
+    return stats.model_copy()
+
+
+_prefetch_executor_instance: Optional[ThreadPoolExecutor] = None
+_prefetch_executor_lock = threading.Lock()
+
+
+def _prefetch_executor() -> ThreadPoolExecutor:
+    """The thread pool shared by every pipelined agent loop, created on first use."""
+    global _prefetch_executor_instance
+    with _prefetch_executor_lock:
+        if _prefetch_executor_instance is None:
+            _prefetch_executor_instance = ThreadPoolExecutor(thread_name_prefix="scrapybara-prefetch")
+        return _prefetch_executor_instance
+
+
+def _stable_prefix(messages: List[Message], at_risk: List[Message]) -> int:
+    """The number of leading messages that contain none of the `at_risk` messages."""
+    remaining = {id(message) for message in at_risk}
+    stable = len(messages)
     for i in range(len(messages) - 1, -1, -1):
-        msg = messages[i]
-        
-        if isinstance(msg, ToolMessage) and msg.content:
-            for j in range(len(msg.content) - 1, -1, -1):
-                tool_result = msg.content[j]
-                
-                if (tool_result and 
-                    hasattr(tool_result, "result") and 
-                    tool_result.result and 
-                    isinstance(tool_result.result, dict) and
-                    "base_64_image" in tool_result.result):
-                    
-                    if images_kept < images_to_keep:
-                        images_kept += 1
-                    else:
-                        del tool_result.result["base_64_image"]
\ No newline at end of file
+        if not remaining:
+            break
+        if id(messages[i]) in remaining:
+            remaining.discard(id(messages[i]))
+            stable = i
+    return stable
+
+
+def _prepare_next_step(
+    encoder: _ActRequestEncoder, messages: List[Message], stable: int, tools: List[Tool]
+) -> List[ApiTool]:
+    """
+    Does the CPU-bound work for the next request of a pipelined loop while the current step's tools run.
+
+    The first `stable` messages, which the next prune cannot modify, are encoded and joined so only the
+    new tool results and pruned messages are left to encode once the tools return. `messages` must be a
+    snapshot since the loop appends to its history concurrently.
+    """
+    encoder.prefetch(messages, stable)
+    return _api_tools(tools)
+
+
+def _api_tools(tools: List[Tool]) -> List[ApiTool]:
+    """
+    Helper function to convert tools for a request.
+
+    Schemas and serialized tool JSON are cached per tool, so every step and every concurrent agent loop
+    sending the same tools reuses them instead of regenerating the schemas from the parameter models.
+    """
+    return [_shared_api_tool(tool.name, tool.description, tool.parameters) for tool in tools]
@@ -5,6 +5,7 @@ from .client_wrapper import AsyncClientWrapper, BaseClientWrapper, SyncClientWra
 from .datetime_utils import serialize_datetime
 from .file import File, convert_file_dict_to_httpx_tuples, with_content_type
 from .http_client import AsyncHttpClient, HttpClient
+from .json_stream import JsonStreamParser, async_parse_json_response, parse_json_response
 from .jsonable_encoder import jsonable_encoder
 from .pydantic_utilities import (
     IS_PYDANTIC_V2,
@@ -16,6 +17,7 @@ from .pydantic_utilities import (
     update_forward_refs,
 )
 from .query_encoder import encode_query
+from .rate_limiter import RateLimiter, RateLimiterState
 from .remove_none_from_dict import remove_none_from_dict
 from .request_options import RequestOptions
 from .serialization import FieldMetadata, convert_and_respect_annotation_metadata
@@ -29,14 +31,19 @@ __all__ = [
     "File",
     "HttpClient",
     "IS_PYDANTIC_V2",
+    "JsonStreamParser",
+    "RateLimiter",
+    "RateLimiterState",
     "RequestOptions",
     "SyncClientWrapper",
     "UniversalBaseModel",
     "UniversalRootModel",
+    "async_parse_json_response",
     "convert_and_respect_annotation_metadata",
     "convert_file_dict_to_httpx_tuples",
     "encode_query",
     "jsonable_encoder",
+    "parse_json_response",
     "parse_obj_as",
     "remove_none_from_dict",
     "serialize_datetime",
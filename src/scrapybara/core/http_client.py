@@ -2,6 +2,7 @@
 
 import asyncio
 import email.utils
+import gzip
 import json
 import re
 import time
@@ -18,9 +19,18 @@ from .query_encoder import encode_query
 from .remove_none_from_dict import remove_none_from_dict
 from .request_options import RequestOptions
 
+if typing.TYPE_CHECKING:
+    from .rate_limiter import RateLimiter
+
 INITIAL_RETRY_DELAY_SECONDS = 0.5
 MAX_RETRY_DELAY_SECONDS = 10
 MAX_RETRY_DELAY_SECONDS_FROM_HEADER = 30
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+DEFAULT_COMPRESSION_THRESHOLD_BYTES = 64 * 1024
+GZIP_COMPRESSION_LEVEL = 5
+ZSTD_COMPRESSION_LEVEL = 3
+
+RequestCompression = typing.Literal["gzip", "zstd"]
 
 
 def _parse_retry_after(response_headers: httpx.Headers) -> typing.Optional[float]:
@@ -64,7 +74,7 @@ def _parse_retry_after(response_headers: httpx.Headers) -> typing.Optional[float
     return seconds
 
 
-def _retry_timeout(response: httpx.Response, retries: int) -> float:
+def _retry_timeout(response: typing.Optional[httpx.Response], retries: int) -> float:
     """
     Determine the amount of time to wait before retrying a request.
     This function begins by trying to parse a retry-after header from the response, and then proceeds to use exponential backoff
@@ -72,7 +82,7 @@ def _retry_timeout(response: httpx.Response, retries: int) -> float:
     """
 
     # If the API asks us to wait a certain amount of time (and it's a reasonable amount), just do what it says.
-    retry_after = _parse_retry_after(response.headers)
+    retry_after = _parse_retry_after(response.headers) if response is not None else None
     if retry_after is not None and retry_after <= MAX_RETRY_DELAY_SECONDS_FROM_HEADER:
         return retry_after
 
@@ -89,6 +99,80 @@ def _should_retry(response: httpx.Response) -> bool:
     return response.status_code >= 500 or response.status_code in retryable_400s
 
 
+def _is_idempotent(method: str, request_options: typing.Optional[RequestOptions]) -> bool:
+    if request_options is not None and request_options.get("idempotent") is not None:
+        return bool(request_options.get("idempotent"))
+    return method.upper() in IDEMPOTENT_METHODS
+
+
+def _should_retry_error(
+    error: httpx.TransportError, method: str, request_options: typing.Optional[RequestOptions]
+) -> bool:
+    """
+    Determine whether a request that failed at the transport level can be sent again.
+    Requests that never reached the server are always retried, anything that may have been
+    received by the server is only retried when the request is idempotent.
+    """
+    if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return True
+    if isinstance(error, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)):
+        return _is_idempotent(method, request_options)
+    return False
+
+
+def _retry_deadline(request_options: typing.Optional[RequestOptions]) -> typing.Optional[float]:
+    retry_deadline = request_options.get("retry_deadline_in_seconds") if request_options is not None else None
+    return time.monotonic() + retry_deadline if retry_deadline is not None else None
+
+
+def _can_retry(
+    *,
+    content: typing.Optional[typing.Any],
+    retries: int,
+    max_retries: int,
+    delay: float,
+    deadline: typing.Optional[float],
+) -> bool:
+    # Streamed request bodies can only be sent once
+    if content is not None and not isinstance(content, (bytes, str)):
+        return False
+    if max_retries <= retries:
+        return False
+    return deadline is None or time.monotonic() + delay <= deadline
+
+
+def _should_compress(request: httpx.Request, threshold: int) -> bool:
+    return (
+        isinstance(request.stream, httpx.ByteStream)
+        and "content-encoding" not in request.headers
+        and len(request.content) >= threshold
+    )
+
+
+def _compress_request(request: httpx.Request, compression: RequestCompression) -> httpx.Request:
+    """
+    Returns a copy of the request with its body compressed. zstd falls back to gzip when the
+    zstandard package is not installed.
+    """
+    body: typing.Optional[bytes] = None
+    encoding = "gzip"
+    if compression == "zstd":
+        try:
+            import zstandard  # type: ignore
+        except ImportError:
+            pass
+        else:
+            body = zstandard.ZstdCompressor(level=ZSTD_COMPRESSION_LEVEL).compress(request.content)
+            encoding = "zstd"
+    if body is None:
+        body = gzip.compress(request.content, compresslevel=GZIP_COMPRESSION_LEVEL, mtime=0)
+
+    headers = request.headers.copy()
+    headers["content-encoding"] = encoding
+    headers["content-length"] = str(len(body))
+    return httpx.Request(request.method, request.url, headers=headers, content=body, extensions=request.extensions)
+
+
 def remove_omit_from_dict(
     original: typing.Dict[str, typing.Optional[typing.Any]],
     omit: typing.Optional[typing.Any],
@@ -155,11 +239,17 @@ class HttpClient:
         base_timeout: typing.Callable[[], typing.Optional[float]],
         base_headers: typing.Callable[[], typing.Dict[str, str]],
         base_url: typing.Optional[typing.Callable[[], str]] = None,
+        rate_limiter: typing.Optional["RateLimiter"] = None,
+        compression: typing.Optional[RequestCompression] = None,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD_BYTES,
     ):
         self.base_url = base_url
         self.base_timeout = base_timeout
         self.base_headers = base_headers
         self.httpx_client = httpx_client
+        self.rate_limiter = rate_limiter
+        self.compression = compression
+        self.compression_threshold = compression_threshold
 
     def get_base_url(self, maybe_base_url: typing.Optional[str]) -> str:
         base_url = maybe_base_url
@@ -195,7 +285,8 @@ class HttpClient:
 
         json_body, data_body = get_request_body(json=json, data=data, request_options=request_options, omit=omit)
 
-        response = self.httpx_client.request(
+        # The body is encoded once here and the same request is re-sent on every attempt
+        request = self.httpx_client.build_request(
             method=method,
             url=urllib.parse.urljoin(f"{base_url}/", path),
             headers=jsonable_encoder(
@@ -235,25 +326,36 @@ class HttpClient:
             timeout=timeout,
         )
 
-        max_retries: int = request_options.get("max_retries", 0) if request_options is not None else 0
-        if _should_retry(response=response):
-            if max_retries > retries:
-                time.sleep(_retry_timeout(response=response, retries=retries))
-                return self.request(
-                    path=path,
-                    method=method,
-                    base_url=base_url,
-                    params=params,
-                    json=json,
-                    content=content,
-                    files=files,
-                    headers=headers,
-                    request_options=request_options,
-                    retries=retries + 1,
-                    omit=omit,
-                )
+        if self.compression is not None and _should_compress(request, self.compression_threshold):
+            request = _compress_request(request, self.compression)
 
-        return response
+        max_retries: int = request_options.get("max_retries", 0) if request_options is not None else 0
+        deadline = _retry_deadline(request_options)
+        while True:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+            try:
+                response = self.httpx_client.send(request)
+            except httpx.TransportError as e:
+                delay = _retry_timeout(response=None, retries=retries)
+                if not _should_retry_error(e, method, request_options) or not _can_retry(
+                    content=content, retries=retries, max_retries=max_retries, delay=delay, deadline=deadline
+                ):
+                    raise
+            else:
+                if self.rate_limiter is not None:
+                    self.rate_limiter.observe(response)
+                if not _should_retry(response=response):
+                    return response
+                delay = _retry_timeout(response=response, retries=retries)
+                if not _can_retry(
+                    content=content, retries=retries, max_retries=max_retries, delay=delay, deadline=deadline
+                ):
+                    return response
+                response.close()
+
+            time.sleep(delay)
+            retries += 1
 
     @contextmanager
     def stream(
@@ -281,6 +383,8 @@ class HttpClient:
 
         json_body, data_body = get_request_body(json=json, data=data, request_options=request_options, omit=omit)
 
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
         with self.httpx_client.stream(
             method=method,
             url=urllib.parse.urljoin(f"{base_url}/", path),
@@ -320,6 +424,8 @@ class HttpClient:
             ),
             timeout=timeout,
         ) as stream:
+            if self.rate_limiter is not None:
+                self.rate_limiter.observe(stream)
             yield stream
 
 
@@ -331,11 +437,17 @@ class AsyncHttpClient:
         base_timeout: typing.Callable[[], typing.Optional[float]],
         base_headers: typing.Callable[[], typing.Dict[str, str]],
         base_url: typing.Optional[typing.Callable[[], str]] = None,
+        rate_limiter: typing.Optional["RateLimiter"] = None,
+        compression: typing.Optional[RequestCompression] = None,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD_BYTES,
     ):
         self.base_url = base_url
         self.base_timeout = base_timeout
         self.base_headers = base_headers
         self.httpx_client = httpx_client
+        self.rate_limiter = rate_limiter
+        self.compression = compression
+        self.compression_threshold = compression_threshold
 
     def get_base_url(self, maybe_base_url: typing.Optional[str]) -> str:
         base_url = maybe_base_url
@@ -372,7 +484,8 @@ class AsyncHttpClient:
         json_body, data_body = get_request_body(json=json, data=data, request_options=request_options, omit=omit)
 
         # Add the input to each of these and do None-safety checks
-        response = await self.httpx_client.request(
+        # The body is encoded once here and the same request is re-sent on every attempt
+        request = self.httpx_client.build_request(
             method=method,
             url=urllib.parse.urljoin(f"{base_url}/", path),
             headers=jsonable_encoder(
@@ -412,24 +525,39 @@ class AsyncHttpClient:
             timeout=timeout,
         )
 
+        if self.compression is not None and _should_compress(request, self.compression_threshold):
+            # Compressing a multi-megabyte body would otherwise stall the event loop
+            request = await asyncio.get_running_loop().run_in_executor(
+                None, _compress_request, request, self.compression
+            )
+
         max_retries: int = request_options.get("max_retries", 0) if request_options is not None else 0
-        if _should_retry(response=response):
-            if max_retries > retries:
-                await asyncio.sleep(_retry_timeout(response=response, retries=retries))
-                return await self.request(
-                    path=path,
-                    method=method,
-                    base_url=base_url,
-                    params=params,
-                    json=json,
-                    content=content,
-                    files=files,
-                    headers=headers,
-                    request_options=request_options,
-                    retries=retries + 1,
-                    omit=omit,
-                )
-        return response
+        deadline = _retry_deadline(request_options)
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.async_acquire()
+            try:
+                response = await self.httpx_client.send(request)
+            except httpx.TransportError as e:
+                delay = _retry_timeout(response=None, retries=retries)
+                if not _should_retry_error(e, method, request_options) or not _can_retry(
+                    content=content, retries=retries, max_retries=max_retries, delay=delay, deadline=deadline
+                ):
+                    raise
+            else:
+                if self.rate_limiter is not None:
+                    await self.rate_limiter.async_observe(response)
+                if not _should_retry(response=response):
+                    return response
+                delay = _retry_timeout(response=response, retries=retries)
+                if not _can_retry(
+                    content=content, retries=retries, max_retries=max_retries, delay=delay, deadline=deadline
+                ):
+                    return response
+                await response.aclose()
+
+            await asyncio.sleep(delay)
+            retries += 1
 
     @asynccontextmanager
     async def stream(
@@ -457,6 +585,8 @@ class AsyncHttpClient:
 
         json_body, data_body = get_request_body(json=json, data=data, request_options=request_options, omit=omit)
 
+        if self.rate_limiter is not None:
+            await self.rate_limiter.async_acquire()
         async with self.httpx_client.stream(
             method=method,
             url=urllib.parse.urljoin(f"{base_url}/", path),
@@ -496,4 +626,6 @@ class AsyncHttpClient:
             ),
             timeout=timeout,
         ) as stream:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.async_observe(stream)
             yield stream
@@ -0,0 +1,269 @@
+import json
+import re
+import tempfile
+import typing
+
+import httpx
+
+DEFAULT_SPOOL_MAX_MEMORY_BYTES = 1024 * 1024
+
+_WHITESPACE = b" \t\r\n"
+# Characters that can end or nest a value outside of a string, and those that matter inside one
+_STRUCTURE = re.compile(rb'["{}\[\],]')
+_STRING_SPECIAL = re.compile(rb'["\\]')
+_SIMPLE_ESCAPES = {
+    ord('"'): b'"',
+    ord("\\"): b"\\",
+    ord("/"): b"/",
+    ord("b"): b"\b",
+    ord("f"): b"\f",
+    ord("n"): b"\n",
+    ord("r"): b"\r",
+    ord("t"): b"\t",
+}
+
+_START, _KEY, _COLON, _VALUE, _SPOOL, _SCALAR, _NEXT, _DONE = range(8)
+
+
+class JsonStreamParser:
+    """
+    Incrementally parses a JSON object, spooling large string values instead of holding them in memory.
+
+    The values of `spool_fields` on the top-level object are unescaped and written to a
+    `tempfile.SpooledTemporaryFile` as their UTF-8 bytes, which moves to disk once it outgrows `max_memory`.
+    Every other value is buffered and parsed with `json.loads`, so only the small metadata is materialized.
+
+    Parameters
+    ----------
+    spool_fields : typing.Collection[str]
+        Top-level keys whose string values are spooled. A null or non-string value is parsed normally.
+
+    max_memory : int
+        Bytes a spooled value may use in memory before it is written to a temporary file.
+
+    Examples
+    --------
+    parser = JsonStreamParser(spool_fields={"base64_image"})
+    for chunk in response.iter_bytes():
+        parser.feed(chunk)
+    body = parser.close()
+    image = body["base64_image"].read()
+    """
+
+    def __init__(
+        self, *, spool_fields: typing.Collection[str], max_memory: int = DEFAULT_SPOOL_MAX_MEMORY_BYTES
+    ) -> None:
+        self.spool_fields = frozenset(spool_fields)
+        self.max_memory = max_memory
+        self._buffer = bytearray()
+        self._state = _START
+        self._result: typing.Dict[str, typing.Any] = {}
+        self._key = ""
+        self._spool: typing.Optional[typing.IO[bytes]] = None
+        # Scan state of the scalar value being buffered, kept so each chunk is only scanned once
+        self._scan = 0
+        self._depth = 0
+        self._in_string = False
+
+    def feed(self, chunk: bytes) -> None:
+        self._buffer += chunk
+        position = 0
+        while True:
+            consumed = self._step(position)
+            if consumed is None:
+                break
+            position = consumed
+        del self._buffer[:position]
+        if self._state == _SCALAR:
+            self._scan -= position
+
+    def close(self) -> typing.Dict[str, typing.Any]:
+        """Returns the parsed object. Spooled values are binary files positioned at their start."""
+        if self._state != _DONE or self._buffer.strip(_WHITESPACE):
+            raise json.JSONDecodeError("Incomplete or invalid JSON object", bytes(self._buffer).decode(errors="replace"), 0)
+        return self._result
+
+    def _step(self, position: int) -> typing.Optional[int]:
+        """Advances the state machine from `position`, returning the new position or None when more input is needed."""
+        buffer = self._buffer
+        if self._state in (_START, _KEY, _COLON, _VALUE, _NEXT, _DONE):
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position == len(buffer):
+                return None
+        byte = buffer[position] if position < len(buffer) else None
+
+        if self._state == _START:
+            self._expect(byte, b"{", position)
+            self._state = _KEY
+            return position + 1
+        if self._state == _KEY:
+            if byte == ord("}") and not self._result:
+                self._state = _DONE
+                return position + 1
+            self._expect(byte, b'"', position)
+            end = _string_end(buffer, position + 1)
+            if end == -1:
+                return None
+            self._key = json.loads(bytes(buffer[position : end + 1]))
+            self._state = _COLON
+            return end + 1
+        if self._state == _COLON:
+            self._expect(byte, b":", position)
+            self._state = _VALUE
+            return position + 1
+        if self._state == _VALUE:
+            if byte == ord('"') and self._key in self.spool_fields:
+                self._spool = tempfile.SpooledTemporaryFile(max_size=self.max_memory)
+                self._state = _SPOOL
+                return position + 1
+            self._state, self._scan, self._depth, self._in_string = _SCALAR, position, 0, False
+            return position
+        if self._state == _SPOOL:
+            return self._spool_string(position)
+        if self._state == _SCALAR:
+            scalar_end = self._scan_scalar()
+            if scalar_end is None:
+                return None
+            self._finish_scalar(scalar_end, position)
+            return scalar_end
+        if self._state == _NEXT:
+            if byte == ord(","):
+                self._state = _KEY
+                return position + 1
+            self._expect(byte, b"}", position)
+            self._state = _DONE
+            return position + 1
+        self._expect(byte, b"", position)  # Only whitespace may follow the object
+        return None
+
+    def _spool_string(self, position: int) -> typing.Optional[int]:
+        buffer = self._buffer
+        assert self._spool is not None
+        start = position
+        while True:
+            match = _STRING_SPECIAL.search(buffer, position)
+            end = match.start() if match else len(buffer)
+            if end > position:
+                self._spool.write(memoryview(buffer)[position:end])
+            position = end
+            if match is None:
+                break
+            if buffer[end] == ord('"'):
+                self._spool.seek(0)
+                self._result[self._key] = self._spool
+                self._spool = None
+                self._state = _NEXT
+                return end + 1
+            escape = _decode_escape(buffer, end)
+            if escape is None:
+                break  # The escape continues in the next chunk
+            decoded, position = escape
+            self._spool.write(decoded)
+        return position if position > start else None
+
+    def _scan_scalar(self) -> typing.Optional[int]:
+        """Returns the end of the value being scanned, or None when it continues past the buffer."""
+        buffer = self._buffer
+        position = self._scan
+        while True:
+            if self._in_string:
+                match = _STRING_SPECIAL.search(buffer, position)
+                if match is None or (buffer[match.start()] == ord("\\") and match.start() + 1 >= len(buffer)):
+                    self._scan = match.start() if match else len(buffer)
+                    return None
+                if buffer[match.start()] == ord("\\"):
+                    position = match.start() + 2
+                    continue
+                self._in_string = False
+                position = match.start() + 1
+                if self._depth == 0:
+                    return position
+                continue
+            match = _STRUCTURE.search(buffer, position)
+            if match is None:
+                self._scan = len(buffer)
+                return None
+            char = buffer[match.start()]
+            position = match.start() + 1
+            if char == ord('"'):
+                self._in_string = True
+            elif char in b"{[":
+                self._depth += 1
+            elif self._depth == 0:
+                return match.start()  # The comma or brace after a number or literal
+            elif char in b"}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    return position
+
+    def _finish_scalar(self, end: int, start: int) -> None:
+        self._result[self._key] = json.loads(bytes(self._buffer[start:end]))
+        self._state = _NEXT
+
+    def _expect(self, byte: typing.Optional[int], expected: bytes, position: int) -> None:
+        if byte is None or not expected or byte != expected[0]:
+            document = bytes(self._buffer).decode(errors="replace")
+            raise json.JSONDecodeError(f"Expected {expected.decode() or 'end of input'!r}", document, position)
+
+
+def _string_end(buffer: bytearray, position: int) -> int:
+    """Returns the index of the quote closing the string that starts before `position`, or -1."""
+    while True:
+        match = _STRING_SPECIAL.search(buffer, position)
+        if match is None:
+            return -1
+        if buffer[match.start()] == ord('"'):
+            return match.start()
+        position = match.start() + 2
+
+
+def _decode_escape(buffer: bytearray, position: int) -> typing.Optional[typing.Tuple[bytes, int]]:
+    """Decodes the escape at `position` to UTF-8, returning it with the position after it or None if it is cut off."""
+    if position + 1 >= len(buffer):
+        return None
+    kind = buffer[position + 1]
+    if kind != ord("u"):
+        if kind not in _SIMPLE_ESCAPES:
+            raise json.JSONDecodeError("Invalid escape", bytes(buffer).decode(errors="replace"), position)
+        return _SIMPLE_ESCAPES[kind], position + 2
+    length = 6
+    if len(buffer) < position + length:
+        return None
+    if 0xD800 <= int(buffer[position + 2 : position + 6], 16) <= 0xDBFF:
+        # A high surrogate is combined with the low surrogate escape that follows it
+        if len(buffer) < position + 8:
+            return None
+        if buffer[position + 6 : position + 8] == b"\\u":
+            length = 12
+            if len(buffer) < position + length:
+                return None
+    text = json.loads(b'"' + bytes(buffer[position : position + length]) + b'"')
+    return text.encode("utf-8", "surrogatepass"), position + length
+
+
+def parse_json_response(
+    response: httpx.Response,
+    *,
+    spool_fields: typing.Collection[str],
+    max_memory: int = DEFAULT_SPOOL_MAX_MEMORY_BYTES,
+) -> typing.Dict[str, typing.Any]:
+    """
+    Parses the JSON object body of a streamed response without buffering it, see `JsonStreamParser`.
+    """
+    parser = JsonStreamParser(spool_fields=spool_fields, max_memory=max_memory)
+    for chunk in response.iter_bytes():
+        parser.feed(chunk)
+    return parser.close()
+
+
+async def async_parse_json_response(
+    response: httpx.Response,
+    *,
+    spool_fields: typing.Collection[str],
+    max_memory: int = DEFAULT_SPOOL_MAX_MEMORY_BYTES,
+) -> typing.Dict[str, typing.Any]:
+    parser = JsonStreamParser(spool_fields=spool_fields, max_memory=max_memory)
+    async for chunk in response.aiter_bytes():
+        parser.feed(chunk)
+    return parser.close()
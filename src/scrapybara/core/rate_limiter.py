@@ -0,0 +1,187 @@
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+import typing
+from contextlib import contextmanager
+
+import httpx
+import pydantic
+
+from .http_client import MAX_RETRY_DELAY_SECONDS_FROM_HEADER, _parse_retry_after
+
+
+class RateLimiterState(pydantic.BaseModel):
+    """
+    A point-in-time snapshot of a RateLimiter.
+    """
+
+    requests_per_second: typing.Optional[float]
+    burst: int
+    tokens: float
+    backoff_remaining: float
+    throttled_responses: int
+
+
+class RateLimiter:
+    """
+    A token bucket shared by every request sent through the clients it is attached to.
+
+    Requests reserve a token before they are sent and wait until it becomes available. When a response carries a
+    `retry-after` or `retry-after-ms` header every request is held back until that time has passed, not only the one
+    that received it. Passing `lock_path` shares the bucket across processes through an `fcntl` locked state file.
+
+    Parameters
+    ----------
+    requests_per_second : typing.Optional[float]
+        Sustained request rate. When omitted requests are only delayed by Retry-After backoff.
+
+    burst : typing.Optional[int]
+        Number of requests that may be sent at once before the sustained rate applies. Defaults to one second's worth.
+
+    lock_path : typing.Optional[str]
+        Path of a state file used to share the limiter between processes. Not supported on Windows.
+
+    Examples
+    --------
+    from scrapybara import Scrapybara
+    from scrapybara.core import RateLimiter
+
+    limiter = RateLimiter(requests_per_second=20)
+    client = Scrapybara(api_key="YOUR_API_KEY", rate_limiter=limiter)
+    """
+
+    def __init__(
+        self,
+        *,
+        requests_per_second: typing.Optional[float] = None,
+        burst: typing.Optional[int] = None,
+        lock_path: typing.Optional[str] = None,
+    ):
+        if requests_per_second is not None and requests_per_second <= 0:
+            raise ValueError("requests_per_second must be positive")
+        if burst is not None and burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.requests_per_second = requests_per_second
+        self.burst = burst if burst is not None else max(1, math.ceil(requests_per_second or 1))
+        self.lock_path = lock_path
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.time()
+        self._blocked_until = 0.0
+        self._throttled_responses = 0
+
+    def reserve(self) -> float:
+        """
+        Takes a token and returns the number of seconds to wait before sending the request.
+        """
+        with self._locked():
+            now = time.time()
+            self._refill(now)
+            delay = max(0.0, self._blocked_until - now)
+            if self.requests_per_second is not None:
+                self._tokens -= 1
+                if self._tokens < 0:
+                    delay = max(delay, -self._tokens / self.requests_per_second)
+            return delay
+
+    def acquire(self) -> None:
+        time.sleep(self.reserve())
+
+    async def async_acquire(self) -> None:
+        if self.lock_path is None:
+            delay = self.reserve()
+        else:
+            # Waiting for the file lock held by another process would block the event loop
+            delay = await asyncio.get_running_loop().run_in_executor(None, self.reserve)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def backoff(self, seconds: float) -> None:
+        """
+        Holds back every request for the given number of seconds.
+        """
+        with self._locked():
+            self._blocked_until = max(self._blocked_until, time.time() + seconds)
+            self._throttled_responses += 1
+
+    def observe(self, response: httpx.Response) -> None:
+        """
+        Starts a global backoff when the response asks the client to retry later.
+        """
+        retry_after = _parse_retry_after(response.headers)
+        if retry_after is not None:
+            self.backoff(min(retry_after, MAX_RETRY_DELAY_SECONDS_FROM_HEADER))
+
+    async def async_observe(self, response: httpx.Response) -> None:
+        retry_after = _parse_retry_after(response.headers)
+        if retry_after is None:
+            return
+        seconds = min(retry_after, MAX_RETRY_DELAY_SECONDS_FROM_HEADER)
+        if self.lock_path is None:
+            self.backoff(seconds)
+        else:
+            await asyncio.get_running_loop().run_in_executor(None, self.backoff, seconds)
+
+    def state(self) -> RateLimiterState:
+        with self._locked():
+            now = time.time()
+            self._refill(now)
+            return RateLimiterState(
+                requests_per_second=self.requests_per_second,
+                burst=self.burst,
+                tokens=self._tokens,
+                backoff_remaining=max(0.0, self._blocked_until - now),
+                throttled_responses=self._throttled_responses,
+            )
+
+    def _refill(self, now: float) -> None:
+        if self.requests_per_second is not None:
+            elapsed = max(0.0, now - self._updated)
+            self._tokens = min(float(self.burst), self._tokens + elapsed * self.requests_per_second)
+        self._updated = now
+
+    @contextmanager
+    def _locked(self) -> typing.Iterator[None]:
+        with self._lock:
+            if self.lock_path is None:
+                yield
+                return
+
+            import fcntl
+
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                self._load(fd)
+                yield
+                self._store(fd)
+            finally:
+                os.close(fd)  # closing the descriptor releases the lock
+
+    def _load(self, fd: int) -> None:
+        raw = os.pread(fd, 4096, 0)
+        if not raw:
+            return
+        try:
+            state = json.loads(raw)
+            self._tokens = float(state["tokens"])
+            self._updated = float(state["updated"])
+            self._blocked_until = float(state["blocked_until"])
+            self._throttled_responses = int(state["throttled_responses"])
+        except (ValueError, KeyError, TypeError):
+            pass  # a corrupt state file is treated as a fresh bucket
+
+    def _store(self, fd: int) -> None:
+        raw = json.dumps(
+            {
+                "tokens": self._tokens,
+                "updated": self._updated,
+                "blocked_until": self._blocked_until,
+                "throttled_responses": self._throttled_responses,
+            }
+        ).encode()
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, raw, 0)
@@ -18,6 +18,10 @@ class RequestOptions(typing.TypedDict, total=False):
 
         - max_retries: int. The max number of retries to attempt if the API call fails.
 
+        - retry_deadline_in_seconds: float. The total number of seconds, across all attempts and the delays between them, after which no further retries are attempted.
+
+        - idempotent: bool. Whether the request is safe to send again after it may have reached the server, which allows retrying it on read timeouts and dropped connections. Defaults to True for GET, HEAD, OPTIONS, PUT and DELETE requests.
+
         - additional_headers: typing.Dict[str, typing.Any]. A dictionary containing additional parameters to spread into the request's header dict
 
         - additional_query_parameters: typing.Dict[str, typing.Any]. A dictionary containing additional parameters to spread into the request's query parameters dict
@@ -29,6 +33,8 @@ class RequestOptions(typing.TypedDict, total=False):
 
     timeout_in_seconds: NotRequired[int]
     max_retries: NotRequired[int]
+    retry_deadline_in_seconds: NotRequired[float]
+    idempotent: NotRequired[bool]
     additional_headers: NotRequired[typing.Dict[str, typing.Any]]
     additional_query_parameters: NotRequired[typing.Dict[str, typing.Any]]
     additional_body_parameters: NotRequired[typing.Dict[str, typing.Any]]
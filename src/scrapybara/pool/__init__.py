@@ -0,0 +1,901 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Generic,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    TypeVar,
+)
+
+from ..client import (
+    AsyncBaseInstance,
+    AsyncUbuntuInstance,
+    BaseInstance,
+    UbuntuInstance,
+    _arun_batch,
+    _is_unsent_batch_error,
+    _run_batch,
+)
+from ..core.request_options import RequestOptions
+from ..types import BatchResult
+
+T = TypeVar("T")
+InstanceT = TypeVar("InstanceT", bound=BaseInstance)
+AsyncInstanceT = TypeVar("AsyncInstanceT", bound=AsyncBaseInstance)
+
+# Delay before the pool tries to refill again after a failed start
+_START_RETRY_DELAY_SECONDS = 5.0
+
+
+class _Pooled(Generic[T]):
+    __slots__ = ("instance", "uses", "idle_since")
+
+    def __init__(self, instance: T) -> None:
+        self.instance = instance
+        self.uses = 0
+        self.idle_since = time.monotonic()
+
+
+class InstancePool(Generic[InstanceT]):
+    """Keeps pre-started instances of one type and configuration ready to lease.
+
+    Create one pool per instance type and resolution. A background thread keeps ``size`` idle
+    instances started, leases hand them out, and returned instances are either reset and reused
+    or stopped and replaced.
+
+    Args:
+        start: Starts one instance, for example ``lambda: client.start_ubuntu(resolution=[1280, 800])``
+        size: Number of idle instances to keep ready
+        max_instances: Upper bound on idle, starting and leased instances. Unbounded by default
+        reset: Called with a returned instance to make it reusable. Without it returned instances are stopped
+        max_uses: Number of leases after which an instance is stopped even if it could be reset
+        idle_timeout: Seconds after which idle instances above ``size`` are stopped
+        start_concurrency: Number of instances started in parallel while refilling
+
+    Example:
+        with InstancePool(client.start_ubuntu, size=4) as pool:
+            with pool.lease() as instance:
+                instance.bash(command="echo hello")
+    """
+
+    def __init__(
+        self,
+        start: Callable[[], InstanceT],
+        *,
+        size: int = 1,
+        max_instances: Optional[int] = None,
+        reset: Optional[Callable[[InstanceT], None]] = None,
+        max_uses: Optional[int] = None,
+        idle_timeout: float = 300.0,
+        start_concurrency: int = 4,
+    ) -> None:
+        if size < 0:
+            raise ValueError("size must not be negative")
+        if max_instances is not None and max_instances < max(size, 1):
+            raise ValueError("max_instances must be at least size and 1")
+        self.start_instance = start
+        self.size = size
+        self.max_instances = max_instances
+        self.reset = reset
+        self.max_uses = max_uses
+        self.idle_timeout = idle_timeout
+        self.last_error: Optional[Exception] = None
+        self._idle: Deque[_Pooled[InstanceT]] = deque()
+        self._leased = 0
+        self._starting = 0
+        self._closed = False
+        self._retry_at = 0.0
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=start_concurrency, thread_name_prefix="scrapybara-pool")
+        self._thread = threading.Thread(target=self._maintain, name="scrapybara-pool", daemon=True)
+        self._thread.start()
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    @property
+    def leased(self) -> int:
+        return self._leased
+
+    @property
+    def starting(self) -> int:
+        return self._starting
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[InstanceT]:
+        """Leases an instance for the duration of the block.
+
+        An idle instance is handed out when one is ready, otherwise one is started on demand. When
+        ``max_instances`` is reached the call waits up to ``timeout`` seconds for a return.
+
+        Raises:
+            TimeoutError: If no instance became available within ``timeout``
+        """
+        pooled = self._acquire(timeout)
+        healthy = False
+        try:
+            yield pooled.instance
+            healthy = True
+        finally:
+            self._release(pooled, healthy)
+
+    def close(self) -> None:
+        """Stops the background refill and every idle instance.
+
+        Leased instances are stopped when they are returned.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._condition.notify_all()
+        self._thread.join()
+        list(self._executor.map(self._stop, [pooled.instance for pooled in idle]))
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "InstancePool[InstanceT]":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _stop(self, instance: BaseInstance) -> None:
+        try:
+            instance.stop()
+        except Exception:
+            pass  # the instance may already have timed out or been stopped elsewhere
+
+    def _total(self) -> int:
+        return len(self._idle) + self._starting + self._leased
+
+    def _has_capacity(self) -> bool:
+        return self.max_instances is None or self._total() < self.max_instances
+
+    def _acquire(self, timeout: Optional[float]) -> _Pooled[InstanceT]:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("InstancePool is closed")
+                if self._idle:
+                    pooled = self._idle.popleft()
+                    self._leased += 1
+                    self._condition.notify_all()
+                    return pooled
+                if self._has_capacity():
+                    self._leased += 1
+                    break
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Timed out waiting for a pooled instance")
+                self._condition.wait(remaining)
+
+        # Nothing warm is available, start one on demand
+        try:
+            return _Pooled(self.start_instance())
+        except BaseException:
+            with self._condition:
+                self._leased -= 1
+                self._condition.notify_all()
+            raise
+
+    def _release(self, pooled: _Pooled[InstanceT], healthy: bool) -> None:
+        pooled.uses += 1
+        reusable = (
+            healthy
+            and not self._closed
+            and self.reset is not None
+            and (self.max_uses is None or pooled.uses < self.max_uses)
+        )
+        if reusable and self.reset is not None:
+            try:
+                self.reset(pooled.instance)
+            except Exception:
+                reusable = False
+
+        with self._condition:
+            self._leased -= 1
+            reused = reusable and not self._closed
+            if reused:
+                pooled.idle_since = time.monotonic()
+                self._idle.append(pooled)
+            self._condition.notify_all()
+        if not reused:
+            self._discard(pooled.instance)
+
+    def _discard(self, instance: BaseInstance) -> None:
+        try:
+            self._executor.submit(self._stop, instance)
+        except RuntimeError:
+            self._stop(instance)  # the executor has shut down
+
+    def _refill(self) -> None:
+        try:
+            instance = self.start_instance()
+        except Exception as e:
+            with self._condition:
+                self._starting -= 1
+                self.last_error = e
+                self._retry_at = time.monotonic() + _START_RETRY_DELAY_SECONDS
+                self._condition.notify_all()
+            return
+
+        with self._condition:
+            self._starting -= 1
+            closed = self._closed
+            if not closed:
+                self._idle.append(_Pooled(instance))
+            self._condition.notify_all()
+        if closed:
+            self._stop(instance)
+
+    def _maintain(self) -> None:
+        with self._condition:
+            while not self._closed:
+                now = time.monotonic()
+                if now >= self._retry_at:
+                    while len(self._idle) + self._starting < self.size and self._has_capacity():
+                        self._starting += 1
+                        self._executor.submit(self._refill)
+
+                # The oldest idle instance is on the left, surplus ones are stopped once they expire
+                while len(self._idle) > self.size and now - self._idle[0].idle_since >= self.idle_timeout:
+                    self._discard(self._idle.popleft().instance)
+
+                wait = min(self.idle_timeout, 1.0)
+                if now < self._retry_at:
+                    wait = min(wait, self._retry_at - now)
+                self._condition.wait(wait)
+
+
+class AsyncInstancePool(Generic[AsyncInstanceT]):
+    """Keeps pre-started instances of one type and configuration ready to lease.
+
+    The async counterpart of ``InstancePool``. Refilling runs as a task on the running event loop and
+    starts with the first lease or ``async with``.
+
+    Args:
+        start: Starts one instance, for example ``lambda: client.start_ubuntu(resolution=[1280, 800])``
+        size: Number of idle instances to keep ready
+        max_instances: Upper bound on idle, starting and leased instances. Unbounded by default
+        reset: Awaited with a returned instance to make it reusable. Without it returned instances are stopped
+        max_uses: Number of leases after which an instance is stopped even if it could be reset
+        idle_timeout: Seconds after which idle instances above ``size`` are stopped
+        start_concurrency: Number of instances started in parallel while refilling
+
+    Example:
+        async with AsyncInstancePool(client.start_ubuntu, size=4) as pool:
+            async with pool.lease() as instance:
+                await instance.bash(command="echo hello")
+    """
+
+    def __init__(
+        self,
+        start: Callable[[], Awaitable[AsyncInstanceT]],
+        *,
+        size: int = 1,
+        max_instances: Optional[int] = None,
+        reset: Optional[Callable[[AsyncInstanceT], Awaitable[None]]] = None,
+        max_uses: Optional[int] = None,
+        idle_timeout: float = 300.0,
+        start_concurrency: int = 4,
+    ) -> None:
+        if size < 0:
+            raise ValueError("size must not be negative")
+        if max_instances is not None and max_instances < max(size, 1):
+            raise ValueError("max_instances must be at least size and 1")
+        self.start_instance = start
+        self.size = size
+        self.max_instances = max_instances
+        self.reset = reset
+        self.max_uses = max_uses
+        self.idle_timeout = idle_timeout
+        self.start_concurrency = start_concurrency
+        self.last_error: Optional[Exception] = None
+        self._idle: Deque[_Pooled[AsyncInstanceT]] = deque()
+        self._leased = 0
+        self._starting = 0
+        self._closed = False
+        self._retry_at = 0.0
+        self._condition: Optional[asyncio.Condition] = None
+        self._maintainer: Optional["asyncio.Task[None]"] = None
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    @property
+    def leased(self) -> int:
+        return self._leased
+
+    @property
+    def starting(self) -> int:
+        return self._starting
+
+    def start(self) -> None:
+        """Starts refilling the pool on the running event loop."""
+        if self._maintainer is None:
+            self._condition = asyncio.Condition()
+            self._maintainer = asyncio.create_task(self._maintain())
+
+    @asynccontextmanager
+    async def lease(self, timeout: Optional[float] = None) -> AsyncIterator[AsyncInstanceT]:
+        """Leases an instance for the duration of the block.
+
+        An idle instance is handed out when one is ready, otherwise one is started on demand. When
+        ``max_instances`` is reached the call waits up to ``timeout`` seconds for a return.
+
+        Raises:
+            TimeoutError: If no instance became available within ``timeout``
+        """
+        pooled = await self._acquire(timeout)
+        healthy = False
+        try:
+            yield pooled.instance
+            healthy = True
+        finally:
+            await self._release(pooled, healthy)
+
+    async def close(self) -> None:
+        """Stops the background refill and every idle instance.
+
+        Leased instances are stopped when they are returned.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        idle = list(self._idle)
+        self._idle.clear()
+        if self._condition is not None:
+            async with self._condition:
+                self._condition.notify_all()
+        if self._maintainer is not None:
+            await self._maintainer
+        await asyncio.gather(*(self._stop(pooled.instance) for pooled in idle))
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def __aenter__(self) -> "AsyncInstancePool[AsyncInstanceT]":
+        self.start()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def _stop(self, instance: AsyncBaseInstance) -> None:
+        try:
+            await instance.stop()
+        except Exception:
+            pass  # the instance may already have timed out or been stopped elsewhere
+
+    def _spawn(self, coroutine: Awaitable[None]) -> None:
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _total(self) -> int:
+        return len(self._idle) + self._starting + self._leased
+
+    def _has_capacity(self) -> bool:
+        return self.max_instances is None or self._total() < self.max_instances
+
+    def _notify(self) -> None:
+        if self._condition is not None:
+            self._spawn(self._notify_all(self._condition))
+
+    @staticmethod
+    async def _notify_all(condition: asyncio.Condition) -> None:
+        async with condition:
+            condition.notify_all()
+
+    async def _acquire(self, timeout: Optional[float]) -> _Pooled[AsyncInstanceT]:
+        self.start()
+        assert self._condition is not None
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        async with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("AsyncInstancePool is closed")
+                if self._idle:
+                    pooled = self._idle.popleft()
+                    self._leased += 1
+                    self._condition.notify_all()
+                    return pooled
+                if self._has_capacity():
+                    self._leased += 1
+                    break
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Timed out waiting for a pooled instance")
+                try:
+                    await asyncio.wait_for(self._condition.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+        # Nothing warm is available, start one on demand
+        try:
+            return _Pooled(await self.start_instance())
+        except BaseException:
+            self._leased -= 1
+            self._notify()
+            raise
+
+    async def _release(self, pooled: _Pooled[AsyncInstanceT], healthy: bool) -> None:
+        pooled.uses += 1
+        reusable = (
+            healthy
+            and not self._closed
+            and self.reset is not None
+            and (self.max_uses is None or pooled.uses < self.max_uses)
+        )
+        if reusable and self.reset is not None:
+            try:
+                await self.reset(pooled.instance)
+            except Exception:
+                reusable = False
+
+        self._leased -= 1
+        if reusable and not self._closed:
+            pooled.idle_since = time.monotonic()
+            self._idle.append(pooled)
+        elif self._closed:
+            await self._stop(pooled.instance)
+        else:
+            self._spawn(self._stop(pooled.instance))
+        self._notify()
+
+    async def _refill(self, semaphore: asyncio.Semaphore) -> None:
+        async with semaphore:
+            try:
+                instance = await self.start_instance()
+            except Exception as e:
+                self.last_error = e
+                self._retry_at = time.monotonic() + _START_RETRY_DELAY_SECONDS
+                instance = None
+        self._starting -= 1
+        if instance is not None:
+            if self._closed:
+                await self._stop(instance)
+            else:
+                self._idle.append(_Pooled(instance))
+        self._notify()
+
+    async def _maintain(self) -> None:
+        assert self._condition is not None
+        semaphore = asyncio.Semaphore(self.start_concurrency)
+        async with self._condition:
+            while not self._closed:
+                now = time.monotonic()
+                if now >= self._retry_at:
+                    while len(self._idle) + self._starting < self.size and self._has_capacity():
+                        self._starting += 1
+                        self._spawn(self._refill(semaphore))
+
+                # The oldest idle instance is on the left, surplus ones are stopped once they expire
+                while len(self._idle) > self.size and now - self._idle[0].idle_since >= self.idle_timeout:
+                    self._spawn(self._stop(self._idle.popleft().instance))
+
+                wait = min(self.idle_timeout, 1.0)
+                if now < self._retry_at:
+                    wait = min(wait, self._retry_at - now)
+                try:
+                    await asyncio.wait_for(self._condition.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+
+
+
+class _Session:
+    __slots__ = ("id", "ready", "hung")
+
+    def __init__(self, id: int) -> None:
+        self.id = id
+        self.ready = False  # False until the session was set up, and again after it was restarted
+        self.hung = False  # True while a restart is still owed
+
+
+class BashSessionPool:
+    """Runs independent commands concurrently across the bash sessions of one instance.
+
+    Sessions are numbered from ``first_session`` and opened on first use. A returned session stays warm with
+    its working directory and environment for the next lease. When a command times out or raises, the session
+    is restarted before it is handed out again. Commands are not retried unless ``retries`` is given, and then
+    only when the request never reached the instance.
+
+    Args:
+        instance: Instance whose bash sessions are pooled
+        size: Number of sessions commands run across
+        setup: Command run in every new or restarted session, for example ``cd /repo && source .venv/bin/activate``
+        timeout: Default timeout in seconds for commands run with ``run`` and ``run_many``
+        first_session: Number of the first pooled session, the sessions below it are left alone
+
+    Example:
+        with BashSessionPool(instance, size=4, setup="cd /repo") as sessions:
+            result = sessions.run_many(["make lint", "make test", "make docs"])
+    """
+
+    def __init__(
+        self,
+        instance: UbuntuInstance,
+        *,
+        size: int = 4,
+        setup: Optional[str] = None,
+        timeout: Optional[float] = None,
+        first_session: int = 1,
+    ) -> None:
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.instance = instance
+        self.size = size
+        self.setup = setup
+        self.timeout = timeout
+        self.first_session = first_session
+        self._idle: List[_Session] = []
+        self._opened = 0
+        self._leased = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    @property
+    def leased(self) -> int:
+        return self._leased
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[int]:
+        """Leases a session number for the duration of the block.
+
+        The most recently returned session is handed out first. When every session is leased the call waits
+        up to ``timeout`` seconds for a return. If the block raises, the session is restarted.
+
+        Raises:
+            TimeoutError: If no session became available within ``timeout``
+        """
+        with self._lease(timeout) as session:
+            yield session.id
+
+    def run(
+        self,
+        command: str,
+        *,
+        timeout: Optional[float] = None,
+        request_options: Optional[RequestOptions] = None,
+    ) -> Optional[Any]:
+        """Runs a command in a pooled session.
+
+        When the command times out, the session is restarted before it is leased again, so a command still
+        running in it does not block the next one.
+
+        Args:
+            command: Command to run
+            timeout: Seconds the command may run, defaults to the pool's ``timeout``
+            request_options: Request-specific configuration
+
+        Returns:
+            The bash response of the command
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        with self._lease(None) as session:
+            started = time.monotonic()
+            response = self.instance.bash(
+                command=command, session=session.id, timeout=timeout, request_options=request_options
+            )
+            # A timed out command may still be running in the session, so it is restarted before its next use
+            session.hung = _is_hung(response, time.monotonic() - started, timeout)
+            return response
+
+    @contextmanager
+    def _lease(self, timeout: Optional[float]) -> Iterator[_Session]:
+        session = self._acquire(timeout)
+        healthy = False
+        try:
+            if not session.ready:
+                self._prepare(session)
+            yield session
+            healthy = not session.hung
+        finally:
+            if not healthy:
+                self._reap(session)
+            self._release(session)
+
+    def run_many(
+        self,
+        commands: Sequence[str],
+        *,
+        retries: int = 0,
+        request_options: Optional[RequestOptions] = None,
+    ) -> BatchResult[Any]:
+        """Runs independent commands concurrently, one per session at a time.
+
+        Args:
+            commands: Commands to run, in no particular order
+            retries: Number of times a command is retried when its request never reached the instance
+            request_options: Request-specific configuration
+
+        Returns:
+            BatchResult: Bash responses in the order of ``commands``, with the commands that raised as failures
+        """
+        return _run_batch(
+            commands,
+            lambda command: self.run(command, request_options=request_options),
+            concurrency=self.size,
+            retries=retries,
+            retry_if=_is_unsent_command_error,
+        )
+
+    def close(self) -> None:
+        """Stops handing out sessions. Sessions are left open on the instance."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def __enter__(self) -> "BashSessionPool":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def _acquire(self, timeout: Optional[float]) -> _Session:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("BashSessionPool is closed")
+                if self._idle:
+                    session = self._idle.pop()
+                    break
+                if self._opened < self.size:
+                    session = _Session(self.first_session + self._opened)
+                    self._opened += 1
+                    break
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Timed out waiting for a pooled bash session")
+                self._condition.wait(remaining)
+            self._leased += 1
+            return session
+
+    def _release(self, session: _Session) -> None:
+        with self._condition:
+            self._leased -= 1
+            self._idle.append(session)
+            self._condition.notify()
+
+    def _prepare(self, session: _Session) -> None:
+        if session.hung:
+            self.instance.bash(session=session.id, restart=True)
+            session.hung = False
+        if self.setup is not None:
+            self.instance.bash(command=self.setup, session=session.id, timeout=self.timeout)
+        session.ready = True
+
+    def _reap(self, session: _Session) -> None:
+        session.ready, session.hung = False, True
+        try:
+            self.instance.bash(session=session.id, restart=True)
+            session.hung = False
+        except Exception:
+            pass  # the restart is retried before the session is leased again
+
+
+class AsyncBashSessionPool:
+    """Runs independent commands concurrently across the bash sessions of one instance.
+
+    The async counterpart of ``BashSessionPool``.
+
+    Args:
+        instance: Instance whose bash sessions are pooled
+        size: Number of sessions commands run across
+        setup: Command run in every new or restarted session, for example ``cd /repo && source .venv/bin/activate``
+        timeout: Default timeout in seconds for commands run with ``run`` and ``run_many``
+        first_session: Number of the first pooled session, the sessions below it are left alone
+
+    Example:
+        async with AsyncBashSessionPool(instance, size=4, setup="cd /repo") as sessions:
+            result = await sessions.run_many(["make lint", "make test", "make docs"])
+    """
+
+    def __init__(
+        self,
+        instance: AsyncUbuntuInstance,
+        *,
+        size: int = 4,
+        setup: Optional[str] = None,
+        timeout: Optional[float] = None,
+        first_session: int = 1,
+    ) -> None:
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.instance = instance
+        self.size = size
+        self.setup = setup
+        self.timeout = timeout
+        self.first_session = first_session
+        self._idle: List[_Session] = []
+        self._opened = 0
+        self._leased = 0
+        self._closed = False
+        self._condition: Optional[asyncio.Condition] = None
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    @property
+    def leased(self) -> int:
+        return self._leased
+
+    @asynccontextmanager
+    async def lease(self, timeout: Optional[float] = None) -> AsyncIterator[int]:
+        """Leases a session number for the duration of the block.
+
+        The most recently returned session is handed out first. When every session is leased the call waits
+        up to ``timeout`` seconds for a return. If the block raises, the session is restarted.
+
+        Raises:
+            TimeoutError: If no session became available within ``timeout``
+        """
+        async with self._lease(timeout) as session:
+            yield session.id
+
+    async def run(
+        self,
+        command: str,
+        *,
+        timeout: Optional[float] = None,
+        request_options: Optional[RequestOptions] = None,
+    ) -> Optional[Any]:
+        """Runs a command in a pooled session.
+
+        When the command times out, the session is restarted before it is leased again, so a command still
+        running in it does not block the next one.
+
+        Args:
+            command: Command to run
+            timeout: Seconds the command may run, defaults to the pool's ``timeout``
+            request_options: Request-specific configuration
+
+        Returns:
+            The bash response of the command
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        async with self._lease(None) as session:
+            started = time.monotonic()
+            response = await self.instance.bash(
+                command=command, session=session.id, timeout=timeout, request_options=request_options
+            )
+            # A timed out command may still be running in the session, so it is restarted before its next use
+            session.hung = _is_hung(response, time.monotonic() - started, timeout)
+            return response
+
+    @asynccontextmanager
+    async def _lease(self, timeout: Optional[float]) -> AsyncIterator[_Session]:
+        session = await self._acquire(timeout)
+        healthy = False
+        try:
+            if not session.ready:
+                await self._prepare(session)
+            yield session
+            healthy = not session.hung
+        finally:
+            if not healthy:
+                await self._reap(session)
+            await self._release(session)
+
+    async def run_many(
+        self,
+        commands: Sequence[str],
+        *,
+        retries: int = 0,
+        request_options: Optional[RequestOptions] = None,
+    ) -> BatchResult[Any]:
+        """Runs independent commands concurrently, one per session at a time.
+
+        Args:
+            commands: Commands to run, in no particular order
+            retries: Number of times a command is retried when its request never reached the instance
+            request_options: Request-specific configuration
+
+        Returns:
+            BatchResult: Bash responses in the order of ``commands``, with the commands that raised as failures
+        """
+        return await _arun_batch(
+            commands,
+            lambda command: self.run(command, request_options=request_options),
+            concurrency=self.size,
+            retries=retries,
+            retry_if=_is_unsent_command_error,
+        )
+
+    async def close(self) -> None:
+        """Stops handing out sessions. Sessions are left open on the instance."""
+        self._closed = True
+        if self._condition is not None:
+            async with self._condition:
+                self._condition.notify_all()
+
+    async def __aenter__(self) -> "AsyncBashSessionPool":
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def _acquire(self, timeout: Optional[float]) -> _Session:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        async with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("AsyncBashSessionPool is closed")
+                if self._idle:
+                    session = self._idle.pop()
+                    break
+                if self._opened < self.size:
+                    session = _Session(self.first_session + self._opened)
+                    self._opened += 1
+                    break
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("Timed out waiting for a pooled bash session")
+                try:
+                    await asyncio.wait_for(self._condition.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+            self._leased += 1
+            return session
+
+    async def _release(self, session: _Session) -> None:
+        assert self._condition is not None
+        async with self._condition:
+            self._leased -= 1
+            self._idle.append(session)
+            self._condition.notify()
+
+    async def _prepare(self, session: _Session) -> None:
+        if session.hung:
+            await self.instance.bash(session=session.id, restart=True)
+            session.hung = False
+        if self.setup is not None:
+            await self.instance.bash(command=self.setup, session=session.id, timeout=self.timeout)
+        session.ready = True
+
+    async def _reap(self, session: _Session) -> None:
+        session.ready, session.hung = False, True
+        try:
+            await self.instance.bash(session=session.id, restart=True)
+            session.hung = False
+        except Exception:
+            pass  # the restart is retried before the session is leased again
+
+
+def _is_hung(response: Any, seconds: float, timeout: Optional[float]) -> bool:
+    """Whether a bash response shows that its command timed out and may still be running."""
+    if timeout is not None and seconds >= timeout:
+        return True
+    error = (getattr(response, "error", None) or "").lower()
+    return "timed out" in error or "must be restarted" in error
+
+
+def _is_unsent_command_error(_: str, error: BaseException) -> bool:
+    # Commands are not idempotent, so they are only sent again when the first request never reached the instance
+    return _is_unsent_batch_error(error)
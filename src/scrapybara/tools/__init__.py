@@ -1,8 +1,8 @@
-from typing import Any, List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
 from ..types import Action, Button, ClickMouseActionClickType, Tool
-from ..client import BaseInstance, UbuntuInstance
+from ..client import AsyncBaseInstance, AsyncUbuntuInstance, BaseInstance, UbuntuInstance
 from ..instance.types import Command
 from typing import Literal
 
@@ -41,76 +41,102 @@ class ComputerTool(Tool):
             name="computer",
             description="Control mouse and keyboard for computer interaction",
             parameters=ComputerToolParameters,
+            sequential=True,
         )
         self._instance = instance
 
     def __call__(self, **kwargs: Any) -> Any:
         params = ComputerToolParameters.model_validate(kwargs)
+        return self._instance.computer(**_computer_action_kwargs(params))
 
-        if params.action == "move_mouse":
-            if not params.coordinates:
-                raise ValueError("coordinates is required for move_mouse action")
-            return self._instance.computer(
-                action=params.action,
-                coordinates=params.coordinates,
-                hold_keys=params.hold_keys,
-            )
-        elif params.action == "click_mouse":
-            if not params.button:
-                raise ValueError("button is required for click_mouse action")
-            return self._instance.computer(
-                action=params.action,
-                button=params.button,
-                click_type=params.click_type,
-                coordinates=params.coordinates,
-                num_clicks=params.num_clicks,
-                hold_keys=params.hold_keys,
-            )
-        elif params.action == "drag_mouse":
-            if not params.path:
-                raise ValueError("path is required for drag_mouse action")
-            return self._instance.computer(
-                action=params.action,
-                path=params.path,
-                hold_keys=params.hold_keys,
-            )
-        elif params.action == "scroll":
-            return self._instance.computer(
-                action=params.action,
-                coordinates=params.coordinates,
-                delta_x=params.delta_x,
-                delta_y=params.delta_y,
-                hold_keys=params.hold_keys,
-            )
-        elif params.action == "press_key":
-            if not params.keys:
-                raise ValueError("keys is required for press_key action")
-            return self._instance.computer(
-                action=params.action,
-                keys=params.keys,
-                duration=params.duration,
-            )
-        elif params.action == "type_text":
-            if not params.text:
-                raise ValueError("text is required for type_text action")
-            return self._instance.computer(
-                action=params.action,
-                text=params.text,
-                hold_keys=params.hold_keys,
-            )
-        elif params.action == "wait":
-            if params.duration is None:
-                raise ValueError("duration is required for wait action")
-            return self._instance.computer(
-                action=params.action,
-                duration=params.duration,
-            )
-        elif params.action == "take_screenshot":
-            return self._instance.computer(action=params.action)
-        elif params.action == "get_cursor_position":
-            return self._instance.computer(action=params.action)
-        else:
-            raise ValueError(f"Unknown action: {params.action}")
+
+class AsyncComputerTool(Tool):
+    """A computer interaction tool that allows the agent to control mouse and keyboard.
+
+    Available for async Ubuntu, Browser, and Windows instances."""
+
+    _instance: AsyncBaseInstance
+
+    def __init__(self, instance: AsyncBaseInstance) -> None:
+        super().__init__(
+            name="computer",
+            description="Control mouse and keyboard for computer interaction",
+            parameters=ComputerToolParameters,
+            sequential=True,
+        )
+        self._instance = instance
+
+    async def __call__(self, **kwargs: Any) -> Any:
+        params = ComputerToolParameters.model_validate(kwargs)
+        return await self._instance.computer(**_computer_action_kwargs(params))
+
+
+def _computer_action_kwargs(params: ComputerToolParameters) -> Dict[str, Any]:
+    """Validate the parameters required by the action and map them to `computer` arguments."""
+    if params.action == "move_mouse":
+        if not params.coordinates:
+            raise ValueError("coordinates is required for move_mouse action")
+        return dict(
+            action=params.action,
+            coordinates=params.coordinates,
+            hold_keys=params.hold_keys,
+        )
+    elif params.action == "click_mouse":
+        if not params.button:
+            raise ValueError("button is required for click_mouse action")
+        return dict(
+            action=params.action,
+            button=params.button,
+            click_type=params.click_type,
+            coordinates=params.coordinates,
+            num_clicks=params.num_clicks,
+            hold_keys=params.hold_keys,
+        )
+    elif params.action == "drag_mouse":
+        if not params.path:
+            raise ValueError("path is required for drag_mouse action")
+        return dict(
+            action=params.action,
+            path=params.path,
+            hold_keys=params.hold_keys,
+        )
+    elif params.action == "scroll":
+        return dict(
+            action=params.action,
+            coordinates=params.coordinates,
+            delta_x=params.delta_x,
+            delta_y=params.delta_y,
+            hold_keys=params.hold_keys,
+        )
+    elif params.action == "press_key":
+        if not params.keys:
+            raise ValueError("keys is required for press_key action")
+        return dict(
+            action=params.action,
+            keys=params.keys,
+            duration=params.duration,
+        )
+    elif params.action == "type_text":
+        if not params.text:
+            raise ValueError("text is required for type_text action")
+        return dict(
+            action=params.action,
+            text=params.text,
+            hold_keys=params.hold_keys,
+        )
+    elif params.action == "wait":
+        if params.duration is None:
+            raise ValueError("duration is required for wait action")
+        return dict(
+            action=params.action,
+            duration=params.duration,
+        )
+    elif params.action == "take_screenshot":
+        return dict(action=params.action)
+    elif params.action == "get_cursor_position":
+        return dict(action=params.action)
+    else:
+        raise ValueError(f"Unknown action: {params.action}")
 
 
 class EditToolParameters(BaseModel):
@@ -145,6 +171,7 @@ class EditTool(Tool):
             name="str_replace_editor",
             description="View, create, and edit files in the filesystem",
             parameters=EditToolParameters,
+            sequential=True,
         )
         self._instance = instance
 
@@ -161,6 +188,35 @@ class EditTool(Tool):
         )
 
 
+class AsyncEditTool(Tool):
+    """A filesystem editor tool that allows the agent to view, create, and edit files.
+
+    Available for async Ubuntu instances."""
+
+    _instance: AsyncUbuntuInstance
+
+    def __init__(self, instance: AsyncUbuntuInstance) -> None:
+        super().__init__(
+            name="str_replace_editor",
+            description="View, create, and edit files in the filesystem",
+            parameters=EditToolParameters,
+            sequential=True,
+        )
+        self._instance = instance
+
+    async def __call__(self, **kwargs: Any) -> Any:
+        params = EditToolParameters.model_validate(kwargs)
+        return await self._instance.edit(
+            command=params.command,
+            path=params.path,
+            file_text=params.file_text,
+            view_range=params.view_range,
+            old_str=params.old_str,
+            new_str=params.new_str,
+            insert_line=params.insert_line,
+        )
+
+
 class BashToolParameters(BaseModel):
     """Parameters for bash command execution."""
 
@@ -184,6 +240,7 @@ class BashTool(Tool):
             name="bash",
             description="Execute bash commands in the shell",
             parameters=BashToolParameters,
+            sequential=True,
         )
         self._instance = instance
 
@@ -198,3 +255,30 @@ class BashTool(Tool):
             timeout=params.timeout,
         )
 
+
+class AsyncBashTool(Tool):
+    """A shell execution tool that allows the agent to run bash commands.
+
+    Available for async Ubuntu instances."""
+
+    _instance: AsyncUbuntuInstance
+
+    def __init__(self, instance: AsyncUbuntuInstance) -> None:
+        super().__init__(
+            name="bash",
+            description="Execute bash commands in the shell",
+            parameters=BashToolParameters,
+            sequential=True,
+        )
+        self._instance = instance
+
+    async def __call__(self, **kwargs: Any) -> Any:
+        params = BashToolParameters.model_validate(kwargs)
+        return await self._instance.bash(
+            command=params.command,
+            session=params.session,
+            restart=params.restart,
+            list_sessions=params.list_sessions,
+            check_session=params.check_session,
+            timeout=params.timeout,
+        )
@@ -50,13 +50,25 @@ from .act import (
     ToolMessage,
     Message,
     Model,
+    ScreenshotOptions,
     SingleActRequest,
     TokenUsage,
     SingleActResponse,
     Step,
     ActResponse,
+    ActTask,
+    ActManyStats,
+    ActManyResult,
 )
 from .tool import Tool, ApiTool
+from .connection_pool import ConnectionPoolStats
+from .batch import BatchFailure, BatchResult
+from .chunked_upload import ChunkedUploadResponse
+from .computer_batch import ComputerActionResult, ComputerBatchResponse
+from .directory_sync import DirectorySyncResponse
+from .download import DownloadResponse
+from .file_operation import FileOperation
+from .screenshot_payload import ScreenshotPayload
 
 Action = Literal[
     "move_mouse",
@@ -71,26 +83,38 @@ Action = Literal[
 ]
 
 __all__ = [
+    "ActManyResult",
+    "ActManyStats",
     "ActResponse",
+    "ActTask",
     "Action",
     "ApiTool",
     "AssistantMessage",
     "AuthStateResponse",
     "BashResponse",
+    "BatchFailure",
+    "BatchResult",
     "BrowserAuthenticateResponse",
     "BrowserGetCdpUrlResponse",
     "BrowserGetCurrentUrlResponse",
     "Button",
     "CellType",
+    "ChunkedUploadResponse",
     "ClickMouseAction",
     "ClickMouseActionClickType",
+    "ComputerActionResult",
+    "ComputerBatchResponse",
     "ComputerResponse",
+    "ConnectionPoolStats",
     "DeploymentConfigInstanceType",
+    "DirectorySyncResponse",
+    "DownloadResponse",
     "DragMouseAction",
     "EditResponse",
     "EnvGetResponse",
     "EnvResponse",
     "ExecuteCellRequest",
+    "FileOperation",
     "FileResponse",
     "GetCursorPositionAction",
     "GetInstanceResponse",
@@ -108,6 +132,8 @@ __all__ = [
     "NotebookCell",
     "PressKeyAction",
     "SaveBrowserAuthResponse",
+    "ScreenshotOptions",
+    "ScreenshotPayload",
     "ScrollAction",
     "SingleActRequest",
     "SingleActResponse",
@@ -1,5 +1,5 @@
-from typing import Any, Dict, List, Literal, Optional, Union, Generic, TypeVar
-from pydantic import BaseModel
+from typing import Any, Dict, List, Literal, Optional, Type, Union, Generic, TypeVar
+from pydantic import BaseModel, ConfigDict, Field
 from .tool import Tool, ApiTool  # noqa: F401
 
 OutputT = TypeVar("OutputT")
@@ -66,6 +66,23 @@ class Model(BaseModel):
     api_key: Optional[str] = None
 
 
+class ScreenshotOptions(BaseModel):
+    """Downscaling and re-encoding applied to tool result screenshots before they are sent to the model.
+
+    Requires Pillow (`pip install pillow`).
+
+    Args:
+        max_edge: Maximum length in pixels of the longest image side, larger screenshots are resized keeping their aspect ratio.
+            The coordinates of later computer tool calls on the same instance are scaled back to the screen.
+        format: Image format to re-encode screenshots as
+        quality: Encoder quality for lossy formats, from 1 to 100
+    """
+
+    max_edge: Optional[int] = None
+    format: Literal["jpeg", "webp", "png"] = "jpeg"
+    quality: int = 80
+
+
 class SingleActRequest(BaseModel):
     model: Model
     system: Optional[str] = None
@@ -117,3 +134,59 @@ class ActResponse(BaseModel, Generic[OutputT]):
     text: Optional[str] = None
     output: OutputT
     usage: Optional[TokenUsage] = None
+
+
+# Batch act
+class ActTask(BaseModel):
+    """One agent loop run by `act_many`, the fields are passed to `act`.
+
+    Tools carry the instance the loop acts on, for example `tools=[ComputerTool(instance)]`.
+    """
+
+    model: Model
+    tools: Optional[List[Tool]] = None
+    system: Optional[str] = None
+    prompt: Optional[str] = None
+    messages: Optional[List[Message]] = None
+    schema_: Optional[Type[BaseModel]] = Field(default=None, alias="schema")
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+    images_to_keep: Optional[int] = 4
+    dedupe_screenshots: Optional[int] = None
+    screenshot_options: Optional[ScreenshotOptions] = None
+    tool_concurrency: Optional[int] = None
+    pipeline: bool = False
+
+    model_config = ConfigDict(populate_by_name=True, protected_namespaces=())
+
+
+class ActManyStats(BaseModel):
+    """Aggregate progress of an `act_many` run."""
+
+    completed: int = 0
+    failed: int = 0
+    steps: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    total_tokens: int = 0
+    elapsed: float = 0.0  # Seconds since the run started
+
+    @property
+    def tasks_per_second(self) -> float:
+        return (self.completed + self.failed) / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.total_tokens / self.elapsed if self.elapsed else 0.0
+
+
+class ActManyResult(BaseModel):
+    """A finished `act_many` task. Exactly one of `response` and `error` is set."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    index: int  # Position of the task in the input
+    response: Optional[ActResponse[Any]] = None
+    error: Optional[BaseException] = None
+    elapsed: float  # Seconds the task took
+    stats: ActManyStats  # Totals across the run, including this result
@@ -0,0 +1,30 @@
+from typing import Generic, List, Optional, TypeVar
+from pydantic import BaseModel, ConfigDict
+
+ResultT = TypeVar("ResultT")
+
+
+class BatchFailure(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    index: int  # Position of the item in the batch
+    instance_id: Optional[str] = None
+    error: BaseException
+    attempts: int
+
+
+class BatchResult(BaseModel, Generic[ResultT]):
+    """Outcome of a bulk operation. Items that failed are None in `results` and listed in `failures`."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    results: List[Optional[ResultT]]
+    failures: List[BatchFailure]
+
+    @property
+    def ok(self) -> bool:
+        return not self.failures
+
+    @property
+    def succeeded(self) -> List[ResultT]:
+        return [result for result in self.results if result is not None]
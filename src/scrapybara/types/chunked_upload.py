@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+
+class ChunkedUploadResponse(BaseModel):
+    path: str
+    size: int
+    sha256: str
+    chunks: int
+    skipped_chunks: int  # Already on the instance from an earlier, interrupted upload
+    resent_chunks: int  # Uploaded again after failing verification
@@ -0,0 +1,36 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+from .computer_response import ComputerResponse
+
+
+class ComputerActionResult(BaseModel):
+    action: str
+    response: ComputerResponse
+    seconds: float  # Round-trip time of the action's request
+
+
+class ComputerBatchResponse(BaseModel):
+    """Outcome of `computer_batch`. Actions after one that returned an error are not run."""
+
+    actions: int  # Number of actions in the batch
+    results: List[ComputerActionResult]
+
+    @property
+    def ok(self) -> bool:
+        return len(self.results) == self.actions and self.error is None
+
+    @property
+    def error(self) -> Optional[str]:
+        return next((result.response.error for result in self.results if result.response.error), None)
+
+    @property
+    def base_64_image(self) -> Optional[str]:
+        """Screenshot taken after the final action, None when the batch stopped early."""
+        if len(self.results) < self.actions:
+            return None
+        return self.results[-1].response.base_64_image if self.results else None
+
+    @property
+    def seconds(self) -> float:
+        return sum(result.seconds for result in self.results)
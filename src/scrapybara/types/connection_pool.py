@@ -0,0 +1,19 @@
+from typing import Optional
+from pydantic import BaseModel
+
+
+class ConnectionPoolStats(BaseModel):
+    max_connections: Optional[int] = None
+    max_keepalive_connections: Optional[int] = None
+    connections: int = 0  # Open connections, active or idle
+    active: int = 0  # Connections currently serving a request
+    idle: int = 0  # Keep-alive connections available for reuse
+    queued: int = 0  # Requests waiting for a connection
+    http2: int = 0  # Open connections that negotiated HTTP/2
+
+    @property
+    def utilization(self) -> Optional[float]:
+        """Fraction of max_connections in use, None when the pool is unbounded."""
+        if not self.max_connections:
+            return None
+        return self.active / self.max_connections
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+
+class DirectorySyncResponse(BaseModel):
+    files: int  # Files in the local directory
+    uploaded_files: int
+    deleted_files: int
+    total_bytes: int  # Size of every file in the local directory
+    uploaded_bytes: int  # Bytes sent, after compression
+
+    @property
+    def saved_bytes(self) -> int:
+        """Bytes not sent compared to uploading every file uncompressed."""
+        return max(0, self.total_bytes - self.uploaded_bytes)
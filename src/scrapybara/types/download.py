@@ -0,0 +1,9 @@
+from typing import Optional
+from pydantic import BaseModel
+
+
+class DownloadResponse(BaseModel):
+    path: str
+    size: int
+    resumed_bytes: int  # Bytes already present locally from an earlier, interrupted download
+    sha256: Optional[str] = None  # Set when the download was verified
@@ -0,0 +1,25 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class FileOperation(BaseModel):
+    """A command for `UbuntuInstance.file_batch`, taking the same arguments as `UbuntuInstance.file`."""
+
+    command: str
+    path: Optional[str] = None
+    content: Optional[str] = None
+    mode: Optional[str] = None
+    encoding: Optional[str] = None
+    view_range: Optional[List[int]] = None
+    recursive: Optional[bool] = None
+    src: Optional[str] = None
+    dst: Optional[str] = None
+    old_str: Optional[str] = None
+    new_str: Optional[str] = None
+    line: Optional[int] = None
+    text: Optional[str] = None
+    lines: Optional[List[int]] = None
+    all_occurrences: Optional[bool] = None
+    pattern: Optional[str] = None
+    case_sensitive: Optional[bool] = None
+    line_numbers: Optional[bool] = None
@@ -0,0 +1,76 @@
+import binascii
+import importlib.util
+import io
+import json
+import os
+from typing import Any, Optional, Union
+
+
+class ScreenshotPayload:
+    """
+    A screenshot kept as the base64 bytes of the response it arrived in.
+
+    The image is decoded on first use of `to_bytes`, `save` or `to_pil` and the result is reused. `base_64_image`
+    returns the encoded string, so code written against `InstanceScreenshotResponse` and `ComputerResponse` keeps
+    working.
+    """
+
+    __slots__ = ("_encoded", "_decoded")
+
+    def __init__(self, encoded: Union[str, bytes, bytearray, memoryview]) -> None:
+        self._encoded = memoryview(encoded.encode("ascii") if isinstance(encoded, str) else encoded)
+        self._decoded: Optional[bytes] = None
+
+    @classmethod
+    def from_json(cls, content: bytes, field: str = "base64_image") -> Optional["ScreenshotPayload"]:
+        """
+        Slices the image out of a JSON response body without parsing the rest of it.
+
+        Returns None when the field is missing or null. Bodies where the image isn't a plain string literal are
+        parsed in full.
+        """
+        marker = json.dumps(field).encode() + b":"
+        # String values can't contain an unescaped quote, so the marker only matches the key itself
+        start = content.find(marker)
+        if start != -1:
+            start += len(marker)
+            while content[start : start + 1].isspace():
+                start += 1
+            end = content.find(b'"', start + 1)
+            if content[start : start + 1] == b'"' and end != -1 and content.find(b"\\", start, end) == -1:
+                return cls(memoryview(content)[start + 1 : end])
+        value = json.loads(content).get(field)
+        return cls(value) if value is not None else None
+
+    @property
+    def base_64_image(self) -> str:
+        return str(self._encoded, "ascii")
+
+    def to_bytes(self) -> bytes:
+        """Returns the decoded image, decoding it on the first call."""
+        if self._decoded is None:
+            self._decoded = binascii.a2b_base64(self._encoded)
+        return self._decoded
+
+    def save(self, path: Union[str, "os.PathLike[str]"]) -> None:
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    def to_pil(self) -> Any:
+        """Opens the image with Pillow, which must be installed."""
+        if importlib.util.find_spec("PIL") is None:
+            raise ImportError("ScreenshotPayload.to_pil requires Pillow, install it with `pip install pillow`")
+        from PIL import Image  # type: ignore
+
+        # BytesIO shares the buffer of an immutable bytes object until it is written to
+        return Image.open(io.BytesIO(self.to_bytes()))
+
+    def __bytes__(self) -> bytes:
+        return self.to_bytes()
+
+    def __len__(self) -> int:
+        """Length of the base64 encoded image."""
+        return self._encoded.nbytes
+
+    def __repr__(self) -> str:
+        return f"ScreenshotPayload({len(self)} base64 bytes)"
@@ -1,11 +1,16 @@
+import copy
+from functools import lru_cache
 from typing import Any, Dict, Optional, Type
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 
 
 class Tool(BaseModel):
     name: str
     description: Optional[str] = None
     parameters: Optional[Type[BaseModel]] = None
+    # Calls to a sequential tool are never run concurrently with each other or with calls to other sequential
+    # tools on the same instance, even when the agent loop executes independent tool calls in parallel
+    sequential: bool = False
 
     def __call__(self, **kwargs: Any) -> Any:
         """Execute the tool with the given arguments.
@@ -22,11 +27,42 @@ class ApiTool(BaseModel):
     description: Optional[str] = None
     parameters: Optional[Dict[str, Any]] = None
 
+    _json: Optional[bytes] = PrivateAttr(default=None)
+
     @classmethod
     def from_tool(cls, tool: Tool) -> "ApiTool":
         """Convert a Tool to an ApiTool for API serialization."""
         return cls(
             name=tool.name,
             description=tool.description,
-            parameters=tool.parameters.model_json_schema() if tool.parameters else None,
+            # The cached schema is shared, so callers get their own copy to modify
+            parameters=copy.deepcopy(_json_schema(tool.parameters)) if tool.parameters else None,
         )
+
+    def json_bytes(self) -> bytes:
+        """Serialize the tool the way it is sent to the API, reusing the result until a field is reassigned."""
+        if self._json is None:
+            self._json = self.model_dump_json(exclude_none=True).encode()
+        return self._json
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if not name.startswith("_"):
+            self._json = None
+
+
+@lru_cache(maxsize=256)
+def _json_schema(parameters: Type[BaseModel]) -> Dict[str, Any]:
+    """Helper function to generate a parameters schema once per model class, since it never changes."""
+    return parameters.model_json_schema()
+
+
+@lru_cache(maxsize=256)
+def _shared_api_tool(name: str, description: Optional[str], parameters: Optional[Type[BaseModel]]) -> ApiTool:
+    """
+    Helper function returning one ApiTool per distinct tool, shared by every step and agent loop.
+
+    The returned tool and its schema must not be modified. Its `json_bytes` are serialized on first use and
+    then reused by every request that sends the tool.
+    """
+    return ApiTool(name=name, description=description, parameters=_json_schema(parameters) if parameters else None)
@@ -0,0 +1,572 @@
+import asyncio
+import base64
+import io
+import json
+import random
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+import httpx
+import pytest
+from pydantic import BaseModel
+
+from scrapybara import AsyncScrapybara, Scrapybara
+from scrapybara.client import (
+    UNCHANGED_SCREENSHOT_MARKER,
+    UbuntuInstance,
+    _ActRequestEncoder,
+    _ImageLedger,
+    _process_screenshot,
+    _ScreenshotPipeline,
+    _api_tools,
+    _stable_prefix,
+    _tool_call_lanes,
+)
+from scrapybara.core.jsonable_encoder import jsonable_encoder
+from scrapybara.herd import Herd
+from scrapybara.tools import BashTool, ComputerTool, EditTool
+from scrapybara.types import ComputerResponse
+from scrapybara.types.act import (
+    ActTask,
+    ApiTool,
+    AssistantMessage,
+    Message,
+    ScreenshotOptions,
+    SingleActRequest,
+    TextPart,
+    Tool,
+    ToolCallPart,
+    ToolMessage,
+    ToolResultPart,
+    UserMessage,
+)
+
+
+class EchoParameters(BaseModel):
+    text: str
+
+
+class EchoTool(Tool):
+    _image: str
+
+    def __init__(self, image: str = "aW1hZ2U=") -> None:
+        super().__init__(name="echo", description="Echo the given text", parameters=EchoParameters)
+        self._image = image
+
+    def __call__(self, **kwargs: Any) -> Any:
+        return {"output": kwargs["text"], "base_64_image": self._image}
+
+
+def _tool_message(call_id: str, image: str) -> ToolMessage:
+    return ToolMessage(
+        content=[ToolResultPart(tool_call_id=call_id, tool_name="echo", result={"output": "ok", "base_64_image": image})]
+    )
+
+
+def _history() -> List[Message]:
+    return [
+        UserMessage(content=[TextPart(text="hello")]),
+        AssistantMessage(
+            content=[ToolCallPart(tool_call_id="1", tool_name="echo", args={"text": "a"})], response_id="r1"
+        ),
+        _tool_message("1", "Zmlyc3Q="),
+        AssistantMessage(content=[ToolCallPart(tool_call_id="2", tool_name="computer", args={"action": "wait"})]),
+        ToolMessage(
+            content=[
+                ToolResultPart(
+                    tool_call_id="2", tool_name="computer", result=ComputerResponse(output="done", base_64_image="eA==")
+                )
+            ]
+        ),
+    ]
+
+
+def _expected_body(messages: List[Message], tools: List[ApiTool]) -> Dict[str, Any]:
+    request = SingleActRequest(model=Herd("test"), system="system", messages=messages, tools=tools, max_tokens=10)
+    return jsonable_encoder(request.model_dump(exclude_none=True))
+
+
+def test_encoder_matches_single_act_request() -> None:
+    messages = _history()
+    tools = [ApiTool.from_tool(EchoTool())]
+    body = _ActRequestEncoder().encode(
+        model=Herd("test"), system="system", messages=messages, tools=tools, temperature=None, max_tokens=10
+    )
+    assert json.loads(body) == _expected_body(messages, tools)
+
+
+def test_tool_schemas_and_json_are_cached_across_loops() -> None:
+    first, second = _api_tools([EchoTool()]), _api_tools([EchoTool("b3RoZXI=")])
+    assert first[0] is second[0]
+    assert first[0].json_bytes() is second[0].json_bytes()
+    assert json.loads(first[0].json_bytes()) == ApiTool.from_tool(EchoTool()).model_dump(exclude_none=True)
+
+    # Tools handed out by from_tool are independent of the cache
+    tool = ApiTool.from_tool(EchoTool())
+    assert tool.parameters is not None
+    tool.parameters["title"] = "Changed"
+    assert json.loads(tool.json_bytes())["parameters"]["title"] == "Changed"
+    assert json.loads(_api_tools([EchoTool()])[0].json_bytes())["parameters"]["title"] == "EchoParameters"
+
+    tool.description = "Changed"
+    assert json.loads(tool.json_bytes())["description"] == "Changed"
+
+
+def test_encoder_reuses_sent_messages_and_reencodes_invalidated_ones() -> None:
+    messages = _history()
+    encoder = _ActRequestEncoder()
+    first = list(encoder.encode_messages(messages))
+
+    messages.append(_tool_message("3", "bGFzdA=="))
+    second = encoder.encode_messages(messages)
+    assert all(a is b for a, b in zip(first, second))
+    assert len(second) == len(messages)
+
+    encoder.invalidate(_ImageLedger(messages).prune(1))
+    third = encoder.encode_messages(messages)
+    assert third[2] is not first[2]
+    assert "base_64_image" not in json.loads(third[2])["content"][0]["result"]
+    assert all(a is b for i, (a, b) in enumerate(zip(first, third)) if i != 2)
+
+    tools: List[ApiTool] = []
+    body = encoder.encode(model=Herd("test"), system="system", messages=messages, tools=tools, temperature=None, max_tokens=10)
+    assert json.loads(body) == _expected_body(messages, tools)
+
+
+def _act_client(handler: Callable[[Dict[str, Any]], Dict[str, Any]], bodies: List[Dict[str, Any]]) -> Scrapybara:
+    def transport(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        bodies.append(body)
+        return httpx.Response(200, json=handler(body))
+
+    return Scrapybara(
+        api_key="test", base_url="https://api.test", httpx_client=httpx.Client(transport=httpx.MockTransport(transport))
+    )
+
+
+def _echo_then_stop(body: Dict[str, Any]) -> Dict[str, Any]:
+    if len(body["messages"]) == 1:
+        content: List[Dict[str, Any]] = [
+            {"type": "tool-call", "tool_call_id": "1", "tool_name": "echo", "args": {"text": "hi"}}
+        ]
+        return {"message": {"role": "assistant", "content": content}, "finish_reason": "tool-calls"}
+    return {"message": {"role": "assistant", "content": [{"type": "text", "text": "done"}]}, "finish_reason": "stop"}
+
+
+def test_act_sends_incrementally_encoded_history() -> None:
+    bodies: List[Dict[str, Any]] = []
+    client = _act_client(_echo_then_stop, bodies)
+
+    text = client.act(
+        model=Herd("test"),
+        tools=[EchoTool()],
+        prompt="say hi",
+        request_options={"additional_body_parameters": {"metadata": {"run": "1"}}},
+    ).text
+
+    assert text == "done"
+    assert len(bodies) == 2
+    assert bodies[1]["metadata"] == {"run": "1"}
+    assert bodies[1]["tools"][0]["name"] == "echo"
+    assert [m["role"] for m in bodies[1]["messages"]] == ["user", "assistant", "tool"]
+    assert bodies[1]["messages"][2]["content"][0]["result"]["output"] == "hi"
+
+
+def _filter_images_by_scan(messages: List[Message], images_to_keep: int) -> None:
+    images_kept = 0
+    for message in reversed(messages):
+        if isinstance(message, ToolMessage):
+            for tool_result in reversed(message.content):
+                if isinstance(tool_result.result, dict) and "base_64_image" in tool_result.result:
+                    if images_kept < images_to_keep:
+                        images_kept += 1
+                    else:
+                        del tool_result.result["base_64_image"]
+
+
+def _random_step(rng: random.Random, step: int) -> ToolMessage:
+    results = []
+    for i in range(rng.randint(1, 3)):
+        result: Any = {"output": "ok"}
+        if rng.random() < 0.7:
+            result["base_64_image"] = f"{step}-{i}"
+        results.append(ToolResultPart(tool_call_id=f"{step}-{i}", tool_name="echo", result=result))
+    return ToolMessage(content=results)
+
+
+def test_image_ledger_matches_full_scan() -> None:
+    rng = random.Random(0)
+    for images_to_keep in (1, 2, 4, 7):
+        scanned: List[Message] = [_tool_message("0", "aW5pdA==")]
+        tracked: List[Message] = [_tool_message("0", "aW5pdA==")]
+        ledger = _ImageLedger(tracked)
+        for step in range(200):
+            state = rng.getstate()
+            scanned.append(_random_step(rng, step))
+            rng.setstate(state)
+            tracked.append(_random_step(rng, step))
+            ledger.track(tracked[-1])
+
+            _filter_images_by_scan(scanned, images_to_keep)
+            ledger.prune(images_to_keep)
+            assert [m.model_dump() for m in tracked] == [m.model_dump() for m in scanned]
+            assert len(ledger) <= images_to_keep
+
+
+def test_image_ledger_skips_images_removed_by_another_ledger() -> None:
+    messages: List[Message] = [_tool_message(str(i), "aW1hZ2U=") for i in range(6)]
+    outer = _ImageLedger(messages)
+    inner = _ImageLedger(messages)
+
+    assert inner.prune(2) == messages[:4]
+    assert outer.prune(3) == []
+    assert len(outer) == 2
+
+
+def _png(width: int, height: int) -> str:
+    image_module = pytest.importorskip("PIL.Image")
+    image = image_module.new("RGB", (width, height))
+    for x in range(0, width, 7):
+        for y in range(0, height, 5):
+            image.putpixel((x, y), (x % 256, y % 256, (x * y) % 256))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def test_process_screenshot_downscales_and_reencodes() -> None:
+    image_module = pytest.importorskip("PIL.Image")
+    original = _png(1024, 768)
+    options = ScreenshotOptions(max_edge=512, format="jpeg", quality=60)
+
+    result = _process_screenshot(ComputerResponse(output="ok", base_64_image=original), options)
+
+    assert isinstance(result, ComputerResponse)
+    assert result.output == "ok"
+    assert result.base_64_image is not None and len(result.base_64_image) < len(original)
+    with image_module.open(io.BytesIO(base64.b64decode(result.base_64_image))) as image:
+        assert image.format == "JPEG"
+        assert image.size == (512, 384)
+
+    assert _process_screenshot({"output": "no image"}, options) == {"output": "no image"}
+    assert _process_screenshot({"base_64_image": "bm90IGFuIGltYWdl"}, options) == {"base_64_image": "bm90IGFuIGltYWdl"}
+
+
+def test_screenshot_pipeline_scales_computer_coordinates_back_to_the_screen() -> None:
+    pytest.importorskip("PIL.Image")
+    client = Scrapybara(api_key="test")
+    instance, other = (UbuntuInstance(f"i-{i}", datetime.now(), "running", client._base_client) for i in range(2))
+    pipeline = _ScreenshotPipeline(options=ScreenshotOptions(max_edge=512), dedupe_threshold=None)
+    computer = ComputerTool(instance)
+    click = ToolCallPart(
+        tool_call_id="1", tool_name="computer", args={"action": "click_mouse", "coordinates": [100, 50]}
+    )
+
+    assert pipeline.scale_call(computer, click) is click  # nothing was downscaled yet
+    pipeline.process(ComputerResponse(output="ok", base_64_image=_png(1024, 768)), computer)
+
+    assert pipeline.scale_call(computer, click).args["coordinates"] == [200, 100]
+    drag = click.model_copy(update={"args": {"action": "drag_mouse", "path": [[1, 2], [256, 192]]}})
+    assert pipeline.scale_call(computer, drag).args["path"] == [[2, 4], [512, 384]]
+    assert pipeline.scale_call(ComputerTool(other), click) is click
+    assert pipeline.scale_call(BashTool(instance), click) is click
+
+
+def test_act_sends_processed_screenshots() -> None:
+    original = _png(800, 600)
+    bodies: List[Dict[str, Any]] = []
+    client = _act_client(_echo_then_stop, bodies)
+    client.act(
+        model=Herd("test"),
+        tools=[EchoTool(original)],
+        prompt="take a screenshot",
+        screenshot_options=ScreenshotOptions(max_edge=400, format="webp", quality=50),
+    )
+
+    sent = bodies[1]["messages"][2]["content"][0]["result"]["base_64_image"]
+    assert len(sent) < len(original)
+    assert base64.b64decode(sent)[8:12] == b"WEBP"
+
+
+def test_screenshot_pipeline_replaces_unchanged_frames() -> None:
+    pipeline = _ScreenshotPipeline(options=None, dedupe_threshold=0)
+
+    first = pipeline.process(ComputerResponse(output="clicked", base_64_image="Zmlyc3Q="))
+    assert first.base_64_image == "Zmlyc3Q="
+
+    repeat = pipeline.process(ComputerResponse(output="waited", base_64_image="Zmlyc3Q="))
+    assert repeat.base_64_image is None
+    assert repeat.output == f"waited\n{UNCHANGED_SCREENSHOT_MARKER}"
+
+    repeat_dict = pipeline.process({"base_64_image": "Zmlyc3Q="})
+    assert repeat_dict == {"output": UNCHANGED_SCREENSHOT_MARKER}
+
+    changed = pipeline.process({"base_64_image": "c2Vjb25k"})
+    assert changed == {"base_64_image": "c2Vjb25k"}
+
+
+def test_screenshot_pipeline_matches_near_duplicates_by_dhash() -> None:
+    image_module = pytest.importorskip("PIL.Image")
+
+    def frame(color: int, cursor: bool = False) -> str:
+        image = image_module.new("L", (320, 240), color)
+        for x in range(0, 160):
+            image.putpixel((x, 120), 255 - color)
+        if cursor:
+            image.putpixel((300, 10), 0)
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        return base64.b64encode(buffer.getvalue()).decode()
+
+    pipeline = _ScreenshotPipeline(options=None, dedupe_threshold=4)
+    assert pipeline.process({"base_64_image": frame(200)})["base_64_image"]
+    assert "base_64_image" not in pipeline.process({"base_64_image": frame(200, cursor=True)})
+
+    exact = _ScreenshotPipeline(options=None, dedupe_threshold=0)
+    assert exact.process({"base_64_image": frame(200)})["base_64_image"]
+    assert exact.process({"base_64_image": frame(200, cursor=True)})["base_64_image"]
+
+
+class WaitParameters(BaseModel):
+    label: str
+
+
+class BarrierTool(Tool):
+    """Blocks until `parties` calls are in flight at once, so it only completes when calls run concurrently."""
+
+    _barrier: threading.Barrier
+    _calls: List[str]
+
+    def __init__(self, name: str, barrier: threading.Barrier, calls: List[str], sequential: bool = False) -> None:
+        super().__init__(name=name, parameters=WaitParameters, sequential=sequential)
+        self._barrier = barrier
+        self._calls = calls
+
+    def __call__(self, **kwargs: Any) -> Any:
+        self._calls.append(kwargs["label"])
+        if not self.sequential:
+            self._barrier.wait()
+        return {"output": kwargs["label"]}
+
+
+def _calls_then_stop(calls: List[Dict[str, str]]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    def handler(body: Dict[str, Any]) -> Dict[str, Any]:
+        if len(body["messages"]) == 1:
+            content = [
+                {"type": "tool-call", "tool_call_id": str(i), "tool_name": call["tool"], "args": {"label": call["label"]}}
+                for i, call in enumerate(calls)
+            ]
+            return {"message": {"role": "assistant", "content": content}, "finish_reason": "tool-calls"}
+        return {"message": {"role": "assistant", "content": [{"type": "text", "text": "done"}]}, "finish_reason": "stop"}
+
+    return handler
+
+
+def test_tool_call_lanes_keep_sequential_tools_together() -> None:
+    barrier = threading.Barrier(1)
+    parallel = BarrierTool("parallel", barrier, [])
+    ordered = BarrierTool("ordered", barrier, [], sequential=True)
+    calls = [
+        (tool, ToolCallPart(tool_call_id=str(i), tool_name=tool.name, args={}))
+        for i, tool in enumerate([ordered, parallel, ordered, parallel])
+    ]
+    assert _tool_call_lanes(calls) == [[0, 2], [1], [3]]
+
+
+def test_tool_call_lanes_serialize_tools_on_the_same_instance() -> None:
+    client = Scrapybara(api_key="test")
+    first, second = (UbuntuInstance(f"i-{i}", datetime.now(), "running", client._base_client) for i in range(2))
+    tools: List[Tool] = [EditTool(first), BashTool(first), BashTool(second), EditTool(second), ComputerTool(first)]
+    calls = [(tool, ToolCallPart(tool_call_id=str(i), tool_name=tool.name, args={})) for i, tool in enumerate(tools)]
+
+    assert _tool_call_lanes(calls) == [[0, 1, 4], [2, 3]]
+
+
+def test_act_executes_independent_tool_calls_concurrently() -> None:
+    barrier = threading.Barrier(2, timeout=5)
+    calls: List[str] = []
+    tools: List[Tool] = [BarrierTool("parallel", barrier, calls), BarrierTool("ordered", barrier, calls, sequential=True)]
+    planned = [
+        {"tool": "ordered", "label": "o1"},
+        {"tool": "parallel", "label": "p1"},
+        {"tool": "ordered", "label": "o2"},
+        {"tool": "parallel", "label": "p2"},
+    ]
+    bodies: List[Dict[str, Any]] = []
+    client = _act_client(_calls_then_stop(planned), bodies)
+
+    steps = list(client.act_stream(model=Herd("test"), tools=tools, prompt="go", tool_concurrency=4))
+
+    assert steps[0].tool_results is not None
+    assert [r.result["output"] for r in steps[0].tool_results] == ["o1", "p1", "o2", "p2"]
+    assert not any(r.is_error for r in steps[0].tool_results)
+    assert calls.index("o1") < calls.index("o2")
+
+
+class AsyncSleepTool(Tool):
+    _active: List[int]
+
+    def __init__(self, name: str, active: List[int], sequential: bool = False) -> None:
+        super().__init__(name=name, parameters=WaitParameters, sequential=sequential)
+        self._active = active
+
+    async def __call__(self, **kwargs: Any) -> Any:
+        self._active[0] += 1
+        self._active[1] = max(self._active[1], self._active[0])
+        await asyncio.sleep(0.01)
+        self._active[0] -= 1
+        if kwargs["label"] == "fail":
+            raise ValueError("failed")
+        return {"output": kwargs["label"]}
+
+
+async def test_async_act_gathers_independent_tool_calls() -> None:
+    # [in flight, max in flight] for each tool
+    parallel_active, ordered_active = [0, 0], [0, 0]
+    tools: List[Tool] = [
+        AsyncSleepTool("parallel", parallel_active),
+        AsyncSleepTool("ordered", ordered_active, sequential=True),
+    ]
+    planned = [
+        {"tool": "parallel", "label": "a"},
+        {"tool": "ordered", "label": "b"},
+        {"tool": "parallel", "label": "fail"},
+        {"tool": "ordered", "label": "c"},
+        {"tool": "parallel", "label": "d"},
+    ]
+
+    def transport(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=_calls_then_stop(planned)(json.loads(request.content)))
+
+    client = AsyncScrapybara(
+        api_key="test",
+        base_url="https://api.test",
+        httpx_client=httpx.AsyncClient(transport=httpx.MockTransport(transport)),
+    )
+    steps = [step async for step in client.act_stream(model=Herd("test"), tools=tools, prompt="go", tool_concurrency=8)]
+
+    results = steps[0].tool_results
+    assert results is not None
+    assert [r.result if r.is_error else r.result["output"] for r in results] == ["a", "b", "failed", "c", "d"]
+    assert [bool(r.is_error) for r in results] == [False, False, True, False, False]
+    assert parallel_active[1] == 3
+    assert ordered_active[1] == 1
+
+
+def _with_usage(body: Dict[str, Any]) -> Dict[str, Any]:
+    response = _echo_then_stop(body)
+    response["usage"] = {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12}
+    return response
+
+
+def test_act_many_streams_results_with_aggregate_stats() -> None:
+    bodies: List[Dict[str, Any]] = []
+    client = _act_client(_with_usage, bodies)
+    tasks = [ActTask(model=Herd("test"), tools=[EchoTool()], prompt=f"task {i}") for i in range(5)]
+    tasks.append(ActTask(model=Herd("test"), tools=[EchoTool()]))
+
+    results = list(client.act_many(tasks, concurrency=3))
+
+    assert sorted(result.index for result in results) == list(range(6))
+    failed = [result for result in results if result.error is not None]
+    assert [result.index for result in failed] == [5]
+    assert isinstance(failed[0].error, ValueError)
+    assert all(result.response is not None and result.response.text == "done" for result in results if not result.error)
+
+    stats = results[-1].stats
+    assert (stats.completed, stats.failed, stats.steps) == (5, 1, 10)
+    assert stats.total_tokens == 5 * 2 * 12
+    assert stats.tasks_per_second > 0
+    assert [result.stats.completed + result.stats.failed for result in results] == list(range(1, 7))
+
+
+async def test_async_act_many_bounds_concurrency() -> None:
+    active = [0, 0]
+
+    async def transport(request: httpx.Request) -> httpx.Response:
+        active[0] += 1
+        active[1] = max(active[1], active[0])
+        await asyncio.sleep(0.01)
+        active[0] -= 1
+        return httpx.Response(200, json=_with_usage(json.loads(request.content)))
+
+    client = AsyncScrapybara(
+        api_key="test",
+        base_url="https://api.test",
+        httpx_client=httpx.AsyncClient(transport=httpx.MockTransport(transport)),
+    )
+    tasks = [ActTask(model=Herd("test"), tools=[EchoTool()], prompt=f"task {i}") for i in range(6)]
+
+    results = [result async for result in client.act_many(tasks, concurrency=2)]
+
+    assert sorted(result.index for result in results) == list(range(6))
+    assert all(result.error is None for result in results)
+    assert results[-1].stats.total_tokens == 6 * 2 * 12
+    assert active[1] == 2
+
+
+def test_encoder_prefetched_prefix_survives_pruning_of_later_messages() -> None:
+    messages = _history()
+    messages.append(_tool_message("3", "bGFzdA=="))
+    ledger = _ImageLedger(messages)
+    encoder = _ActRequestEncoder()
+
+    at_risk = ledger.at_risk(1, 1)
+    stable = _stable_prefix(messages, at_risk)
+    assert stable == 2
+    encoder.prefetch(list(messages), stable)
+
+    messages.append(_tool_message("4", "bmV3"))
+    ledger.track(messages[-1])
+    pruned = ledger.prune(1)
+    assert set(map(id, pruned)) <= set(map(id, at_risk))
+    encoder.invalidate(pruned)
+
+    tools = [ApiTool.from_tool(EchoTool())]
+    body = encoder.encode(model=Herd("test"), system="system", messages=messages, tools=tools, temperature=None, max_tokens=10)
+    assert json.loads(body) == _expected_body(messages, tools)
+
+
+def _echo_steps(steps: int) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    def handler(body: Dict[str, Any]) -> Dict[str, Any]:
+        step = (len(body["messages"]) - 1) // 2
+        if step < steps:
+            content: List[Dict[str, Any]] = [
+                {"type": "tool-call", "tool_call_id": str(step), "tool_name": "echo", "args": {"text": str(step)}}
+            ]
+            return {"message": {"role": "assistant", "content": content}, "finish_reason": "tool-calls"}
+        return {"message": {"role": "assistant", "content": [{"type": "text", "text": "done"}]}, "finish_reason": "stop"}
+
+    return handler
+
+
+def test_pipelined_act_sends_identical_requests() -> None:
+    sequential: List[Dict[str, Any]] = []
+    pipelined: List[Dict[str, Any]] = []
+    for bodies, pipeline in ((sequential, False), (pipelined, True)):
+        client = _act_client(_echo_steps(6), bodies)
+        client.act(model=Herd("test"), tools=[EchoTool()], prompt="go", images_to_keep=2, pipeline=pipeline)
+
+    assert len(pipelined) == 7
+    assert pipelined == sequential
+
+
+async def test_async_pipelined_act_sends_identical_requests() -> None:
+    bodies: List[Dict[str, Any]] = []
+
+    def transport(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        bodies.append(body)
+        return httpx.Response(200, json=_echo_steps(6)(body))
+
+    client = AsyncScrapybara(
+        api_key="test",
+        base_url="https://api.test",
+        httpx_client=httpx.AsyncClient(transport=httpx.MockTransport(transport)),
+    )
+    await client.act(model=Herd("test"), tools=[EchoTool()], prompt="go", images_to_keep=2, pipeline=True)
+
+    expected: List[Dict[str, Any]] = []
+    _act_client(_echo_steps(6), expected).act(model=Herd("test"), tools=[EchoTool()], prompt="go", images_to_keep=2)
+    assert bodies == expected
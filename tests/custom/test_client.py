@@ -1,8 +1,12 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
 from pydantic import BaseModel
 from scrapybara import Scrapybara
+import importlib.util
 import os
 import pytest
 import tempfile
+import threading
 import uuid
 
 from scrapybara.anthropic import (
@@ -284,6 +288,54 @@ def test_upload_download() -> None:
         ubuntu_instance.stop()
 
 
+def test_connection_pool_options() -> None:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            body = b"[]"
+            self.send_response(200)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = Scrapybara(
+            api_key="test",
+            base_url=f"http://127.0.0.1:{server.server_address[1]}",
+            max_connections=8,
+            max_keepalive_connections=4,
+            keepalive_expiry=5.0,
+        )
+        assert client.pool_stats().connections == 0
+
+        client.get_instances()
+        client.get_instances()
+
+        stats = client.pool_stats()
+        assert stats.max_connections == 8
+        assert stats.max_keepalive_connections == 4
+        assert stats.connections == 1
+        assert stats.idle == 1
+        assert stats.utilization == 0
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_http2_requires_h2(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+
+    with pytest.raises(ImportError, match="h2"):
+        Scrapybara(api_key="test", http2=True)
+
+
 if __name__ == "__main__":
     test_ubuntu()
     test_browser()
@@ -0,0 +1,297 @@
+import asyncio
+import itertools
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Set
+
+import httpx
+import pytest
+
+from scrapybara import AsyncScrapybara, Scrapybara
+from scrapybara.client import AsyncUbuntuInstance, UbuntuInstance, _async_status_poller, _status_poller
+from scrapybara.pool import AsyncInstancePool, InstancePool
+
+
+class Fleet:
+    """Stands in for the instance endpoints and records which instances are running.
+
+    Started instances report `deploying` until they have been polled `deploy_polls` times.
+    Status codes queued in `errors` are returned for a path before it succeeds.
+    """
+
+    def __init__(self, deploy_polls: int = 0) -> None:
+        self.deploy_polls = deploy_polls
+        self.lock = threading.Lock()
+        self.ids = itertools.count()
+        self.running: Set[str] = set()
+        self.started: List[str] = []
+        self.polls: Dict[str, int] = {}
+        self.requests: List[str] = []
+        self.errors: Dict[str, List[int]] = {}  # Status codes to answer a path with before succeeding
+
+    def _instance(self, instance_id: str) -> Dict[str, Any]:
+        status = "running" if self.polls.get(instance_id, 0) >= self.deploy_polls else "deploying"
+        if instance_id not in self.running:
+            status = "terminated"
+        return {
+            "id": instance_id,
+            "launch_time": "2025-01-01T00:00:00Z",
+            "instance_type": "ubuntu",
+            "status": status,
+        }
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        with self.lock:
+            self.requests.append(f"{request.method} {path}")
+            if self.errors.get(path):
+                return httpx.Response(self.errors[path].pop(0), json={"detail": "injected"})
+            if path == "/v1/start":
+                instance_id = f"i-{next(self.ids)}"
+                self.running.add(instance_id)
+                self.started.append(instance_id)
+                return httpx.Response(200, json=self._instance(instance_id))
+            if path == "/v1/instances":
+                for instance_id in self.running:
+                    self.polls[instance_id] = self.polls.get(instance_id, 0) + 1
+                return httpx.Response(200, json=[self._instance(instance_id) for instance_id in sorted(self.running)])
+            match = re.fullmatch(r"/v1/instance/([^/]+)(?:/(stop|pause|resume))?", path)
+            if match and match.group(2) == "resume":
+                return httpx.Response(200, json=self._instance(match.group(1)))
+            if match and match.group(2):
+                self.running.discard(match.group(1))
+                return httpx.Response(200, json={"status": "stopped" if match.group(2) == "stop" else "paused"})
+            if match:
+                self.polls[match.group(1)] = self.polls.get(match.group(1), 0) + 1
+                return httpx.Response(200, json=self._instance(match.group(1)))
+        return httpx.Response(404, json={})
+
+    def client(self) -> Scrapybara:
+        return Scrapybara(
+            api_key="test", base_url="https://api.test", httpx_client=httpx.Client(transport=httpx.MockTransport(self.handle))
+        )
+
+    def async_client(self) -> AsyncScrapybara:
+        return AsyncScrapybara(
+            api_key="test",
+            base_url="https://api.test",
+            httpx_client=httpx.AsyncClient(transport=httpx.MockTransport(self.handle)),
+        )
+
+
+def _wait_for(condition: Callable[[], bool], timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def test_pool_refills_and_recycles_leases() -> None:
+    fleet = Fleet()
+    client = fleet.client()
+
+    with InstancePool(client.start_ubuntu, size=2) as pool:
+        _wait_for(lambda: pool.idle == 2)
+        warm = set(fleet.started)
+
+        with pool.lease() as instance:
+            assert isinstance(instance, UbuntuInstance)
+            assert instance.id in warm
+            leased_id = instance.id
+
+        _wait_for(lambda: leased_id not in fleet.running and pool.idle == 2)
+
+    assert fleet.running == set()
+
+
+def test_pool_reuses_reset_instances_up_to_max_uses() -> None:
+    fleet = Fleet()
+    resets: List[str] = []
+
+    def reset(instance: UbuntuInstance) -> None:
+        resets.append(instance.id)
+
+    with InstancePool(fleet.client().start_ubuntu, size=1, reset=reset, max_uses=2) as pool:
+        _wait_for(lambda: pool.idle == 1)  # otherwise the refill can race the first lease and both are kept
+        with pool.lease() as first:
+            pass
+        with pool.lease() as second:
+            pass
+        assert second.id == first.id
+        assert resets == [first.id]
+        _wait_for(lambda: first.id not in fleet.running)
+
+        with pytest.raises(ValueError):
+            with pool.lease() as failed:
+                raise ValueError("task failed")
+        _wait_for(lambda: failed.id not in fleet.running)
+
+    assert fleet.running == set()
+
+
+def test_pool_lease_times_out_at_max_instances() -> None:
+    fleet = Fleet()
+
+    with InstancePool(fleet.client().start_ubuntu, size=0, max_instances=1) as pool:
+        with pool.lease():
+            with pytest.raises(TimeoutError):
+                with pool.lease(timeout=0.05):
+                    pass
+
+
+async def test_async_pool_refills_and_recycles_leases() -> None:
+    fleet = Fleet()
+    client = fleet.async_client()
+
+    async with AsyncInstancePool(client.start_ubuntu, size=2) as pool:
+        for _ in range(500):
+            if pool.idle == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert pool.idle == 2
+
+        async with pool.lease() as instance:
+            assert isinstance(instance, AsyncUbuntuInstance)
+            leased_id = instance.id
+
+        for _ in range(500):
+            if leased_id not in fleet.running and pool.idle == 2:
+                break
+            await asyncio.sleep(0.01)
+        assert leased_id not in fleet.running
+
+    assert fleet.running == set()
+
+
+def test_wait_until_ready_polls_until_running() -> None:
+    fleet = Fleet(deploy_polls=2)
+    instance = fleet.client().start_ubuntu()
+
+    instance.wait_until_ready(initial_interval=0.001)
+
+    assert instance.status == "running"
+    assert fleet.requests.count(f"GET /v1/instance/{instance.id}") == 2
+
+
+def test_wait_until_ready_times_out_and_fails_on_terminated() -> None:
+    fleet = Fleet(deploy_polls=1000)
+    client = fleet.client()
+    instance = client.start_ubuntu()
+
+    with pytest.raises(TimeoutError):
+        instance.wait_until_ready(timeout=0.05, initial_interval=0.01)
+
+    instance.stop()
+    with pytest.raises(RuntimeError):
+        instance.wait_until_ready(initial_interval=0.001)
+
+
+def test_concurrent_waiters_share_one_poll_per_tick() -> None:
+    fleet = Fleet(deploy_polls=3)
+    client = fleet.client()
+    instances = [client.start_ubuntu() for _ in range(8)]
+    barrier = threading.Barrier(len(instances))
+
+    def wait(instance: UbuntuInstance) -> None:
+        barrier.wait()
+        instance.wait_until_ready(initial_interval=0.02, max_interval=0.2)
+
+    threads = [threading.Thread(target=wait, args=(instance,)) for instance in instances]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(instance.status == "running" for instance in instances)
+    polls = [request for request in fleet.requests if request.startswith("GET")]
+    # Every tick is a single request, waiters that joined during the first one only add one more tick
+    assert len(polls) == _status_poller(client._base_client)._tick <= fleet.deploy_polls + 1
+    assert set(polls) == {"GET /v1/instances"}
+
+
+def test_late_waiters_join_the_shared_schedule() -> None:
+    fleet = Fleet(deploy_polls=4)
+    client = fleet.client()
+    instances = [client.start_ubuntu() for _ in range(6)]
+
+    def wait(instance: UbuntuInstance, delay: float) -> None:
+        time.sleep(delay)
+        instance.wait_until_ready(initial_interval=0.02, max_interval=0.05)
+
+    threads = [threading.Thread(target=wait, args=(instance, i * 0.013)) for i, instance in enumerate(instances)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(instance.status == "running" for instance in instances)
+    polls = [request for request in fleet.requests if request.startswith("GET")]
+    assert len(polls) == _status_poller(client._base_client)._tick
+
+
+async def test_async_concurrent_waiters_share_one_poll_per_tick() -> None:
+    fleet = Fleet(deploy_polls=3)
+    client = fleet.async_client()
+    instances = [await client.start_ubuntu() for _ in range(8)]
+
+    await asyncio.gather(*(instance.wait_until_ready(initial_interval=0.01) for instance in instances))
+
+    assert all(instance.status == "running" for instance in instances)
+    polls = [request for request in fleet.requests if request.startswith("GET")]
+    assert len(polls) == _async_status_poller(client._base_client)._tick == fleet.deploy_polls
+    assert set(polls) == {"GET /v1/instances"}
+
+
+def test_start_many_and_stop_many_report_partial_failures(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(time, "sleep", lambda _: None)
+    fleet = Fleet()
+    client = fleet.client()
+
+    fleet.errors["/v1/start"] = [429, 429]
+    started = client.start_many(5, concurrency=2, request_options={"max_retries": 0})
+    assert started.ok
+    assert len(started.succeeded) == 5
+    assert len(fleet.started) == 5
+
+    ids = [instance.id for instance in started.succeeded]
+    fleet.errors[f"/v1/instance/{ids[1]}/stop"] = [400]
+    fleet.errors[f"/v1/instance/{ids[3]}/stop"] = [500, 500, 500]
+    stopped = client.stop_many(ids, retries=2)
+
+    assert [failure.instance_id for failure in stopped.failures] == [ids[1], ids[3]]
+    assert [failure.attempts for failure in stopped.failures] == [1, 3]
+    assert stopped.results[1] is None and stopped.results[3] is None
+    assert fleet.running == {ids[1], ids[3]}
+
+
+def test_start_many_does_not_retry_starts_the_server_may_have_handled(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(time, "sleep", lambda _: None)
+    fleet = Fleet()
+    fleet.errors["/v1/start"] = [503]
+
+    started = fleet.client().start_many(3, concurrency=1, request_options={"max_retries": 0})
+
+    assert [(failure.index, failure.attempts) for failure in started.failures] == [(0, 1)]
+    assert len(fleet.started) == 2 and fleet.requests.count("POST /v1/start") == 3
+
+
+async def test_async_bulk_operations(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def sleep(delay: float) -> None:
+        pass
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    fleet = Fleet()
+    client = fleet.async_client()
+
+    started = await client.start_many(4, concurrency=2)
+    ids = [instance.id for instance in started.succeeded]
+    assert len(ids) == 4
+
+    fleet.errors[f"/v1/instance/{ids[0]}/pause"] = [429]
+    paused = await client.pause_many(ids)
+    assert paused.ok
+    assert [result.status for result in paused.succeeded] == ["paused"] * 4
+
+    resumed = await client.resume_many(ids, timeout_hours=1)
+    assert [result.id for result in resumed.succeeded] == ids
@@ -0,0 +1,612 @@
+import base64
+import email.parser
+import hashlib
+import io
+import json
+import os
+import shlex
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+import httpx
+import pytest
+
+from scrapybara import AsyncScrapybara, Scrapybara
+from scrapybara.client import (
+    DEFAULT_BASH_STREAM_CHUNK_SIZE,
+    AsyncUbuntuInstance,
+    UbuntuInstance,
+    _file_operation_lanes,
+)
+from scrapybara.instance import Request_PressKey, Request_TypeText
+from scrapybara.core.api_error import ApiError
+from scrapybara.pool import AsyncBashSessionPool, BashSessionPool
+from scrapybara.types import ClickMouseAction, FileOperation, GetCursorPositionAction, ScreenshotPayload
+
+
+class Machine:
+    """Stands in for the endpoints of a single running instance and records the request bodies it receives.
+
+    Bash commands run in a local shell that keeps its working directory per session, and uploads are written to
+    the local filesystem, so tests must use paths in a temporary directory. Status codes queued in `errors` are
+    returned for an endpoint before it succeeds, uploads to paths in `corrupt` are truncated once, and bash output is
+    cut off after `output_limit` characters.
+    """
+
+    def __init__(self) -> None:
+        self.requests: List[Dict[str, Any]] = []
+        self.screen = b"\x89PNG fake screen"
+        self.files: Dict[str, str] = {}
+        self.errors: Dict[str, List[int]] = {}
+        self.corrupt: Set[str] = set()
+        self.cwd: Dict[Optional[int], str] = {}
+        self.output_limit: Optional[int] = None
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.split("/", 4)[-1]
+        if path == "upload":
+            return self._upload(request)
+        body = json.loads(request.content) if request.content else {}
+        self.requests.append({"endpoint": path, **body})
+        if self.errors.get(path):
+            return httpx.Response(self.errors[path].pop(0), json={"detail": "injected"})
+        if path == "bash" and body.get("restart"):
+            return httpx.Response(200, json={"output": "tool has been restarted."})
+        if path == "bash":
+            result = self._bash(body["command"], body.get("session"))
+            error = result.stderr if result.returncode else None
+            return httpx.Response(200, json={"output": result.stdout[: self.output_limit], "error": error})
+        if path == "computer":
+            if body.get("text") == "fail":
+                return httpx.Response(200, json={"error": "failed"})
+            image = "aW1hZ2U=" if body.get("screenshot", True) else None
+            return httpx.Response(200, json={"output": body["action"], "base64_image": image})
+        if path == "screenshot":
+            return httpx.Response(200, json={"base64_image": base64.b64encode(self.screen).decode()})
+        if path == "file" and body["command"] == "write":
+            self.files[body["path"]] = body["content"]
+            return httpx.Response(200, json={"output": "written"})
+        if path == "file" and body["command"] == "read":
+            if body["path"] not in self.files:
+                return httpx.Response(200, json={"error": "No such file"})
+            return httpx.Response(200, json={"output": self.files[body["path"]]})
+        return httpx.Response(404, json={})
+
+    def _bash(self, command: str, session: Optional[int]) -> "subprocess.CompletedProcess[str]":
+        with tempfile.NamedTemporaryFile("r") as cwd:
+            script = f"trap 'pwd > {cwd.name}' EXIT\ncd {shlex.quote(self.cwd.get(session, os.getcwd()))}\n{command}\n"
+            result = subprocess.run(["bash", "-c", script], capture_output=True, text=True)
+            self.cwd[session] = cwd.read().strip() or self.cwd.get(session, os.getcwd())
+        return result
+
+    def _upload(self, request: httpx.Request) -> httpx.Response:
+        message = email.parser.BytesParser().parsebytes(
+            f"content-type: {request.headers['content-type']}\r\n\r\n".encode() + request.content
+        )
+        fields = {
+            part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+            for part in message.get_payload()  # type: ignore[union-attr]
+        }
+        path, content = fields["path"].decode(), fields["file"]
+        self.requests.append({"endpoint": "upload", "path": path, "size": len(content)})
+        if self.errors.get("upload"):
+            return httpx.Response(self.errors["upload"].pop(0), json={"detail": "injected"})
+        if path in self.corrupt:
+            self.corrupt.discard(path)
+            content = content[:-1]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        Path(path).write_bytes(content)
+        return httpx.Response(200, json={"filename": os.path.basename(path), "path": path})
+
+    def instance(self) -> UbuntuInstance:
+        client = Scrapybara(
+            api_key="test", base_url="https://api.test", httpx_client=httpx.Client(transport=httpx.MockTransport(self.handle))
+        )
+        return UbuntuInstance("i-1", datetime.now(), "running", client._base_client)
+
+    def async_instance(self) -> AsyncUbuntuInstance:
+        client = AsyncScrapybara(
+            api_key="test",
+            base_url="https://api.test",
+            httpx_client=httpx.AsyncClient(transport=httpx.MockTransport(self.handle)),
+        )
+        return AsyncUbuntuInstance("i-1", datetime.now(), "running", client._base_client)
+
+
+def test_computer_batch_only_takes_final_screenshot() -> None:
+    machine = Machine()
+    result = machine.instance().computer_batch(
+        [
+            ClickMouseAction(button="left", coordinates=[10, 10]),
+            Request_PressKey(keys=["ctrl", "a"]),
+            Request_TypeText(text="hello", screenshot=True),
+            Request_PressKey(keys=["enter"]),
+        ]
+    )
+
+    assert [request["screenshot"] for request in machine.requests] == [False, False, False, True]
+    assert [r.action for r in result.results] == ["click_mouse", "press_key", "type_text", "press_key"]
+    assert result.ok and result.base_64_image == "aW1hZ2U="
+    assert result.seconds == sum(r.seconds for r in result.results)
+
+
+def test_computer_batch_stops_on_error() -> None:
+    machine = Machine()
+    result = machine.instance().computer_batch(
+        [Request_TypeText(text="fail"), Request_PressKey(keys=["enter"]), GetCursorPositionAction()]
+    )
+
+    assert len(machine.requests) == 1
+    assert not result.ok and result.error == "failed" and result.base_64_image is None
+
+
+async def test_async_computer_batch() -> None:
+    machine = Machine()
+    result = await machine.async_instance().computer_batch(
+        [Request_TypeText(text="hello"), Request_PressKey(keys=["enter"])], screenshot=False
+    )
+
+    assert [request["screenshot"] for request in machine.requests] == [False, False]
+    assert result.ok and result.base_64_image is None
+
+
+def test_screenshot_payload_slices_image_from_response(tmp_path: Any) -> None:
+    machine = Machine()
+    payload = machine.instance().screenshot_payload()
+
+    assert payload.base_64_image == base64.b64encode(machine.screen).decode()
+    assert payload.to_bytes() == machine.screen and payload.to_bytes() is payload.to_bytes()
+    payload.save(tmp_path / "screen.png")
+    assert (tmp_path / "screen.png").read_bytes() == machine.screen
+
+
+def test_screenshot_payload_falls_back_to_full_parse() -> None:
+    assert ScreenshotPayload.from_json(b'{"base64_image": "aGk\\/"}') is not None
+    assert ScreenshotPayload.from_json(b'{"output": "\\"base64_image\\": x", "base64_image": null}') is None
+    payload = ScreenshotPayload.from_json(b'{"base64_image" : "aGk="}')
+    assert payload is not None and bytes(payload) == b"hi"
+
+
+def test_screenshot_payload_opens_with_pillow() -> None:
+    Image = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 3)).save(buffer, format="PNG")
+
+    assert ScreenshotPayload(base64.b64encode(buffer.getvalue())).to_pil().size == (4, 3)
+
+
+async def test_async_screenshot_payload_raises_api_errors() -> None:
+    machine = Machine()
+    assert (await machine.async_instance().screenshot_payload()).to_bytes() == machine.screen
+
+    machine.handle = lambda request: httpx.Response(500, text="down")  # type: ignore[assignment]
+    with pytest.raises(ApiError):
+        await machine.async_instance().screenshot_payload()
+
+
+def test_read_file_streams_contents() -> None:
+    machine = Machine()
+    machine.files["/tmp/notes.txt"] = "héllo\n" * 1000
+
+    with machine.instance().read_file("/tmp/notes.txt") as file:
+        assert file.read().decode() == machine.files["/tmp/notes.txt"]
+    assert machine.requests[-1] == {"endpoint": "file", "command": "read", "path": "/tmp/notes.txt"}
+
+    with pytest.raises(RuntimeError, match="No such file"):
+        machine.instance().read_file("/missing")
+
+
+async def test_async_read_file() -> None:
+    machine = Machine()
+    machine.files["/tmp/notes.txt"] = "hello"
+
+    assert (await machine.async_instance().read_file("/tmp/notes.txt")).read() == b"hello"
+
+
+def _uploads(machine: Machine) -> List[str]:
+    return [os.path.basename(r["path"]) for r in machine.requests if r["endpoint"] == "upload"]
+
+
+def test_upload_chunked_streams_verifies_and_assembles(tmp_path: Path) -> None:
+    source = tmp_path / "data.bin"
+    source.write_bytes(os.urandom(10_000))
+    destination = tmp_path / "remote" / "data.bin"
+    machine = Machine()
+    machine.errors["upload"] = [503]
+
+    result = machine.instance().upload_chunked(str(source), str(destination), chunk_size=3000, concurrency=2)
+
+    assert destination.read_bytes() == source.read_bytes()
+    assert (result.chunks, result.size, result.skipped_chunks, result.resent_chunks) == (4, 10_000, 0, 0)
+    # Only the chunk that hit the injected error was sent twice
+    assert len(_uploads(machine)) == 5 and len(set(_uploads(machine))) == 4
+    assert os.listdir(destination.parent) == ["data.bin"]
+
+
+def test_upload_chunked_resends_only_corrupt_chunks_and_resumes(tmp_path: Path) -> None:
+    data = os.urandom(10_000)
+    destination = tmp_path / "data.bin"
+    machine = Machine()
+    machine.instance().upload_chunked(data, str(destination), chunk_size=4000, retries=0)
+    assert destination.read_bytes() == data
+
+    # A previous, interrupted upload left the first chunk behind
+    machine.requests.clear()
+    destination.unlink()
+    leftover = tmp_path / f"data.bin.upload-{hashlib.sha256(data).hexdigest()[:16]}-4000"
+    leftover.mkdir()
+    (leftover / "part-000000").write_bytes(data[:4000])
+    machine.corrupt.add(str(leftover / "part-000002"))
+
+    result = machine.instance().upload_chunked(memoryview(data), str(destination), chunk_size=4000)
+
+    assert destination.read_bytes() == data
+    assert (result.skipped_chunks, result.resent_chunks) == (1, 1)
+    assert sorted(_uploads(machine)) == ["part-000001", "part-000002", "part-000002"]
+
+
+def test_upload_chunked_leaves_the_shell_working_directory_alone(tmp_path: Path) -> None:
+    instance = Machine().instance()
+    instance.bash(command=f"cd {tmp_path}")
+
+    instance.upload_chunked(os.urandom(5000), str(tmp_path / "data.bin"), chunk_size=2000)
+
+    response: Any = instance.bash(command="pwd")
+    assert response.output == f"{tmp_path}\n" and not response.error
+
+
+def test_upload_chunked_fails_after_retries(tmp_path: Path) -> None:
+    machine = Machine()
+    machine.corrupt.add(str(tmp_path / f"data.bin.upload-{hashlib.sha256(b'abc').hexdigest()[:16]}-2" / "part-000001"))
+
+    with pytest.raises(RuntimeError, match="failed verification"):
+        machine.instance().upload_chunked(b"abc", str(tmp_path / "data.bin"), chunk_size=2, retries=0)
+
+
+async def test_async_upload_chunked(tmp_path: Path) -> None:
+    source = tmp_path / "empty.bin"
+    source.write_bytes(b"")
+    machine = Machine()
+
+    result = await machine.async_instance().upload_chunked(source, str(tmp_path / "copy.bin"))
+
+    assert (tmp_path / "copy.bin").read_bytes() == b""
+    assert result.chunks == 1 and result.sha256 == "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
+
+
+def _tree(root: Path) -> Dict[str, bytes]:
+    return {path.relative_to(root).as_posix(): path.read_bytes() for path in root.rglob("*") if path.is_file()}
+
+
+def test_sync_dir_uploads_only_changed_files(tmp_path: Path) -> None:
+    local, remote = tmp_path / "local", tmp_path / "remote"
+    (local / "src" / "deep dir").mkdir(parents=True)
+    (local / "README.md").write_text("readme " * 100)
+    (local / "src" / "main.py").write_text("print('hello')\n")
+    (local / "src" / "deep dir" / "data.bin").write_bytes(os.urandom(5000))
+    machine = Machine()
+
+    first = machine.instance().sync_dir(local, str(remote), chunked_threshold=4096)
+    assert _tree(remote) == _tree(local)
+    assert (first.files, first.uploaded_files, first.deleted_files) == (3, 3, 0)
+
+    machine.requests.clear()
+    second = machine.instance().sync_dir(local, str(remote))
+    assert second.uploaded_files == 0 and second.saved_bytes == second.total_bytes
+    assert not [r for r in machine.requests if r["endpoint"] == "upload"]
+
+    (local / "src" / "main.py").write_text("print('changed')\n")
+    (remote / "stale.txt").write_text("stale")
+    third = machine.instance().sync_dir(local, str(remote))
+    assert (third.uploaded_files, third.deleted_files) == (1, 0) and (remote / "stale.txt").exists()
+
+    fourth = machine.instance().sync_dir(local, str(remote), delete=True)
+    assert (fourth.uploaded_files, fourth.deleted_files) == (0, 1)
+    assert _tree(remote) == _tree(local)
+
+
+def test_sync_dir_leaves_the_shell_working_directory_alone(tmp_path: Path) -> None:
+    local = tmp_path / "local"
+    local.mkdir()
+    (local / "a.txt").write_text("a")
+    (tmp_path / "remote").mkdir()
+    (tmp_path / "remote" / "stale.txt").write_text("stale")
+    instance = Machine().instance()
+
+    instance.sync_dir(local, str(tmp_path / "remote"), delete=True)
+
+    response: Any = instance.bash(command="pwd")
+    assert response.output == f"{os.getcwd()}\n"
+
+
+async def test_async_sync_dir(tmp_path: Path) -> None:
+    local, remote = tmp_path / "local", tmp_path / "remote"
+    local.mkdir()
+    (local / "a.txt").write_text("a")
+    machine = Machine()
+
+    result = await machine.async_instance().sync_dir(str(local), str(remote))
+
+    assert _tree(remote) == {"a.txt": b"a"} and result.uploaded_files == 1
+
+
+def test_download_streams_ranges_and_resumes(tmp_path: Path) -> None:
+    remote = tmp_path / "trace.zip"
+    remote.write_bytes(os.urandom(10_000))
+    local = tmp_path / "local.zip"
+    machine = Machine()
+
+    result = machine.instance().download(str(remote), local, chunk_size=3000)
+    assert local.read_bytes() == remote.read_bytes()
+    assert result.sha256 == hashlib.sha256(remote.read_bytes()).hexdigest() and result.resumed_bytes == 0
+    assert len([r for r in machine.requests if "base64" in r.get("command", "")]) == 4
+
+    local.write_bytes(remote.read_bytes()[:7000])
+    resumed = machine.instance().download(str(remote), str(local), chunk_size=3000)
+    assert local.read_bytes() == remote.read_bytes() and resumed.resumed_bytes == 7000
+
+    buffer = io.BytesIO()
+    machine.instance().download(str(remote), buffer, verify=False)
+    assert buffer.getvalue() == remote.read_bytes()
+
+    with pytest.raises(RuntimeError):
+        machine.instance().download(str(tmp_path / "missing"), buffer)
+
+
+def test_download_resumes_only_from_a_matching_prefix(tmp_path: Path) -> None:
+    remote = tmp_path / "trace.zip"
+    remote.write_bytes(os.urandom(10_000))
+    local = tmp_path / "local.zip"
+    machine = Machine()
+
+    local.write_bytes(remote.read_bytes()[:4000])
+    resumed = machine.instance().download(str(remote), local, verify=False, chunk_size=3000)
+    assert local.read_bytes() == remote.read_bytes() and resumed.resumed_bytes == 4000
+    assert len([r for r in machine.requests if "base64" in r.get("command", "")]) == 2
+
+    local.write_bytes(os.urandom(2000))
+    stale = machine.instance().download(str(remote), local, verify=False)
+    assert local.read_bytes() == remote.read_bytes() and stale.resumed_bytes == 0
+
+    local.write_bytes(os.urandom(10_000))
+    replaced = machine.instance().download(str(remote), local)
+    assert local.read_bytes() == remote.read_bytes() and replaced.resumed_bytes == 0
+
+
+def test_download_rereads_ranges_the_bash_output_cut_off(tmp_path: Path) -> None:
+    remote = tmp_path / "trace.zip"
+    remote.write_bytes(os.urandom(10_000))
+    local = tmp_path / "local.zip"
+    machine = Machine()
+    machine.output_limit = 4000  # 3000 bytes of base64
+
+    result = machine.instance().download(str(remote), local, chunk_size=10_000)
+
+    assert local.read_bytes() == remote.read_bytes() and result.sha256 is not None
+    lengths = [int(r["command"].split("head -c ")[1].split()[0]) for r in machine.requests if "base64" in r["command"]]
+    assert lengths[:3] == [10_000, 5000, 2500] and max(lengths[3:]) == 2500
+
+    machine.output_limit = 3
+    with pytest.raises(RuntimeError, match="returned 0 bytes"):
+        machine.instance().download(str(remote), io.BytesIO(), verify=False)
+
+
+async def test_async_download(tmp_path: Path) -> None:
+    remote = tmp_path / "data.txt"
+    remote.write_text("hello world")
+    machine = Machine()
+
+    result = await machine.async_instance().download(str(remote), tmp_path / "copy.txt", chunk_size=4)
+
+    assert (tmp_path / "copy.txt").read_text() == "hello world" and result.size == 11
+
+
+def test_file_batch_keeps_order_per_path_and_reports_failures() -> None:
+    machine = Machine()
+    machine.errors["file"] = [503]
+    operations = [FileOperation(command="write", path=f"/etc/{i}.conf", content=str(i)) for i in range(10)]
+    operations += [FileOperation(command="read", path=f"/etc/{i}.conf") for i in range(10)]
+    operations.append(FileOperation(command="read", path="/missing"))
+    operations.append(FileOperation(command="unknown", path="/etc/0.conf"))
+
+    result = machine.instance().file_batch(operations, concurrency=4)
+
+    assert [response.output for response in result.results[10:20] if response] == [str(i) for i in range(10)]
+    assert result.results[20] is not None and result.results[20].error == "No such file"
+    assert [failure.index for failure in result.failures] == [21]
+    assert len(machine.requests) == len(operations) + 1
+
+
+def test_file_batch_does_not_retry_edits_the_server_may_have_applied() -> None:
+    machine = Machine()
+    machine.errors["file"] = [503, 503]
+    operations = [FileOperation(command="append", path="/log", text="line"), FileOperation(command="read", path="/a")]
+
+    result = machine.instance().file_batch(operations)
+
+    assert [failure.index for failure in result.failures] == [0] and result.failures[0].attempts == 1
+    assert result.results[1] is not None
+
+
+def test_file_batch_does_not_retry_a_delete_whose_response_was_lost() -> None:
+    machine = Machine()
+    machine.errors["file"] = [502]
+
+    result = machine.instance().file_batch([FileOperation(command="delete", path="/tmp/old.log")])
+
+    assert [failure.index for failure in result.failures] == [0] and result.failures[0].attempts == 1
+    assert len(machine.requests) == 1
+
+
+def test_file_operation_lanes_serialize_nested_paths() -> None:
+    operations = [
+        FileOperation(command="mkdir", path="/a/b/"),
+        FileOperation(command="write", path="/a/b/c", content="c"),
+        FileOperation(command="write", path="/x/1", content="1"),
+        FileOperation(command="write", path="/x/2", content="2"),
+        FileOperation(command="delete", path="/x"),
+        FileOperation(command="read", path="/a//b"),
+        FileOperation(command="read", path="/y"),
+    ]
+
+    assert _file_operation_lanes(operations) == [[0, 1, 5], [2, 3, 4], [6]]
+
+
+async def test_async_file_batch() -> None:
+    machine = Machine()
+    result = await machine.async_instance().file_batch(
+        [FileOperation(command="write", path="/a", content="a"), FileOperation(command="read", path="/a")]
+    )
+
+    assert result.ok and result.results[1] is not None and result.results[1].output == "a"
+
+
+def test_bash_stream_yields_output_while_running(tmp_path: Path) -> None:
+    machine = Machine()
+    stream = machine.instance().bash_stream(
+        "for i in 1 2 3; do echo héllo $i; sleep 0.1; done; exit 3",
+        chunk_size=4,
+        poll_interval=0.01,
+        spool_path=tmp_path / "output.log",
+    )
+
+    chunks = list(stream)
+
+    assert "".join(chunks) == "héllo 1\nhéllo 2\nhéllo 3\n" and len(chunks) > 3
+    assert stream.exit_code == 3
+    assert (tmp_path / "output.log").read_text() == "".join(chunks)
+    assert not os.path.exists(stream._state.log)
+
+
+def test_bash_stream_rereads_output_the_bash_endpoint_cut_off() -> None:
+    machine = Machine()
+    machine.output_limit = 4003  # Cuts a chunk off partway through its base64
+
+    stream = machine.instance().bash_stream("head -c 20000 /dev/zero | tr '\\0' x", poll_interval=0.01)
+    chunks = list(stream)
+
+    assert "".join(chunks) == "x" * 20000 and stream.exit_code == 0
+    assert stream._state.chunk_size < DEFAULT_BASH_STREAM_CHUNK_SIZE
+
+
+def _running(pattern: str) -> bool:
+    for _ in range(50):
+        if subprocess.run(["pgrep", "-f", pattern], capture_output=True).returncode != 0:
+            return False
+        time.sleep(0.02)  # give the terminated processes a moment to exit
+    return True
+
+
+def test_bash_stream_terminates_on_timeout() -> None:
+    machine = Machine()
+    stream = machine.instance().bash_stream(
+        "echo started; bash -c 'sleep 30.101 & sleep 30.102'", timeout=0.3, poll_interval=0.01
+    )
+
+    output = []
+    with pytest.raises(TimeoutError):
+        for chunk in stream:
+            output.append(chunk)
+
+    assert output == ["started\n"]
+    assert not _running("sleep 30.10[12]")  # the grandchildren were terminated with the process group
+    assert not os.path.exists(stream._state.log)
+
+
+def test_bash_stream_cleans_up_when_iteration_is_abandoned() -> None:
+    stream = Machine().instance().bash_stream("echo started; sleep 30.103", poll_interval=0.01)
+
+    iterator: Any = iter(stream)
+    assert next(iterator) == "started\n"
+    iterator.close()
+
+    assert not _running("sleep 30.103")
+    assert not os.path.exists(stream._state.log) and not os.path.exists(stream._state.status)
+
+
+async def test_async_bash_stream() -> None:
+    machine = Machine()
+    stream = machine.async_instance().bash_stream("echo one; sleep 0.1; echo two", poll_interval=0.01)
+
+    chunks = [chunk async for chunk in stream]
+
+    assert "".join(chunks) == "one\ntwo\n" and stream.exit_code == 0
+
+
+def _bash_requests(machine: Machine, **fields: Any) -> List[Dict[str, Any]]:
+    return [
+        request
+        for request in machine.requests
+        if request["endpoint"] == "bash" and all(request.get(k) == v for k, v in fields.items())
+    ]
+
+
+def test_bash_session_pool_spreads_commands_over_warm_sessions() -> None:
+    machine = Machine()
+    with BashSessionPool(machine.instance(), size=2, setup="true") as sessions:
+        result = sessions.run_many([f"sleep 0.05; echo {i}" for i in range(6)])
+        assert sessions.idle == 2 and sessions.leased == 0
+
+    assert result.ok and [r.output for r in result.succeeded] == [f"{i}\n" for i in range(6)]
+    assert {request["session"] for request in _bash_requests(machine)} == {1, 2}
+    assert len(_bash_requests(machine, command="true")) == 2  # each session is set up once and then reused
+
+
+def test_bash_session_pool_restarts_sessions_that_fail() -> None:
+    machine = Machine()
+    sessions = BashSessionPool(machine.instance(), size=1, setup="true")
+    machine.errors["bash"] = [200, 504]  # the setup succeeds, the command times out
+
+    with pytest.raises(ApiError):
+        sessions.run("sleep 100")
+
+    assert len(_bash_requests(machine, session=1, restart=True)) == 1
+    response: Any = sessions.run("echo ok")
+    assert response.output == "ok\n"
+    assert len(_bash_requests(machine, command="true")) == 2  # the restarted session is set up again
+
+
+def test_bash_session_pool_restarts_sessions_whose_command_timed_out() -> None:
+    machine = Machine()
+    sessions = BashSessionPool(machine.instance(), size=1, setup="true")
+    timed_out = "echo 'timed out: bash has not returned in 120 seconds and must be restarted' >&2; exit 1"
+
+    response: Any = sessions.run(timed_out)
+
+    assert response.error and len(_bash_requests(machine, session=1, restart=True)) == 1
+    sessions.run("echo ok")
+    assert len(_bash_requests(machine, command="true")) == 2
+
+
+def test_bash_session_pool_only_retries_commands_that_were_not_sent(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("time.sleep", lambda _: None)
+    machine = Machine()
+    machine.errors["bash"] = [503]
+    sessions = BashSessionPool(machine.instance(), size=1)
+
+    result = sessions.run_many(["echo once"], retries=2, request_options={"max_retries": 0})
+
+    assert [failure.attempts for failure in result.failures] == [1]
+    assert len(_bash_requests(machine, command="echo once")) == 1
+
+
+def test_bash_session_pool_lease_times_out_when_all_sessions_are_leased() -> None:
+    sessions = BashSessionPool(Machine().instance(), size=1)
+    with sessions.lease() as session:
+        assert session == 1
+        with pytest.raises(TimeoutError):
+            with sessions.lease(timeout=0.05):
+                pass
+
+
+async def test_async_bash_session_pool() -> None:
+    machine = Machine()
+    async with AsyncBashSessionPool(machine.async_instance(), size=3) as sessions:
+        result = await sessions.run_many(["echo a", "echo b", "exit 1", "echo d"])
+
+    assert result.ok and [r.output for r in result.succeeded] == ["a\n", "b\n", "", "d\n"]
+    assert {request["session"] for request in _bash_requests(machine)} <= {1, 2, 3}
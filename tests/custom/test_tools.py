@@ -0,0 +1,55 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+
+from scrapybara import AsyncScrapybara
+from scrapybara.client import AsyncUbuntuInstance
+from scrapybara.tools import AsyncBashTool, AsyncComputerTool, AsyncEditTool
+from scrapybara.types import BashResponse, ComputerResponse, EditResponse
+
+
+def _async_instance(requests: List[Dict[str, Any]]) -> AsyncUbuntuInstance:
+    def transport(request: httpx.Request) -> httpx.Response:
+        requests.append({"path": request.url.path, "body": json.loads(request.content)})
+        return httpx.Response(200, json={"output": request.url.path.rsplit("/", 1)[-1], "base64_image": "aW1n"})
+
+    client = AsyncScrapybara(
+        api_key="test",
+        base_url="https://api.test",
+        httpx_client=httpx.AsyncClient(transport=httpx.MockTransport(transport)),
+    )
+    return AsyncUbuntuInstance("instance", datetime.now(), "running", client._base_client)
+
+
+async def test_async_tools_await_instance_calls() -> None:
+    requests: List[Dict[str, Any]] = []
+    instance = _async_instance(requests)
+
+    computer = await AsyncComputerTool(instance)(action="click_mouse", button="left", coordinates=[1, 2])
+    bash = await AsyncBashTool(instance)(command="ls")
+    edit = await AsyncEditTool(instance)(command="view", path="/tmp")
+
+    assert isinstance(computer, ComputerResponse) and computer.base_64_image == "aW1n"
+    assert isinstance(bash, BashResponse) and bash.output == "bash"
+    assert isinstance(edit, EditResponse) and edit.output == "edit"
+    assert [r["path"] for r in requests] == [
+        "/v1/instance/instance/computer",
+        "/v1/instance/instance/bash",
+        "/v1/instance/instance/edit",
+    ]
+    assert requests[0]["body"]["action"] == "click_mouse"
+    assert requests[0]["body"]["coordinates"] == [1, 2]
+    assert requests[1]["body"]["command"] == "ls"
+
+
+async def test_async_computer_tool_validates_action_parameters() -> None:
+    requests: List[Dict[str, Any]] = []
+    tool = AsyncComputerTool(_async_instance(requests))
+
+    with pytest.raises(ValueError, match="coordinates is required"):
+        await tool(action="move_mouse")
+    assert requests == []
+    assert tool.sequential
@@ -1,6 +1,17 @@
 # This file was auto-generated by Fern from our API Definition.
 
-from scrapybara.core.http_client import get_request_body
+import asyncio
+import gzip
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterator, List
+
+import httpx
+import pytest
+
+from scrapybara.core.http_client import AsyncHttpClient, HttpClient, get_request_body
 from scrapybara.core.request_options import RequestOptions
 
 
@@ -59,3 +70,162 @@ def test_get_empty_json_request_body() -> None:
 
     assert json_body_extras is None
     assert data_body_extras is None
+
+
+def _retrying_client(handler: Callable[[httpx.Request], httpx.Response]) -> HttpClient:
+    return HttpClient(
+        httpx_client=httpx.Client(transport=httpx.MockTransport(handler)),
+        base_timeout=lambda: None,
+        base_headers=lambda: {},
+        base_url=lambda: "https://api.test",
+    )
+
+
+def _flaky(error: Exception, failures: int, bodies: List[bytes]) -> Callable[[httpx.Request], httpx.Response]:
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(request.read())
+        if len(bodies) <= failures:
+            raise error
+        return httpx.Response(200, json={"ok": True})
+
+    return handler
+
+
+def test_retries_transport_errors_with_body_encoded_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(time, "sleep", lambda _: None)
+    bodies: List[bytes] = []
+    client = _retrying_client(_flaky(httpx.ConnectError("refused"), 2, bodies))
+
+    response = client.request("v1/act", method="POST", json={"hello": "world"}, request_options={"max_retries": 4})
+
+    assert response.status_code == 200
+    assert len(bodies) == 3
+    assert len(set(bodies)) == 1
+
+
+def test_does_not_retry_non_idempotent_read_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(time, "sleep", lambda _: None)
+    bodies: List[bytes] = []
+    client = _retrying_client(_flaky(httpx.ReadError("reset"), 1, bodies))
+
+    with pytest.raises(httpx.ReadError):
+        client.request("v1/act", method="POST", json={}, request_options={"max_retries": 4})
+    assert len(bodies) == 1
+
+    bodies.clear()
+    response = client.request("v1/act", method="POST", json={}, request_options={"max_retries": 4, "idempotent": True})
+    assert response.status_code == 200
+    assert len(bodies) == 2
+
+
+def test_retry_deadline_stops_retrying(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(time, "sleep", lambda _: None)
+    attempts: List[bytes] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        attempts.append(request.read())
+        return httpx.Response(503, headers={"retry-after": "5"})
+
+    client = _retrying_client(handler)
+    response = client.request(
+        "v1/instances", method="GET", request_options={"max_retries": 10, "retry_deadline_in_seconds": 1}
+    )
+
+    assert response.status_code == 503
+    assert len(attempts) == 1
+
+
+async def test_async_retries_transport_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    sleeps: List[float] = []
+
+    async def sleep(delay: float) -> None:
+        sleeps.append(delay)
+
+    monkeypatch.setattr(asyncio, "sleep", sleep)
+    bodies: List[bytes] = []
+    client = AsyncHttpClient(
+        httpx_client=httpx.AsyncClient(transport=httpx.MockTransport(_flaky(httpx.ConnectTimeout("slow"), 2, bodies))),
+        base_timeout=lambda: None,
+        base_headers=lambda: {},
+        base_url=lambda: "https://api.test",
+    )
+
+    response = await client.request("v1/act", method="POST", json={"a": 1}, request_options={"max_retries": 4})
+
+    assert response.status_code == 200
+    assert len(bodies) == 3
+    assert len(sleeps) == 2
+
+
+class _EchoEncodingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        raw = self.rfile.read(int(self.headers["content-length"]))
+        encoding = self.headers.get("content-encoding")
+        if encoding == "gzip":
+            raw_payload = gzip.decompress(raw)
+        elif encoding == "zstd":
+            import zstandard  # type: ignore
+
+            raw_payload = zstandard.ZstdDecompressor().decompress(raw)
+        else:
+            raw_payload = raw
+        payload = json.loads(raw_payload)
+        body = json.dumps({"encoding": encoding, "received": len(raw), "payload": payload}).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def echo_server() -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EchoEncodingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_compresses_bodies_above_threshold(echo_server: str) -> None:
+    client = HttpClient(
+        httpx_client=httpx.Client(),
+        base_timeout=lambda: 10,
+        base_headers=lambda: {},
+        base_url=lambda: echo_server,
+        compression="gzip",
+        compression_threshold=1024,
+    )
+    large = {"messages": ["x" * 4096]}
+
+    response = client.request("v1/act", method="POST", json=large)
+    assert response.json()["encoding"] == "gzip"
+    assert response.json()["received"] < 1024
+    assert response.json()["payload"] == large
+
+    response = client.request("v1/act", method="POST", json={"small": True})
+    assert response.json()["encoding"] is None
+    assert response.json()["payload"] == {"small": True}
+
+
+async def test_async_compresses_bodies_above_threshold(echo_server: str) -> None:
+    client = AsyncHttpClient(
+        httpx_client=httpx.AsyncClient(),
+        base_timeout=lambda: 10,
+        base_headers=lambda: {},
+        base_url=lambda: echo_server,
+        compression="zstd",
+        compression_threshold=1024,
+    )
+    large = {"messages": ["x" * 4096]}
+
+    response = await client.request("v1/act", method="POST", json=large)
+
+    # zstandard is not a dependency, so zstd falls back to gzip when it is missing
+    assert response.json()["encoding"] in ("gzip", "zstd")
+    assert response.json()["payload"] == large
@@ -0,0 +1,64 @@
+import json
+import random
+from typing import Any, Dict
+
+import httpx
+import pytest
+
+from scrapybara.core import JsonStreamParser, async_parse_json_response, parse_json_response
+
+
+def _parse(raw: bytes, chunk_size: int, **kwargs: Any) -> Dict[str, Any]:
+    parser = JsonStreamParser(**kwargs)
+    for i in range(0, len(raw), chunk_size):
+        parser.feed(raw[i : i + chunk_size])
+    return parser.close()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 4096])
+def test_matches_json_loads_for_any_chunking(chunk_size: int) -> None:
+    document = {
+        "base64_image": "QUJD" * 100 + 'é\n"\\/😀',
+        "output": None,
+        "count": -12.5e3,
+        "ok": True,
+        "nested": {"list": [1, {"text": '}]"'}], "empty": {}},
+        "text": "hé\"llo\n😀",
+    }
+    for ensure_ascii in (True, False):
+        raw = json.dumps(document, ensure_ascii=ensure_ascii, indent=1).encode()
+        result = _parse(raw, chunk_size, spool_fields=["base64_image"], max_memory=64)
+
+        assert result.pop("base64_image").read().decode() == document["base64_image"]
+        assert result == {key: value for key, value in document.items() if key != "base64_image"}
+
+
+def test_spools_only_string_values() -> None:
+    result = _parse(b'{"base64_image": null, "output": ["a"]}', 5, spool_fields=["base64_image", "output"])
+
+    assert result == {"base64_image": None, "output": ["a"]}
+
+
+@pytest.mark.parametrize("raw", [b'{"a": 1', b'{"a" 1}', b"[1]", b'{"a": 1} x', b'{"a": 1,}', b'{"a": "\\x"}'])
+def test_rejects_invalid_documents(raw: bytes) -> None:
+    with pytest.raises(json.JSONDecodeError):
+        _parse(raw, random.randint(1, 4), spool_fields=["a"])
+
+
+def test_parses_streamed_responses() -> None:
+    response = httpx.Response(200, stream=httpx.ByteStream(b'{"base64_image": "aGk=", "system": "linux"}'))
+
+    result = parse_json_response(response, spool_fields=["base64_image"])
+
+    assert result["base64_image"].read() == b"aGk=" and result["system"] == "linux"
+
+
+async def test_parses_async_streamed_responses() -> None:
+    class Stream(httpx.AsyncByteStream):
+        async def __aiter__(self):  # type: ignore[no-untyped-def]
+            for chunk in (b'{"output"', b': "ab', b'c"}'):
+                yield chunk
+
+    result = await async_parse_json_response(httpx.Response(200, stream=Stream()), spool_fields=["output"])
+
+    assert result["output"].read() == b"abc"
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import httpx
+import pytest
+
+from scrapybara import Scrapybara
+from scrapybara.core import RateLimiter
+
+
+def test_token_bucket_spaces_requests_after_burst() -> None:
+    limiter = RateLimiter(requests_per_second=10, burst=2)
+
+    delays = [limiter.reserve() for _ in range(4)]
+
+    assert delays[:2] == [0.0, 0.0]
+    assert delays[2] == pytest.approx(0.1, abs=0.02)
+    assert delays[3] == pytest.approx(0.2, abs=0.02)
+
+
+def test_reserve_is_thread_safe() -> None:
+    limiter = RateLimiter(requests_per_second=1, burst=50)
+    delays: List[float] = []
+
+    def worker() -> None:
+        for _ in range(10):
+            delays.append(limiter.reserve())
+
+    threads = [threading.Thread(target=worker) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(delay == 0.0 for delay in delays) == 50
+    assert max(delays) == pytest.approx(50, abs=0.5)
+
+
+def test_retry_after_backs_off_every_request() -> None:
+    limiter = RateLimiter()
+    limiter.observe(httpx.Response(429, headers={"retry-after": "2"}))
+
+    state = limiter.state()
+    assert state.throttled_responses == 1
+    assert state.backoff_remaining == pytest.approx(2, abs=0.1)
+    assert limiter.reserve() == pytest.approx(2, abs=0.1)
+
+
+def test_lock_path_shares_state(tmp_path: Path) -> None:
+    lock_path = str(tmp_path / "limiter")
+    first = RateLimiter(requests_per_second=1, burst=1, lock_path=lock_path)
+    second = RateLimiter(requests_per_second=1, burst=1, lock_path=lock_path)
+
+    assert first.reserve() == 0.0
+    assert second.reserve() == pytest.approx(1, abs=0.1)
+
+    second.backoff(5)
+    assert first.state().backoff_remaining == pytest.approx(5, abs=0.1)
+
+
+async def test_async_acquire_waits_for_the_lock_file_off_the_event_loop(tmp_path: Path) -> None:
+    import fcntl
+
+    lock_path = str(tmp_path / "limiter")
+    limiter = RateLimiter(requests_per_second=100, lock_path=lock_path)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT)
+    fcntl.flock(fd, fcntl.LOCK_EX)  # another process holding the lock
+    threading.Timer(0.2, os.close, [fd]).start()
+
+    ticks = 0
+
+    async def tick() -> None:
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticker = asyncio.ensure_future(tick())
+    await limiter.async_acquire()
+    ticker.cancel()
+
+    assert ticks >= 5
+
+
+def test_client_observes_retry_after(monkeypatch: pytest.MonkeyPatch) -> None:
+    sleeps: List[float] = []
+    monkeypatch.setattr(time, "sleep", sleeps.append)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(429, headers={"retry-after": "3"}, json={})
+
+    limiter = RateLimiter()
+    client = Scrapybara(
+        api_key="test",
+        base_url="https://api.test",
+        httpx_client=httpx.Client(transport=httpx.MockTransport(handler)),
+        rate_limiter=limiter,
+    )
+    client.httpx_client.request("v1/instances", method="GET")
+    client.httpx_client.request("v1/instances", method="GET")
+
+    assert limiter.state().throttled_responses == 2
+    assert sleeps and sleeps[-1] == pytest.approx(3, abs=0.1)